@@ -0,0 +1,183 @@
+"""Benchmarks of JWT Auth: Token Verification, Refresh Token Checks, Password Hashing and Token Generation"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from statistics import quantiles
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from passlib.context import CryptContext
+
+from fastapi_framework import jwt_auth
+from fastapi_framework.jwt_auth import (
+    check_refresh_token,
+    create_access_token,
+    create_access_token_sync,
+    generate_tokens,
+    generate_tokens_many,
+    get_data,
+    get_refresh_token_key,
+    key_store,
+    pwd_context,
+    revoke_user_tokens,
+    token_cache,
+    verify_password,
+)
+from fastapi_framework.redis import REDIS_HOST, REDIS_PORT, RedisBackend
+
+USERS = 1000  # Refresh Tokens are spread over this many User IDs
+
+
+async def per_call(function: Callable[[], Awaitable], calls: int) -> float:
+    """Returns the average Time of an awaited Call in Microseconds"""
+    started: float = perf_counter()
+    for _ in range(calls):
+        await function()
+    return (perf_counter() - started) / calls * 1e6
+
+
+def use_rsa_key(directory: str):
+    """Signs and verifies Tokens with a new RS256 Key from a JWKS File"""
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jwt.algorithms import RSAAlgorithm
+
+    path: str = os.path.join(directory, "jwks.json")
+    jwk: Dict = RSAAlgorithm.to_jwk(rsa.generate_private_key(65537, 2048), as_dict=True)
+    with open(path, "w") as file:
+        json.dump({"keys": [{**jwk, "kid": "benchmark", "alg": "RS256"}]}, file)
+    key_store.path = path
+    key_store.reload()
+
+
+async def verify(calls: int):
+    """Measures `get_data` per Call with and without the Token Cache"""
+    with tempfile.TemporaryDirectory() as directory:
+        for algorithm in ["HS256", "RS256"]:
+            if algorithm == "RS256":
+                use_rsa_key(directory)
+            token: str = create_access_token_sync({"user_id": 1})
+            for size in [0, 1024]:
+                token_cache.size = size
+                token_cache.clear()
+                elapsed: float = await per_call(lambda: get_data(token), calls)
+                print(f"{algorithm} {'cached' if size else 'uncached':8}: {elapsed:7.1f} us per get_data")
+    key_store.path = ""
+    token_cache.size = 0
+
+
+async def refresh(tokens: int, checks: int):
+    """Measures `check_refresh_token` with many outstanding Tokens against scanning the legacy Set"""
+    redis: RedisBackend = await RedisBackend.init(f"redis://{REDIS_HOST}:{REDIS_PORT}")
+    legacy_key: str = "benchmark:refresh_tokens"
+    issued: List[str] = []
+    try:
+        for start in range(0, tokens, 5000):
+            users: List[Tuple[Dict, int]] = [
+                ({}, user_id % USERS) for user_id in range(start, min(start + 5000, tokens))
+            ]
+            batch: List[str] = [token["refresh_token"] for token in await generate_tokens_many(users, redis)]
+            pipeline = redis.pipeline()
+            for refresh_token in batch:
+                pipeline.sadd(legacy_key, refresh_token)
+            await pipeline.execute()
+            issued.extend(batch)
+        token: str = issued[len(issued) // 2]
+        assert await redis.exists(get_refresh_token_key(token))
+
+        async def scan() -> bool:
+            return token in list(await redis.smembers(legacy_key))
+
+        print(f"{tokens} tokens, legacy smembers + scan: {await per_call(scan, max(checks // 1000, 1)):10.1f} us")
+        elapsed: float = await per_call(lambda: check_refresh_token(token, redis), checks)
+        print(f"{tokens} tokens, check_refresh_token:    {elapsed:10.1f} us")
+    finally:
+        for user_id in range(min(tokens, USERS)):
+            await revoke_user_tokens(user_id, redis)
+        await redis.delete(legacy_key)
+        await redis.close()
+
+
+async def ticker(lags: List[float], stop: asyncio.Event):
+    """Sleeps 1ms in a Loop and records how late each Wake-up is"""
+    while not stop.is_set():
+        started: float = perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append((perf_counter() - started - 0.001) * 1000)
+
+
+async def login(logins: int, rounds: int):
+    """Runs concurrent Logins with blocking and with offloaded bcrypt and reports the Event Loop Lag"""
+    password_hash: str = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds).hash("password")
+
+    async def blocking(password: str, hashed: str) -> bool:
+        return bool(pwd_context.verify(password, hashed))
+
+    for name, check in [("pwd_context.verify", blocking), ("verify_password", verify_password)]:
+        lags: List[float] = []
+        stop: asyncio.Event = asyncio.Event()
+        task: asyncio.Task = asyncio.create_task(ticker(lags, stop))
+        await asyncio.sleep(0.01)
+        started: float = perf_counter()
+        assert all(await asyncio.gather(*[check("password", password_hash) for _ in range(logins)]))
+        elapsed: float = perf_counter() - started
+        stop.set()
+        await task
+        p99: float = quantiles(lags, n=100, method="inclusive")[98] if len(lags) > 1 else lags[0]
+        print(f"{name:18}: {elapsed:6.2f} s total, loop lag max {max(lags):8.1f} ms, p99 {p99:6.1f} ms")
+
+
+async def generate(counts: List[int], calls: int):
+    """Measures Tokens per Second of `create_access_token`, a `generate_tokens` Loop and `generate_tokens_many`"""
+    started: float = perf_counter()
+    for _ in range(calls):
+        await create_access_token({"user_id": 1})
+    print(f"create_access_token:       {calls / (perf_counter() - started):9.0f} tokens/s")
+    redis: RedisBackend = await RedisBackend.init(f"redis://{REDIS_HOST}:{REDIS_PORT}")
+    try:
+        started = perf_counter()
+        for user_id in range(calls // 10):
+            await generate_tokens({"user_id": user_id}, user_id % USERS, redis)
+        print(f"generate_tokens loop:      {calls // 10 / (perf_counter() - started):9.0f} tokens/s")
+        for count in counts:
+            users = [({"user_id": user_id}, user_id % USERS) for user_id in range(count)]
+            started = perf_counter()
+            await generate_tokens_many(users, redis)
+            print(f"generate_tokens_many {count:5}: {count / (perf_counter() - started):9.0f} tokens/s")
+    finally:
+        for user_id in range(USERS):
+            await revoke_user_tokens(user_id, redis)
+        await redis.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    verify_parser = commands.add_parser("verify", help="get_data with and without the token cache")
+    verify_parser.add_argument("--calls", type=int, default=20000)
+    refresh_parser = commands.add_parser("refresh", help="check_refresh_token with many outstanding tokens")
+    refresh_parser.add_argument("--tokens", type=int, default=100000)
+    refresh_parser.add_argument("--checks", type=int, default=10000)
+    login_parser = commands.add_parser("login", help="event loop lag during a login storm")
+    login_parser.add_argument("--logins", type=int, default=32)
+    login_parser.add_argument("--rounds", type=int, default=12)
+    generate_parser = commands.add_parser("generate", help="token generation throughput")
+    generate_parser.add_argument("--counts", type=int, nargs="+", default=[1000, 5000])
+    generate_parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+    if not jwt_auth.SECRET_KEY:
+        parser.error("JWT_SECRET_KEY has to be set")
+    if args.command == "verify":
+        asyncio.run(verify(args.calls))
+    elif args.command == "refresh":
+        asyncio.run(refresh(args.tokens, args.checks))
+    elif args.command == "login":
+        asyncio.run(login(args.logins, args.rounds))
+    else:
+        asyncio.run(generate(args.counts, args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Benchmarks of the RAMBackend: Expire Churn, Set Writes and Memory per Counter"""
+
+import argparse
+import asyncio
+import tracemalloc
+from time import perf_counter
+
+from fastapi_framework.in_memory_backend import RAMBackend
+
+
+def keyspace(backend: RAMBackend) -> int:
+    """Counts the Keys of all Databases including expired but not yet deleted Keys"""
+    return sum(len(database) for database in backend.databases)
+
+
+async def expire_churn(rounds: int, keys: int, pexpire: int):
+    """Writes `keys` short-lived Keys per Round and reports the Keyspace and traced Memory after each Round"""
+    backend: RAMBackend = RAMBackend()
+    backend.start_expire_sweeper()
+    tracemalloc.start()
+    for i in range(rounds):
+        for j in range(keys):
+            await backend.set(f"churn:{i}:{j}", "value", pexpire=pexpire)
+        await asyncio.sleep(pexpire / 1000 + 0.2)
+        current, _ = tracemalloc.get_traced_memory()
+        print(f"round {i + 1:3}: {keyspace(backend):8} keys, {current / 1024:10.1f} KiB")
+    tracemalloc.stop()
+    await backend.close()
+
+
+async def sadd(sizes: list, ops: int):
+    """Measures `sadd` into a Set that already has `n` Members"""
+    for n in sizes:
+        backend: RAMBackend = RAMBackend()
+        started: float = perf_counter()
+        for member in range(n):
+            await backend.sadd("set", member)
+        filled: float = perf_counter() - started
+        started = perf_counter()
+        for member in range(n, n + ops):
+            await backend.sadd("set", member)
+        elapsed: float = perf_counter() - started
+        print(f"n={n:9}: {elapsed / ops * 1e6:8.2f} us per sadd (filled in {filled:.2f} s)")
+        await backend.close()
+
+
+async def counters(keys: int, expire: int):
+    """Measures the traced Memory per Counter set with an Expire and incremented once, Key Strings excluded"""
+    names: list = [f"counter:{i}" for i in range(keys)]
+    backend: RAMBackend = RAMBackend()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for name in names:
+        await backend.set(name, 0, expire=expire)
+        await backend.incr(name)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{keys} counters: {(after - before) / keys:.1f} bytes per key")
+    await backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    churn = commands.add_parser("expire", help="keyspace and memory under expire churn")
+    churn.add_argument("--rounds", type=int, default=10)
+    churn.add_argument("--keys", type=int, default=20000)
+    churn.add_argument("--pexpire", type=int, default=5)
+    sets = commands.add_parser("sadd", help="sadd into large sets")
+    sets.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 1000000])
+    sets.add_argument("--ops", type=int, default=10000)
+    counter = commands.add_parser("counters", help="memory per counter key")
+    counter.add_argument("--keys", type=int, default=1000000)
+    counter.add_argument("--expire", type=int, default=3600)
+    args = parser.parse_args()
+    if args.command == "expire":
+        asyncio.run(expire_churn(args.rounds, args.keys, args.pexpire))
+    elif args.command == "sadd":
+        asyncio.run(sadd(args.sizes, args.ops))
+    else:
+        asyncio.run(counters(args.keys, args.expire))
+
+
+if __name__ == "__main__":
+    main()
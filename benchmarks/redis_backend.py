@@ -0,0 +1,76 @@
+"""Benchmarks of the RedisBackend: the Auto Pipeline against one Round Trip per Command"""
+
+import argparse
+import asyncio
+from time import perf_counter
+from typing import Any, Awaitable, Callable, List
+
+from fastapi_framework.redis import REDIS_HOST, REDIS_PORT, RedisBackend
+
+Execute = Callable[..., Awaitable[Any]]
+
+
+async def sequential_get(execute: Execute, ops: int) -> float:
+    """Awaits one GET after the other"""
+    started: float = perf_counter()
+    for _ in range(ops):
+        await execute("GET", "benchmark:string")
+    return ops / (perf_counter() - started)
+
+
+async def concurrent_incr(execute: Execute, ops: int, concurrency: int) -> float:
+    """Runs `concurrency` INCRs at once until `ops` Commands are done"""
+
+    async def worker():
+        for _ in range(ops // concurrency):
+            await execute("INCR", "benchmark:counter")
+
+    started: float = perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return ops // concurrency * concurrency / (perf_counter() - started)
+
+
+async def concurrent_reads(execute: Execute, ops: int, concurrency: int) -> float:
+    """Runs `concurrency` GETs and SMEMBERS at once until `ops` Commands are done"""
+
+    async def worker():
+        for _ in range(ops // concurrency // 2):
+            await execute("GET", "benchmark:string")
+            await execute("SMEMBERS", "benchmark:set")
+
+    started: float = perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return ops // concurrency // 2 * 2 * concurrency / (perf_counter() - started)
+
+
+async def run(ops: int, concurrency: int):
+    """Compares the Auto Pipeline of `execute` with `execute_command` of the redis-py Client"""
+    redis: RedisBackend = await RedisBackend.init(f"redis://{REDIS_HOST}:{REDIS_PORT}", near_cache_size=0)
+    try:
+        await redis.set("benchmark:string", "value")
+        await redis.execute_pipeline([("sadd", ("benchmark:set", member)) for member in range(10)])
+        executes: List = [
+            ("auto pipeline", redis.execute),
+            ("execute_command", redis.redis_connection.execute_command),
+        ]
+        for name, execute in executes:
+            print(f"{name}:")
+            print(f"  sequential GET:      {await sequential_get(execute, ops):9.0f} ops/s")
+            print(f"  {concurrency:4} x INCR:         {await concurrent_incr(execute, ops, concurrency):9.0f} ops/s")
+            print(f"  {concurrency:4} x GET/SMEMBERS: {await concurrent_reads(execute, ops, concurrency):9.0f} ops/s")
+    finally:
+        await redis.execute_pipeline([("delete", (key,)) for key in ["benchmark:string", "benchmark:counter"]])
+        await redis.delete("benchmark:set")
+        await redis.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.ops, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
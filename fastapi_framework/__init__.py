@@ -9,19 +9,29 @@ from .database import database_dependency
 from .jwt_auth import (
     create_jwt_token,
     create_access_token,
+    create_access_token_sync,
+    create_jwt_token_sync,
     create_refresh_token,
     invalidate_refresh_token,
+    revoke_user_tokens,
     get_token,
     get_data,
     pwd_context,
+    hash_password,
+    verify_password,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     REFRESH_TOKEN_EXPIRE_MINUTES,
     check_refresh_token,
     generate_tokens,
+    generate_tokens_many,
+    TokenCache,
+    token_cache,
+    KeyStore,
+    key_store,
 )
 from .logger import get_logger
 from .rate_limit import RateLimitManager, RateLimiter, get_uuid_user_id, RateLimitTime
 from .redis import get_redis, RedisDependency, redis_dependency, Redis
-from .in_memory_backend import InMemoryBackend, RAMBackend
+from .in_memory_backend import InMemoryBackend, RAMBackend, Script
 from .config import Config, ConfigField
 from .session import Session
@@ -1,9 +1,17 @@
+import asyncio
+import heapq
+import random
+import sys
 import time
-from typing import Dict, Any, Optional, Set, Union, List
+from hashlib import sha1
+from typing import Dict, Any, Optional, Set, Union, List, Tuple, Iterator, MutableMapping, Callable, Awaitable
 from abc import ABC, abstractmethod
 
 
 class InMemoryBackend(ABC):
+    SET_IF_NOT_EXIST = "SET_IF_NOT_EXIST"  # NX
+    SET_IF_EXIST = "SET_IF_EXIST"  # XX
+
     @abstractmethod
     async def set(self, key: str, value, expire: int = 0, pexpire: int = 0, exists=None):
         """Set Key to Value"""
@@ -36,6 +44,18 @@ class InMemoryBackend(ABC):
     async def decr(self, key: str) -> int:
         """Decreases an Int Key"""
 
+    @abstractmethod
+    async def incrby(self, key: str, amount: int) -> int:
+        """Increases an Int Key by `amount`"""
+
+    @abstractmethod
+    async def decrby(self, key: str, amount: int) -> int:
+        """Decreases an Int Key by `amount`"""
+
+    @abstractmethod
+    async def incrbyfloat(self, key: str, amount: float) -> float:
+        """Increases a Float Key by `amount`"""
+
     @abstractmethod
     async def delete(self, key: str):
         """Delete value of a Key"""
@@ -52,75 +72,677 @@ class InMemoryBackend(ABC):
     async def srem(self, key: str, member: Any) -> bool:
         """Removes a Member from a Set"""
 
+    @abstractmethod
+    async def sismember(self, key: str, member: Any) -> bool:
+        """Checks if a Member is in a Set"""
+
+    @abstractmethod
+    async def smismember(self, key: str, members: List[Any]) -> List[bool]:
+        """Checks for every Member if it is in a Set"""
+
+    @abstractmethod
+    async def scard(self, key: str) -> int:
+        """Gets the Number of Members in a Set"""
+
+    @abstractmethod
+    async def zadd(self, key: str, score: float, member: Any) -> bool:
+        """Adds a Member with a Score to a Sorted Set or updates its Score"""
+
+    @abstractmethod
+    async def zrem(self, key: str, member: Any) -> bool:
+        """Removes a Member from a Sorted Set"""
+
+    @abstractmethod
+    async def zrangebyscore(self, key: str, min_score: float, max_score: float) -> List:
+        """Gets the Members of a Sorted Set with a Score between `min_score` and `max_score` ordered by Score"""
+
+    @abstractmethod
+    async def zremrangebyscore(self, key: str, min_score: float, max_score: float) -> int:
+        """Removes the Members of a Sorted Set with a Score between `min_score` and `max_score`"""
+
     @abstractmethod
     async def exists(self, key: str) -> bool:
         """Checks if a Key exists"""
 
+    @abstractmethod
+    async def select(self, db: int) -> bool:
+        """Selects the Database with the Number `db`"""
+
+    async def close(self):
+        """Closes the Connections of the Backend"""
+
+    def hash_tag(self, key: str) -> str:
+        """Returns a Base Key for Keys that have to be on the same Node, only a Cluster needs Hash Tags"""
+        return key
+
+    def replica(self, max_lag: Optional[float] = None) -> "InMemoryBackend":
+        """Returns a View that may read from Replicas at most `max_lag` Seconds behind, only Redis has Replicas"""
+        return self
+
+    def pipeline(self) -> "Pipeline":
+        """Creates a Pipeline that sends Commands in one Batch"""
+        return Pipeline(self)
+
+    def transaction(self) -> "Pipeline":
+        """Creates a Pipeline that executes Commands atomically (MULTI/EXEC)"""
+        return Pipeline(self, transaction=True)
+
+    async def execute_pipeline(self, commands: List[Tuple[str, Tuple]], transaction: bool = False) -> List[Any]:
+        """Executes the Commands of a Pipeline one after another"""
+        return [await getattr(self, name)(*args) for name, args in commands]
+
+    async def eval_script(self, script: "Script", keys: List[str], args: List[Any]) -> Any:
+        """Runs a Script with the Python Function of the Script"""
+        return await script.function(self, keys, args)
+
+
+class Script:
+    """Server Side Script as Lua for Redis and as Python Function for other Backends"""
+
+    lua: str
+    function: Callable[[InMemoryBackend, List[str], List[Any]], Awaitable[Any]]
+    sha: str
+
+    def __init__(self, lua: str, function: Callable[[InMemoryBackend, List[str], List[Any]], Awaitable[Any]]):
+        self.lua = lua
+        self.function = function
+        self.sha = sha1(lua.encode("utf-8")).hexdigest()
+
+
+class Pipeline:
+    """Collects Commands and executes them in one Batch"""
+
+    backend: InMemoryBackend
+    transaction: bool
+    commands: List[Tuple[str, Tuple]]
+
+    def __init__(self, backend: InMemoryBackend, transaction: bool = False):
+        self.backend = backend
+        self.transaction = transaction
+        self.commands = []
+
+    def _add(self, name: str, *args: Any) -> "Pipeline":
+        """Adds a Command to the Pipeline"""
+        self.commands.append((name, args))
+        return self
+
+    async def execute(self) -> List[Any]:
+        """Executes all Commands and returns their Results"""
+        commands, self.commands = self.commands, []
+        if not commands:
+            return []
+        return await self.backend.execute_pipeline(commands, self.transaction)
+
+    def set(self, key: str, value: Any, expire: int = 0, pexpire: int = 0, exists=None) -> "Pipeline":
+        """Set Key to Value"""
+        return self._add("set", key, value, expire, pexpire, exists)
+
+    def get(self, key: str) -> "Pipeline":
+        """Get Value from Key"""
+        return self._add("get", key)
+
+    def pttl(self, key: str) -> "Pipeline":
+        """Get PTTL from a Key"""
+        return self._add("pttl", key)
+
+    def ttl(self, key: str) -> "Pipeline":
+        """Get TTL from a Key"""
+        return self._add("ttl", key)
+
+    def pexpire(self, key: str, pexpire: int) -> "Pipeline":
+        """Sets and PTTL for a Key"""
+        return self._add("pexpire", key, pexpire)
+
+    def expire(self, key: str, expire: int) -> "Pipeline":
+        """Sets and TTL for a Key"""
+        return self._add("expire", key, expire)
+
+    def incr(self, key: str) -> "Pipeline":
+        """Increases an Int Key"""
+        return self._add("incr", key)
+
+    def decr(self, key: str) -> "Pipeline":
+        """Decreases an Int Key"""
+        return self._add("decr", key)
+
+    def incrby(self, key: str, amount: int) -> "Pipeline":
+        """Increases an Int Key by `amount`"""
+        return self._add("incrby", key, amount)
+
+    def decrby(self, key: str, amount: int) -> "Pipeline":
+        """Decreases an Int Key by `amount`"""
+        return self._add("decrby", key, amount)
+
+    def incrbyfloat(self, key: str, amount: float) -> "Pipeline":
+        """Increases a Float Key by `amount`"""
+        return self._add("incrbyfloat", key, amount)
+
+    def delete(self, key: str) -> "Pipeline":
+        """Delete value of a Key"""
+        return self._add("delete", key)
+
+    def smembers(self, key: str) -> "Pipeline":
+        """Gets Set Members"""
+        return self._add("smembers", key)
+
+    def sadd(self, key: str, value: Any) -> "Pipeline":
+        """Adds a Member to a Set"""
+        return self._add("sadd", key, value)
+
+    def srem(self, key: str, member: Any) -> "Pipeline":
+        """Removes a Member from a Set"""
+        return self._add("srem", key, member)
+
+    def sismember(self, key: str, member: Any) -> "Pipeline":
+        """Checks if a Member is in a Set"""
+        return self._add("sismember", key, member)
+
+    def smismember(self, key: str, members: List[Any]) -> "Pipeline":
+        """Checks for every Member if it is in a Set"""
+        return self._add("smismember", key, members)
+
+    def scard(self, key: str) -> "Pipeline":
+        """Gets the Number of Members in a Set"""
+        return self._add("scard", key)
+
+    def zadd(self, key: str, score: float, member: Any) -> "Pipeline":
+        """Adds a Member with a Score to a Sorted Set or updates its Score"""
+        return self._add("zadd", key, score, member)
+
+    def zrem(self, key: str, member: Any) -> "Pipeline":
+        """Removes a Member from a Sorted Set"""
+        return self._add("zrem", key, member)
+
+    def zrangebyscore(self, key: str, min_score: float, max_score: float) -> "Pipeline":
+        """Gets the Members of a Sorted Set with a Score between `min_score` and `max_score` ordered by Score"""
+        return self._add("zrangebyscore", key, min_score, max_score)
+
+    def zremrangebyscore(self, key: str, min_score: float, max_score: float) -> "Pipeline":
+        """Removes the Members of a Sorted Set with a Score between `min_score` and `max_score`"""
+        return self._add("zremrangebyscore", key, min_score, max_score)
+
+    def exists(self, key: str) -> "Pipeline":
+        """Checks if a Key exists"""
+        return self._add("exists", key)
+
 
 class RAMBackendItem:
     """Key-Value Item for the RAM Backend"""
 
-    value: Union[bytes, List]
-    pexpire: int
-    timestamp: int
+    __slots__ = ("value", "deadline")
+
+    value: Union[bytes, int, float, List, Set, Dict]
+    deadline: int  # Unix Timestamp in Milliseconds when the Key expires, 0 if it doesn't expire
 
-    def __init__(self, value: Any, pexpire: int):
+    def __init__(self, value: Any, deadline: int = 0):
         self.value = value
-        self.pexpire = pexpire
-        self.timestamp = int(time.time() * 1000)
+        self.deadline = deadline
+
+
+def _sizeof_value(value: Any) -> int:
+    """Approximate Memory Usage of a Value in Bytes"""
+    if type(value) is int:
+        return INT_SIZE  # Counters change in place, so they are counted with a fixed Size
+    if isinstance(value, (list, set)):
+        return sys.getsizeof(value) + sum(sys.getsizeof(member) for member in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(member) + FLOAT_SIZE for member in value)
+    return sys.getsizeof(value)
+
+
+def _encode_value(value: Any) -> Any:
+    """Converts Counters stored as Int or Float to Bytes"""
+    if type(value) is int:
+        return bytes(str(value), "utf-8")
+    if type(value) is float:
+        return bytes(str(int(value)) if value.is_integer() else repr(value), "utf-8")
+    return value
+
+
+ITEM_SIZE = sys.getsizeof(RAMBackendItem(b""))
+INT_SIZE = sys.getsizeof(2**30)
+FLOAT_SIZE = sys.getsizeof(0.0)
+
+
+class RAMBackendStats:
+    """Keyspace Statistics of the RAM Backend"""
+
+    keys: int = 0
+    used_memory: int = 0  # Approximate Bytes used by Keys and Values
+    keyspace_hits: int = 0
+    keyspace_misses: int = 0
+    expired_keys: int = 0
+    evicted_keys: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Ratio of Key Lookups that found the Key"""
+        lookups = self.keyspace_hits + self.keyspace_misses
+        return self.keyspace_hits / lookups if lookups else 0.0
+
+
+class RAMBackendShard:
+    """Part of a RAM Backend Database with its own Keys and Expire Heap"""
+
+    data: Dict[str, RAMBackendItem]
+    expires: List[Tuple[int, str]]  # Min-Heap of (deadline, key)
+    frequencies: Dict[str, Tuple[int, int]]  # Access Counter and Minute of the last Access for LFU Eviction
+    keys: Optional[List[str]]  # Keys by Slot to sample random Keys, only kept for LFU Eviction
+    slots: Dict[str, int]
+    stats: RAMBackendStats
+
+    def __init__(self, stats: RAMBackendStats, sampling: bool = False):
+        self.data = {}
+        self.expires = []
+        self.frequencies = {}
+        self.keys = [] if sampling else None
+        self.slots = {}
+        self.stats = stats
+
+    def store(self, key: str, item: RAMBackendItem):
+        """Stores an Item and registers its Deadline"""
+        old_item: Optional[RAMBackendItem] = self.data.get(key)
+        if old_item is None:
+            self.stats.keys += 1
+            if self.keys is not None:
+                self.slots[key] = len(self.keys)
+                self.keys.append(key)
+        else:
+            self.stats.used_memory -= sys.getsizeof(key) + ITEM_SIZE + _sizeof_value(old_item.value)
+        self.stats.used_memory += sys.getsizeof(key) + ITEM_SIZE + _sizeof_value(item.value)
+        self.data[key] = item
+        self.add_expire(key, item)
+
+    def remove(self, key: str) -> Optional[RAMBackendItem]:
+        """Removes the Item of a Key"""
+        item: Optional[RAMBackendItem] = self.data.pop(key, None)
+        if item is None:
+            return None
+        self.frequencies.pop(key, None)
+        if self.keys is not None:
+            # Move the last Key into the free Slot so removing stays O(1)
+            slot: int = self.slots.pop(key)
+            last: str = self.keys.pop()
+            if last != key:
+                self.keys[slot] = last
+                self.slots[last] = slot
+        self.stats.keys -= 1
+        self.stats.used_memory -= sys.getsizeof(key) + ITEM_SIZE + _sizeof_value(item.value)
+        return item
+
+    def sample(self, count: int) -> List[str]:
+        """Picks up to `count` random Keys in constant Time"""
+        keys: List[str] = self.keys or []
+        if len(keys) <= count:
+            return list(keys)
+        return [keys[random.randrange(len(keys))] for _ in range(count)]
+
+    def touch(self, key: str):
+        """Moves a Key to the End of the Shard so the Shard stays in LRU Order"""
+        self.data[key] = self.data.pop(key)
+
+    def is_current_expire(self, deadline: int, key: str) -> bool:
+        """Checks if an Expire Heap Entry belongs to the current Item of the Key"""
+        item: Optional[RAMBackendItem] = self.data.get(key)
+        return item is not None and item.deadline == deadline
+
+    def add_expire(self, key: str, item: RAMBackendItem):
+        """Registers the Deadline of a Key in the Expire Heap"""
+        if item.deadline <= 0:
+            return
+        heapq.heappush(self.expires, (item.deadline, key))
+        if len(self.expires) > 2 * len(self.data) + 64:
+            # Drop Entries of deleted or changed Keys
+            self.expires = [(deadline, key) for deadline, key in self.expires if self.is_current_expire(deadline, key)]
+            heapq.heapify(self.expires)
+
+    def next_expire(self) -> Optional[str]:
+        """Gets the Key with the nearest Deadline"""
+        while self.expires and not self.is_current_expire(*self.expires[0]):
+            heapq.heappop(self.expires)
+        return self.expires[0][1] if self.expires else None
+
+    def expire_keys(self, timestamp: int, limit: int = 0) -> int:
+        """Deletes up to `limit` (0 = all) Keys expired at `timestamp` and returns how many were deleted"""
+        deleted = 0
+        while self.expires and self.expires[0][0] <= timestamp and (limit <= 0 or deleted < limit):
+            deadline, key = heapq.heappop(self.expires)
+            if not self.is_current_expire(deadline, key):
+                continue
+            self.remove(key)
+            deleted += 1
+        self.stats.expired_keys += deleted
+        return deleted
+
+
+class RAMBackendDatabase(MutableMapping[str, RAMBackendItem]):
+    """Numbered Database of the RAM Backend split into Shards"""
+
+    shards: List[RAMBackendShard]
+
+    def __init__(self, shards: int = 16, stats: Optional[RAMBackendStats] = None, sampling: bool = False):
+        if shards < 1:
+            raise Exception("A Database needs at least one Shard")
+        stats = stats or RAMBackendStats()
+        self.shards = [RAMBackendShard(stats, sampling) for _ in range(shards)]
+
+    def shard(self, key: str) -> RAMBackendShard:
+        """Gets the Shard of a Key"""
+        return self.shards[hash(key) % len(self.shards)]
+
+    def expire_keys(self, timestamp: int, limit: int = 0) -> int:
+        """Deletes up to `limit` (0 = all) Keys per Shard expired at `timestamp`"""
+        return sum(shard.expire_keys(timestamp, limit) for shard in self.shards)
+
+    def __getitem__(self, key: str) -> RAMBackendItem:
+        return self.shard(key).data[key]
+
+    def __setitem__(self, key: str, item: RAMBackendItem):
+        self.shard(key).store(key, item)
+
+    def __delitem__(self, key: str):
+        if self.shard(key).remove(key) is None:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and key in self.shard(key).data
+
+    def __iter__(self) -> Iterator[str]:
+        for shard in self.shards:
+            yield from list(shard.data)
+
+    def __len__(self) -> int:
+        return sum(len(shard.data) for shard in self.shards)
 
 
 class RAMBackend(InMemoryBackend):
     """Python In Memory Backend"""
 
-    data: Dict[str, RAMBackendItem] = {}
-    SET_IF_NOT_EXIST = "SET_IF_NOT_EXIST"  # NX
-    SET_IF_EXIST = "SET_IF_EXIST"  # XX
+    databases: List[RAMBackendDatabase]
+    db: int
+    expire_task: Optional[asyncio.Task]
+    stats: RAMBackendStats
+    max_keys: int
+    max_memory: int
+    eviction_policy: str
+    NO_EVICTION = "noeviction"
+    ALLKEYS_LRU = "allkeys-lru"
+    VOLATILE_LRU = "volatile-lru"
+    ALLKEYS_LFU = "allkeys-lfu"
+    VOLATILE_TTL = "volatile-ttl"
+    EXPIRE_CYCLE_KEYS = 20  # Max Keys expired per write and per Step of the Expire Sweeper
+    EXPIRE_CYCLE_TIME = 0.25  # Share of the Sweeper Interval one Expire Cycle may take like Redis' Active Expire Cycle
+    EVICTION_SAMPLES = 5  # Keys compared per Eviction like `maxmemory-samples`
+    LFU_INIT_VAL = 5  # Access Counter of new Keys so they don't get evicted immediately
+    LFU_LOG_FACTOR = 10  # Makes the Access Counter grow logarithmically like `lfu-log-factor`
+    LFU_DECAY_TIME = 1  # Minutes after which the Access Counter is decremented like `lfu-decay-time`
+
+    def __init__(
+        self,
+        shards: int = 16,
+        databases: int = 16,
+        max_keys: int = 0,
+        max_memory: int = 0,
+        eviction_policy: str = NO_EVICTION,
+    ):
+        if eviction_policy not in (
+            self.NO_EVICTION,
+            self.ALLKEYS_LRU,
+            self.VOLATILE_LRU,
+            self.ALLKEYS_LFU,
+            self.VOLATILE_TTL,
+        ):
+            raise Exception(f"Eviction Policy '{eviction_policy}' is not Supported")
+        self.stats = RAMBackendStats()
+        sampling: bool = (max_keys > 0 or max_memory > 0) and eviction_policy == self.ALLKEYS_LFU
+        self.databases = [RAMBackendDatabase(shards, self.stats, sampling) for _ in range(databases)]
+        self.db = 0
+        self.expire_task = None
+        self.max_keys = max_keys
+        self.max_memory = max_memory
+        self.eviction_policy = eviction_policy
+        self._shards = [shard for database in self.databases for shard in database.shards]
+        self._eviction_cursor = 0
+        self._expire_cursor = 0
+        self._track_access = (max_keys > 0 or max_memory > 0) and eviction_policy in (
+            self.ALLKEYS_LRU,
+            self.VOLATILE_LRU,
+            self.ALLKEYS_LFU,
+        )
+
+    @property
+    def data(self) -> RAMBackendDatabase:
+        """The selected Database"""
+        return self.databases[self.db]
+
+    def _get_item(self, key: str, read: bool = False) -> Optional[RAMBackendItem]:
+        """Gets the Item of a Key if it exists and is not expired"""
+        shards: List[RAMBackendShard] = self.databases[self.db].shards
+        shard: RAMBackendShard = shards[hash(key) % len(shards)]
+        item: Optional[RAMBackendItem] = shard.data.get(key)
+        if item is not None and 0 < item.deadline <= time.time() * 1000:
+            shard.remove(key)
+            self.stats.expired_keys += 1
+            item = None
+        if item is None:
+            if read:
+                self.stats.keyspace_misses += 1
+            return None
+        if read:
+            self.stats.keyspace_hits += 1
+        if self._track_access:
+            shard.touch(key)
+            if self.eviction_policy == self.ALLKEYS_LFU:
+                self._lfu_access(shard, key)
+        return item
+
+    def _lfu_counter(self, shard: RAMBackendShard, key: str, minute: int) -> int:
+        """Gets the Access Counter of a Key decremented once per `LFU_DECAY_TIME` Minutes since its last Access"""
+        counter, last_access = shard.frequencies.get(key, (self.LFU_INIT_VAL, minute))
+        if self.LFU_DECAY_TIME > 0:
+            counter = max(counter - (minute - last_access) // self.LFU_DECAY_TIME, 0)
+        return counter
+
+    def _lfu_access(self, shard: RAMBackendShard, key: str):
+        """Decays the Access Counter of a Key and increments it with a Probability that shrinks as it grows"""
+        minute = int(time.time() // 60)
+        counter = self._lfu_counter(shard, key, minute)
+        if counter < 255 and random.random() * (max(counter - self.LFU_INIT_VAL, 0) * self.LFU_LOG_FACTOR + 1) < 1:
+            counter += 1
+        shard.frequencies[key] = (counter, minute)
+
+    def _get_set(self, key: str, read: bool = False) -> Optional[Set]:
+        """Gets the Set stored at a Key and converts Lists to Sets in place"""
+        item: Optional[RAMBackendItem] = self._get_item(key, read)
+        if item is None:
+            return None
+        if isinstance(item.value, list):
+            self._set_value(item, set(item.value))
+        if not isinstance(item.value, set):
+            return None
+        return item.value
 
-    async def _check_key_expire(self, key: str, item: RAMBackendItem):
-        """Checks if a Key is expired and deletes it"""
+    def _get_sorted_set(self, key: str, read: bool = False) -> Optional[Dict[Any, float]]:
+        """Gets the Sorted Set stored at a Key as Dict of Members and Scores"""
+        item: Optional[RAMBackendItem] = self._get_item(key, read)
+        if item is None or not isinstance(item.value, dict):
+            return None
+        return item.value
+
+    def _store(self, shard: RAMBackendShard, key: str, value: Any, pexpire: int = 0):
+        """Stores a Value in a Shard after expiring and evicting Keys"""
         timestamp = int(time.time() * 1000)
-        if item.pexpire > 0 and (item.timestamp + item.pexpire) <= timestamp:
-            self.data.pop(key)
-            return False
+        shard.expire_keys(timestamp, self.EXPIRE_CYCLE_KEYS)
+        self._evict(key not in shard.data)
+        shard.store(key, RAMBackendItem(value, timestamp + pexpire if pexpire > 0 else 0))
+        if self._track_access:
+            shard.touch(key)
+            if self.eviction_policy == self.ALLKEYS_LFU:
+                shard.frequencies.setdefault(key, (self.LFU_INIT_VAL, timestamp // 60000))
+
+    def _incr(self, key: str, amount: Any) -> Any:
+        """Adds `amount` to the Int or Float stored at a Key"""
+        item: Optional[RAMBackendItem] = self._get_item(key)
+        if item is None:
+            self._store(self.data.shard(key), key, amount)
+            return amount
+        value: Any = item.value
+        if type(value) is int and type(amount) is int:
+            item.value = value + amount
+            return item.value
+        if type(value) is not int:
+            try:
+                if isinstance(value, bytes):
+                    value = int(value) if type(amount) is int else float(value)
+                elif type(value) is float and (type(amount) is float or value.is_integer()):
+                    value = value if type(amount) is float else int(value)
+                else:
+                    raise ValueError()
+            except ValueError:
+                raise Exception("Value must be a Float" if type(amount) is float else "Value must be a Int")
+        value += amount
+        self._set_value(item, value)
+        return value
+
+    def _set_value(self, item: RAMBackendItem, value: Any):
+        """Changes the Value of an Item in place"""
+        self.stats.used_memory += _sizeof_value(value) - _sizeof_value(item.value)
+        item.value = value
+
+    def _eviction_candidate(self, shard: RAMBackendShard) -> Optional[str]:
+        """Gets the Key of a Shard that should be evicted next"""
+        if self.eviction_policy == self.VOLATILE_TTL:
+            return shard.next_expire()
+        if self.eviction_policy == self.ALLKEYS_LRU:
+            return next(iter(shard.data), None)
+        if self.eviction_policy == self.ALLKEYS_LFU:
+            candidates: List[str] = shard.sample(self.EVICTION_SAMPLES)
+            minute = int(time.time() // 60)
+            return min(candidates, key=lambda key: self._lfu_counter(shard, key, minute), default=None)
+        if self.eviction_policy == self.VOLATILE_LRU:
+            for i, key in enumerate(shard.data):
+                if shard.data[key].deadline > 0:
+                    return key
+                if i >= 16 * self.EVICTION_SAMPLES:
+                    # Fall back to the nearest Deadline if the least recently used Keys don't expire
+                    return shard.next_expire()
+        return None
+
+    def _evict(self, new_key: bool = False, memory: int = 0) -> int:
+        """Evicts Keys until a write of `memory` Bytes fits into `max_keys` and `max_memory`"""
+        evicted: int = 0
+        while (self.max_keys > 0 and self.stats.keys + new_key > self.max_keys) or (
+            self.max_memory > 0 and self.stats.used_memory + memory > self.max_memory
+        ):
+            key: Optional[str] = None
+            for _ in range(len(self._shards)):
+                shard: RAMBackendShard = self._shards[self._eviction_cursor]
+                self._eviction_cursor = (self._eviction_cursor + 1) % len(self._shards)
+                if shard.data and (key := self._eviction_candidate(shard)) is not None:
+                    break
+            if key is None:
+                raise Exception("OOM command not allowed when used memory > 'maxmemory'")
+            shard.remove(key)
+            self.stats.evicted_keys += 1
+            evicted += 1
+        return evicted
+
+    def _expire_keys(self, limit: int = 0) -> int:
+        """Deletes up to `limit` (0 = all) expired Keys per Shard in all Databases"""
+        timestamp = int(time.time() * 1000)
+        return sum(database.expire_keys(timestamp, limit) for database in self.databases)
+
+    async def _expire_cycle(self, budget: float) -> int:
+        """Deletes expired Keys Shard by Shard for up to `budget` Seconds, yielding to the Event Loop after each Step"""
+        start = time.monotonic()
+        timestamp = int(time.time() * 1000)
+        deleted = 0
+        for _ in range(len(self._shards)):
+            shard: RAMBackendShard = self._shards[self._expire_cursor]
+            while True:
+                expired = shard.expire_keys(timestamp, self.EXPIRE_CYCLE_KEYS)
+                deleted += expired
+                if expired < self.EXPIRE_CYCLE_KEYS:
+                    self._expire_cursor = (self._expire_cursor + 1) % len(self._shards)
+                    break
+                if time.monotonic() - start >= budget:
+                    # Continue with this Shard in the next Cycle
+                    return deleted
+                await asyncio.sleep(0)
+            if expired:
+                if time.monotonic() - start >= budget:
+                    break
+                await asyncio.sleep(0)
+        return deleted
+
+    async def _expire_sweeper(self, interval: float):
+        """Background Task that deletes expired Keys every `interval` Seconds"""
+        while True:
+            await self._expire_cycle(interval * self.EXPIRE_CYCLE_TIME)
+            await asyncio.sleep(interval)
+
+    def start_expire_sweeper(self, interval: float = 0.1) -> asyncio.Task:
+        """Starts the Background Task that deletes expired Keys"""
+        if self.expire_task is None or self.expire_task.done():
+            self.expire_task = asyncio.create_task(self._expire_sweeper(interval))
+        return self.expire_task
+
+    async def stop_expire_sweeper(self):
+        """Stops the Background Task that deletes expired Keys"""
+        if self.expire_task is None:
+            return
+        self.expire_task.cancel()
+        try:
+            await self.expire_task
+        except asyncio.CancelledError:
+            pass
+        self.expire_task = None
+
+    async def close(self):
+        """Stops the Expire Sweeper, `RedisDependency.close` calls it on Shutdown"""
+        await self.stop_expire_sweeper()
+
+    async def select(self, db: int) -> bool:
+        """Selects the Database with the Number `db`"""
+        if not 0 <= db < len(self.databases):
+            raise Exception("DB index is out of range")
+        self.db = db
         return True
 
     async def set(self, key: str, value: Any, expire: int = 0, pexpire: int = 0, exists=None):
         """Set Key to Value"""
-        if not isinstance(value, bytes) and not isinstance(value, List):
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        elif type(value) is not int and not isinstance(value, (bytes, list, set)):
             value = bytes(str(value), "utf-8")
+        shard: RAMBackendShard = self.data.shard(key)
         if exists == self.SET_IF_NOT_EXIST:
-            if key in self.data:
+            if key in shard.data:
                 return
         elif exists == self.SET_IF_EXIST:
-            if key not in self.data:
+            if key not in shard.data:
                 return
         elif exists is None:
             pass
         else:
             raise Exception("Wrong Params")
-        self.data[key] = RAMBackendItem(value, pexpire + (expire * 1000))
+        self._store(shard, key, value, pexpire + (expire * 1000))
 
     async def get(self, key: str):
         """Get Value from Key"""
-        item: Optional[RAMBackendItem] = self.data.get(key)
-        if not item:
+        item: Optional[RAMBackendItem] = self._get_item(key, read=True)
+        if item is None:
             return None
-        if not await self._check_key_expire(key, item):
-            return None
-        return item.value
+        return _encode_value(item.value)
 
     async def pttl(self, key: str) -> int:
         """Get PTTL from a Key"""
-        item: Optional[RAMBackendItem] = self.data.get(key)
-        timestamp = int(time.time() * 1000)
-        if not item:
+        if key not in self.data:
             return -2
-        if not await self._check_key_expire(key, item):
+        item: Optional[RAMBackendItem] = self._get_item(key)
+        if item is None or item.deadline == 0:
             return -1
-        if item.pexpire == 0:
-            return -1
-        return (item.pexpire + item.timestamp) - timestamp
+        return item.deadline - int(time.time() * 1000)
 
     async def ttl(self, key: str) -> int:
         """Get TTL from a Key"""
@@ -131,15 +753,11 @@ class RAMBackend(InMemoryBackend):
 
     async def pexpire(self, key: str, pexpire: int) -> bool:
         """Sets and PTTL for a Key"""
-        item: Optional[RAMBackendItem] = self.data.get(key)
-        timestamp = int(time.time() * 1000)
-        if not item:
+        item: Optional[RAMBackendItem] = self._get_item(key)
+        if item is None:
             return False
-        if not await self._check_key_expire(key, item):
-            return False
-        item.timestamp = timestamp
-        item.pexpire = pexpire
-        self.data[key] = item
+        item.deadline = int(time.time() * 1000) + pexpire if pexpire > 0 else 0
+        self.data.shard(key).add_expire(key, item)
         return True
 
     async def expire(self, key: str, expire: int) -> bool:
@@ -148,72 +766,135 @@ class RAMBackend(InMemoryBackend):
 
     async def incr(self, key: str) -> int:
         """Increases an Int Key"""
-        item: Optional[RAMBackendItem] = self.data.get(key)
-        if not item:
-            await self.set(key, 1)
-            return 1
-        try:
-            if not isinstance(item.value, bytes):
-                raise Exception("Value must be a Int")
-            item.value = bytes(str(int(item.value.decode("utf-8")) + 1), "utf-8")
-        except ValueError:
-            raise Exception("Value must be a Int")
-        self.data[key] = item
-        return int(item.value.decode("utf-8"))
+        return self._incr(key, 1)
 
     async def decr(self, key: str) -> int:
         """Decreases an Int Key"""
-        item: Optional[RAMBackendItem] = self.data.get(key)
-        if not item:
-            await self.set(key, -1)
-            return -1
-        try:
-            if not isinstance(item.value, bytes):
-                raise Exception("Value must be a Int")
-            item.value = bytes(str(int(item.value.decode("utf-8")) - 1), "utf-8")
-        except ValueError:
-            raise Exception("Value must be a Int")
-        self.data[key] = item
-        return int(item.value.decode("utf-8"))
+        return self._incr(key, -1)
+
+    async def incrby(self, key: str, amount: int) -> int:
+        """Increases an Int Key by `amount`"""
+        return self._incr(key, int(amount))
+
+    async def decrby(self, key: str, amount: int) -> int:
+        """Decreases an Int Key by `amount`"""
+        return self._incr(key, -int(amount))
+
+    async def incrbyfloat(self, key: str, amount: float) -> float:
+        """Increases a Float Key by `amount`"""
+        return self._incr(key, float(amount))
 
     async def delete(self, key: str):
         """Delete value of a Key"""
-        if key not in self.data:
-            return
-        del self.data[key]
+        self.data.shard(key).remove(key)
 
     async def smembers(self, key: str) -> Set:
         """Gets Set Members"""
-        data: Optional[Union[bytes, List]] = await self.get(key)
-        if not data:
+        item: Optional[RAMBackendItem] = self._get_item(key, read=True)
+        if item is None or not item.value:
             return set()
-        if not isinstance(data, list):
-            return {data}
-        return set(data)
+        if not isinstance(item.value, (list, set)):
+            return {_encode_value(item.value)}
+        return set(item.value)
 
     async def sadd(self, key: str, value: Any) -> bool:
         """Adds a Member to a Set"""
-        data: Union[Optional[Union[bytes, List]], Set] = await self.get(key)
-        if not data or not isinstance(data, List):
-            data = {value}
-        else:
-            data = set(data)
-            data.add(value)
-        await self.set(key, list(data))
+        data: Optional[Set] = self._get_set(key)
+        if data is None:
+            await self.set(key, {value})
+            return True
+        if value in data:
+            return False
+        if self._evict(memory=sys.getsizeof(value)):
+            # Evict before the Write so an OOM Error leaves the Set unchanged, the Set itself may be gone now
+            return await self.sadd(key, value)
+        size = sys.getsizeof(data)
+        data.add(value)
+        self.stats.used_memory += sys.getsizeof(data) - size + sys.getsizeof(value)
         return True
 
     async def srem(self, key: str, member: Any) -> bool:
         """Removes a Member from a Set"""
-        data: Union[Optional[Union[bytes, List]], Set] = await self.get(key)
-        if not data or not isinstance(data, List):
-            return False
-        data = set(data)
-        if member not in data:
+        data: Optional[Set] = self._get_set(key)
+        if not data or member not in data:
             return False
+        if len(data) == 1:
+            del self.data[key]
+            return True
+        size = sys.getsizeof(data)
         data.remove(member)
-        await self.set(key, list(data))
+        self.stats.used_memory += sys.getsizeof(data) - size - sys.getsizeof(member)
+        return True
+
+    async def sismember(self, key: str, member: Any) -> bool:
+        """Checks if a Member is in a Set"""
+        data: Optional[Set] = self._get_set(key, read=True)
+        return data is not None and member in data
+
+    async def smismember(self, key: str, members: List[Any]) -> List[bool]:
+        """Checks for every Member if it is in a Set"""
+        data: Set = self._get_set(key, read=True) or set()
+        return [member in data for member in members]
+
+    async def scard(self, key: str) -> int:
+        """Gets the Number of Members in a Set"""
+        data: Optional[Set] = self._get_set(key, read=True)
+        return 0 if data is None else len(data)
+
+    async def zadd(self, key: str, score: float, member: Any) -> bool:
+        """Adds a Member with a Score to a Sorted Set or updates its Score"""
+        data: Optional[Dict[Any, float]] = self._get_sorted_set(key)
+        if data is None:
+            self._store(self.data.shard(key), key, {member: float(score)})
+            return True
+        if member in data:
+            data[member] = float(score)
+            return False
+        if self._evict(memory=sys.getsizeof(member) + FLOAT_SIZE):
+            # Evict before the Write so an OOM Error leaves the Sorted Set unchanged, it may be gone now
+            return await self.zadd(key, score, member)
+        size = sys.getsizeof(data)
+        data[member] = float(score)
+        self.stats.used_memory += sys.getsizeof(data) - size + sys.getsizeof(member) + FLOAT_SIZE
         return True
 
+    async def zrem(self, key: str, member: Any) -> bool:
+        """Removes a Member from a Sorted Set"""
+        data: Optional[Dict[Any, float]] = self._get_sorted_set(key)
+        if not data or member not in data:
+            return False
+        if len(data) == 1:
+            del self.data[key]
+            return True
+        size = sys.getsizeof(data)
+        del data[member]
+        self.stats.used_memory += sys.getsizeof(data) - size - sys.getsizeof(member) - FLOAT_SIZE
+        return True
+
+    async def zrangebyscore(self, key: str, min_score: float, max_score: float) -> List:
+        """Gets the Members of a Sorted Set with a Score between `min_score` and `max_score` ordered by Score"""
+        data: Dict[Any, float] = self._get_sorted_set(key, read=True) or {}
+        return [
+            member
+            for member, score in sorted(data.items(), key=lambda entry: (entry[1], entry[0]))
+            if min_score <= score <= max_score
+        ]
+
+    async def zremrangebyscore(self, key: str, min_score: float, max_score: float) -> int:
+        """Removes the Members of a Sorted Set with a Score between `min_score` and `max_score`"""
+        item: Optional[RAMBackendItem] = self._get_item(key)
+        if item is None or not isinstance(item.value, dict):
+            return 0
+        remaining: Dict[Any, float] = {
+            member: score for member, score in item.value.items() if not min_score <= score <= max_score
+        }
+        removed: int = len(item.value) - len(remaining)
+        if not remaining:
+            del self.data[key]
+        elif removed:
+            self._set_value(item, remaining)
+        return removed
+
     async def exists(self, key: str) -> bool:
         """Checks if a Key exists"""
-        return key in self.data
+        return self._get_item(key, read=True) is not None
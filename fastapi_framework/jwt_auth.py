@@ -1,22 +1,32 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from os import getenv
-from typing import Dict
+from hashlib import blake2b
+import json
+from os import getenv, stat
+from time import time
+from typing import Dict, Optional, Tuple, Union, Any, List
+from uuid import uuid4
 
 import jwt
 from .redis import Redis
+from .in_memory_backend import InMemoryBackend, Pipeline, Script
 from dotenv import load_dotenv
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPBearer
 from passlib.context import CryptContext
 
 load_dotenv()
 
 SECRET_KEY = getenv("JWT_SECRET_KEY", "")
+JWKS_PATH = getenv("JWT_JWKS_PATH", "")
+KEY_ID = getenv("JWT_KEY_ID", "")
 
 
 def check_secret_key():
-    if SECRET_KEY == "":
-        raise Exception("You have to set a Secret Key for JWT Auth")
+    if SECRET_KEY == "" and JWKS_PATH == "":
+        raise Exception("You have to set a Secret Key or a JWKS File for JWT Auth")
 
 
 check_secret_key()
@@ -24,61 +34,304 @@ check_secret_key()
 ALGORITHM = getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_MINUTES = int(getenv("JWT_REFRESH_TOKEN_EXPIRE_MINUTES", f"{60 * 6}"))
+TOKEN_CACHE_SIZE = int(getenv("JWT_TOKEN_CACHE_SIZE", "0"))
+PASSWORD_HASH_WORKERS = int(getenv("PASSWORD_HASH_WORKERS", "4"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password_hash")
+
+
+async def hash_password(password: str) -> str:
+    """Hashes a Password with `pwd_context` in the Password Worker Pool"""
+    return await asyncio.get_running_loop().run_in_executor(password_executor, pwd_context.hash, password)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    """Verifies a Password against a Hash with `pwd_context` in the Password Worker Pool"""
+    return await asyncio.get_running_loop().run_in_executor(
+        password_executor, pwd_context.verify, password, password_hash
+    )
+
 
 bearer_scheme = HTTPBearer()
 
 
+class TokenCache:
+    """LRU Cache of verified Tokens and their Data until the Tokens expire"""
+
+    size: int
+    entries: "OrderedDict[bytes, Tuple[float, Dict]]"
+    hits: int
+    misses: int
+
+    def __init__(self, size: int = 0):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups: int = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        """Hashes a Token to a short Cache Key"""
+        return blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        """Returns a Copy of the cached Data of a Token if it is cached and not expired"""
+        if not self.size:
+            return None
+        key: bytes = self.digest(token)
+        entry: Optional[Tuple[float, Dict]] = self.entries.get(key)
+        if entry is None or entry[0] <= time():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return dict(entry[1])
+
+    def set(self, token: str, data: Dict):
+        """Caches the verified Data of a Token until its `exp` Claim"""
+        if not self.size:
+            return
+        key: bytes = self.digest(token)
+        self.entries[key] = (float(data["exp"]) if "exp" in data else float("inf"), dict(data))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, token: str):
+        """Removes a Token from the Cache"""
+        self.entries.pop(self.digest(token), None)
+
+    def clear(self):
+        """Removes all Tokens from the Cache"""
+        self.entries.clear()
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
+
+class KeyStore:
+    """Parsed JWT Keys from a JWKS File selected by their `kid`, reloaded when the File changes"""
+
+    path: str
+    key_id: str
+    reload_interval: float
+    keys: Dict[str, jwt.PyJWK]
+    verification_keys: Dict[str, Any]
+    mtime: float
+    checked: float
+
+    def __init__(self, path: str = "", key_id: str = "", reload_interval: float = 1.0):
+        self.path = path
+        self.key_id = key_id
+        self.reload_interval = reload_interval
+        self.keys = {}
+        self.verification_keys = {}
+        self.mtime = 0.0
+        self.checked = 0.0
+        if path:
+            self.reload()
+
+    def load(self, jwks: Dict):
+        """Parses the Keys of a JWKS once into Key Objects"""
+        keys: Dict[str, jwt.PyJWK] = {}
+        for jwk in jwks.get("keys", []):
+            if "kid" in jwk:
+                keys[jwk["kid"]] = jwt.PyJWK(jwk)
+        if set(self.keys) - set(keys):
+            token_cache.clear()
+        self.keys = keys
+        self.verification_keys = {
+            kid: key.key.public_key() if hasattr(key.key, "private_bytes") else key.key for kid, key in keys.items()
+        }
+
+    def reload(self, force: bool = True):
+        """Loads the JWKS File again if it has changed"""
+        now: float = time()
+        if not force and now - self.checked < self.reload_interval:
+            return
+        self.checked = now
+        mtime: float = stat(self.path).st_mtime
+        if mtime == self.mtime:
+            return
+        with open(self.path) as file:
+            self.load(json.load(file))
+        self.mtime = mtime
+
+    def signing_key(self) -> Tuple[Any, str, Optional[str]]:
+        """Returns Key, Algorithm and `kid` to sign new Tokens"""
+        if not self.path:
+            return SECRET_KEY, ALGORITHM, None
+        self.reload(force=False)
+        private_keys: List[str] = [kid for kid, key in self.keys.items() if hasattr(key.key, "private_bytes")]
+        kid: str = self.key_id or (private_keys[0] if private_keys else "")
+        if kid not in self.keys:
+            raise Exception("No Key to sign JWTs found in the JWKS File")
+        return self.keys[kid].key, str(self.keys[kid].algorithm_name), kid
+
+    def verification_key(self, token: str) -> Tuple[Any, List[str]]:
+        """Returns Key and allowed Algorithms to verify a Token by its `kid`, without `kid` the Secret Key is used"""
+        header: Dict[str, Any] = jwt.get_unverified_header(token)
+        kid: Optional[str] = header.get("kid")
+        if not self.path:
+            return SECRET_KEY, [ALGORITHM]
+        self.reload(force=False)
+        if kid is None:
+            if not SECRET_KEY or header.get("alg") != ALGORITHM:
+                raise jwt.exceptions.InvalidTokenError("Token has no Key ID")
+            return SECRET_KEY, [ALGORITHM]
+        if kid not in self.keys:
+            raise jwt.exceptions.InvalidTokenError(f"Unknown Key ID '{kid}'")
+        return self.verification_keys[kid], [str(self.keys[kid].algorithm_name)]
+
+
+key_store = KeyStore(JWKS_PATH, KEY_ID)
+
+
 async def get_token(token=Depends(bearer_scheme)) -> str:
     """Fastapi Dependency to get the JWT/Bearer Token"""
     return str(token.credentials)
 
 
+def create_jwt_token_sync(
+    data: dict, expires_delta: timedelta, signing_key: Optional[Tuple[Any, str, Optional[str]]] = None
+) -> str:
+    """Creates an JWT Token with `data` and `expire_delta` without the Event Loop"""
+    key, algorithm, kid = signing_key or key_store.signing_key()
+    return jwt.encode(
+        {**data, "exp": datetime.utcnow() + expires_delta},
+        key,
+        algorithm=algorithm,
+        headers={"kid": kid} if kid else None,
+    )
+
+
 async def create_jwt_token(data: dict, expires_delta: timedelta) -> str:
     """Creates an JWT Token with `data` and `expire_delta`"""
-    data = data.copy()
-    expire = datetime.utcnow() + expires_delta
-    data.update({"exp": expire})
-    encoded_jwt = jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-
-async def get_data(token: str = Depends(get_token)) -> Dict:
-    """Fastapi Dependency to get JWT Data from the User"""
-    try:
-        data = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except jwt.exceptions.InvalidTokenError as e:
-        if isinstance(e, jwt.exceptions.ExpiredSignatureError):
-            raise HTTPException(status_code=401, detail="Token is expired")
-        raise HTTPException(status_code=401, detail="Token is invalid")
+    return create_jwt_token_sync(data, expires_delta)
+
+
+async def get_data(token: str = Depends(get_token), request: Request = None) -> Dict:  # type: ignore
+    """Fastapi Dependency to get JWT Data from the User, decoded only once per Request"""
+    cached: Optional[Tuple[str, Dict]] = getattr(request.state, "jwt_data", None) if request is not None else None
+    if cached is not None and cached[0] == token:
+        return cached[1]
+    if key_store.path:
+        # removing a Key from the JWKS File clears the Token Cache
+        key_store.reload(force=False)
+    data: Optional[Dict] = token_cache.get(token)
+    if data is None:
+        try:
+            key, algorithms = key_store.verification_key(token)
+            data = jwt.decode(token, key, algorithms=algorithms)
+        except jwt.exceptions.InvalidTokenError as e:
+            if isinstance(e, jwt.exceptions.ExpiredSignatureError):
+                raise HTTPException(status_code=401, detail="Token is expired")
+            raise HTTPException(status_code=401, detail="Token is invalid")
+        token_cache.set(token, data)
+    if request is not None:
+        request.state.jwt_data = (token, data)
     return data
 
 
+def create_access_token_sync(data: Dict, signing_key: Optional[Tuple[Any, str, Optional[str]]] = None) -> str:
+    """Creates an JWT Access Token with `data` without the Event Loop"""
+    return create_jwt_token_sync(data, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES), signing_key)
+
+
 async def create_access_token(data: Dict) -> str:
     """Creates an JWT Access Token with `data` and expires after `JWT_ACCESS_TOKEN_EXPIRE_MINUTES`"""
-    return await create_jwt_token(data, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    return create_access_token_sync(data)
+
+
+def add_refresh_token(
+    pipeline: Pipeline, user_id: int, signing_key: Optional[Tuple[Any, str, Optional[str]]] = None
+) -> str:
+    """Creates an Refresh Token with the `user_id` and adds its Redis Commands to `pipeline`"""
+    refresh_token_data: Dict = {"user_id": user_id, "jti": uuid4().hex}
+    refresh_token: str = create_jwt_token_sync(
+        refresh_token_data, timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES), signing_key
+    )
+    digest: str = TokenCache.digest(refresh_token).hex()
+    now: int = int(time())
+    (
+        pipeline.set(f"refresh_token:{digest}", user_id, expire=REFRESH_TOKEN_EXPIRE_MINUTES * 60)
+        .zadd(get_user_tokens_key(user_id), now + REFRESH_TOKEN_EXPIRE_MINUTES * 60, digest)
+        .zremrangebyscore(get_user_tokens_key(user_id), 0, now)
+        .expire(get_user_tokens_key(user_id), REFRESH_TOKEN_EXPIRE_MINUTES * 60)
+    )
+    return refresh_token
 
 
 async def create_refresh_token(user_id: int, redis: Redis) -> str:
     """Creates an Refresh Token with the `user_id` and needs `redis`"""
-    refresh_token_data: Dict = {"user_id": user_id}
-    refresh_token: str = await create_jwt_token(refresh_token_data, timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES))
-    await redis.sadd("refresh_tokens", refresh_token)
+    pipeline: Pipeline = redis.transaction()
+    refresh_token: str = add_refresh_token(pipeline, user_id)
+    await pipeline.execute()
     return refresh_token
 
 
+def get_refresh_token_key(refresh_token: str) -> str:
+    """Returns the Redis Key of a Refresh Token"""
+    return f"refresh_token:{TokenCache.digest(refresh_token).hex()}"
+
+
+def get_user_tokens_key(user_id: int) -> str:
+    """Returns the Redis Key of the Sorted Set with the Refresh Token Hashes of a User scored by their Expiry"""
+    return f"refresh_tokens:user:{user_id}"
+
+
 async def invalidate_refresh_token(refresh_token: str, redis: Redis) -> None:
     """Invalidates a Refresh Token"""
-    await redis.srem("refresh_tokens", refresh_token)
+    token_cache.invalidate(refresh_token)
+    key: str = get_refresh_token_key(refresh_token)
+    user_id: Optional[bytes] = await redis.get(key)
+    transaction = redis.transaction().delete(key).srem("refresh_tokens", refresh_token)
+    if user_id is not None:
+        transaction.zrem(get_user_tokens_key(int(user_id)), key.split(":", 1)[1])
+    await transaction.execute()
+
+
+REVOKE_USER_TOKENS_LUA = """
+local digests = redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[1], '+inf')
+for _, digest in ipairs(digests) do
+    redis.call('DEL', 'refresh_token:' .. digest)
+end
+redis.call('DEL', KEYS[1])
+return #digests
+"""
+
+
+async def delete_user_tokens(redis: InMemoryBackend, keys: List[str], args: List[Any]) -> int:
+    """Deletes the indexed Refresh Tokens and the Index, same as REVOKE_USER_TOKENS_LUA"""
+    digests: List[Union[str, bytes]] = await redis.zrangebyscore(keys[0], float(args[0]), float("inf"))
+    for digest in digests:
+        await redis.delete(f"refresh_token:{digest.decode('utf-8') if isinstance(digest, bytes) else digest}")
+    await redis.delete(keys[0])
+    return len(digests)
 
 
-async def check_refresh_token(refresh_token: str, redis: Redis) -> bool:
-    """Checks if a Refresh Token is valid (in Redis Cache)"""
-    refresh_tokens = [refresh_token.decode("utf-8") for refresh_token in await redis.smembers("refresh_tokens")]
-    if refresh_token in refresh_tokens:
+REVOKE_USER_TOKENS_SCRIPT = Script(REVOKE_USER_TOKENS_LUA, delete_user_tokens)
+
+
+async def revoke_user_tokens(user_id: int, redis: Redis) -> int:
+    """Invalidates all Refresh Tokens of a User and returns the Number of Tokens that weren't expired"""
+    return int(await redis.eval_script(REVOKE_USER_TOKENS_SCRIPT, [get_user_tokens_key(user_id)], [time()]))
+
+
+async def check_refresh_token(refresh_token: str, redis: Redis, max_lag: Optional[float] = None) -> bool:
+    """Checks if a Refresh Token is valid (in Redis or the legacy Set), Replicas may lag up to `max_lag` Seconds"""
+    replica: Redis = redis.replica(max_lag)
+    if await replica.exists(get_refresh_token_key(refresh_token)):
         return True
-    return False
+    return await replica.sismember("refresh_tokens", refresh_token)
 
 
 async def generate_tokens(data: Dict, user_id: int, redis: Redis) -> Dict:
@@ -86,3 +339,19 @@ async def generate_tokens(data: Dict, user_id: int, redis: Redis) -> Dict:
     access_token: str = await create_access_token(data)
     refresh_token: str = await create_refresh_token(int(user_id), redis)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+async def generate_tokens_many(users: List[Tuple[Dict, int]], redis: Redis) -> List[Dict]:
+    """Generates Access and Refresh Tokens for many `(data, user_id)` Pairs with one Redis Pipeline"""
+    signing_key: Tuple[Any, str, Optional[str]] = key_store.signing_key()
+    pipeline: Pipeline = redis.pipeline()
+    tokens: List[Dict] = [
+        {
+            "access_token": create_access_token_sync(data, signing_key),
+            "refresh_token": add_refresh_token(pipeline, int(user_id), signing_key),
+            "token_type": "bearer",
+        }
+        for data, user_id in users
+    ]
+    await pipeline.execute()
+    return tokens
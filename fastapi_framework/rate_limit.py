@@ -1,12 +1,303 @@
-from typing import Union, Callable, Dict, Coroutine, Optional, Any
+from base64 import urlsafe_b64encode
+from hashlib import blake2b
+from math import ceil
+from time import time
+from typing import Union, Callable, Dict, Coroutine, Optional, Any, List, Tuple
 
 from fastapi import Request, HTTPException, Response
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security import HTTPAuthorizationCredentials
 
-from .in_memory_backend import InMemoryBackend
-from .jwt_auth import get_data
+from .in_memory_backend import InMemoryBackend, Script
+from .jwt_auth import get_data, bearer_scheme
 from .modules import disabled_modules
 
+FIXED_WINDOW_LUA = """
+local cost = tonumber(ARGV[1])
+local tiers = #KEYS / 2
+local denied = {0, 0, -1, 0}
+for i = 1, tiers do
+    if redis.call('EXISTS', KEYS[2 * i]) == 1 then
+        local pttl = redis.call('PTTL', KEYS[2 * i])
+        if pttl > denied[3] then
+            denied = {0, 0, pttl, i - 1}
+        end
+    end
+end
+if denied[3] >= 0 then
+    return denied
+end
+local result = {1, -1, 0, 0}
+for i = 1, tiers do
+    local limit = tonumber(ARGV[2 * i])
+    local count = redis.call('INCRBY', KEYS[2 * i - 1], cost)
+    local pttl = redis.call('PTTL', KEYS[2 * i - 1])
+    if pttl < 0 then
+        pttl = tonumber(ARGV[2 * i + 1])
+        redis.call('PEXPIRE', KEYS[2 * i - 1], pttl)
+    end
+    if count >= limit then
+        redis.call('DEL', KEYS[2 * i - 1])
+        redis.call('SET', KEYS[2 * i], 1, 'PX', pttl)
+    end
+    local remaining = math.max(limit - count, 0)
+    if result[2] < 0 or remaining < result[2] or (remaining == result[2] and pttl > result[3]) then
+        result = {1, remaining, pttl, i - 1}
+    end
+end
+return result
+"""
+
+SLIDING_WINDOW_LOG_LUA = """
+local cost = tonumber(ARGV[1])
+local tiers = #KEYS / 2
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local counts = {}
+local denied = {0, 0, -1, 0}
+for i = 1, tiers do
+    local limit = tonumber(ARGV[2 * i])
+    local window = tonumber(ARGV[2 * i + 1])
+    redis.call('ZREMRANGEBYSCORE', KEYS[2 * i - 1], '-inf', now - window)
+    counts[i] = redis.call('ZCARD', KEYS[2 * i - 1])
+    if counts[i] + cost > limit then
+        local reset = window
+        local oldest = redis.call('ZRANGE', KEYS[2 * i - 1], 0, 0, 'WITHSCORES')
+        if oldest[2] then
+            reset = tonumber(oldest[2]) + window - now
+        end
+        if reset > denied[3] then
+            denied = {0, 0, reset, i - 1}
+        end
+    end
+end
+if denied[3] >= 0 then
+    return denied
+end
+local result = {1, -1, 0, 0}
+for i = 1, tiers do
+    local limit = tonumber(ARGV[2 * i])
+    local window = tonumber(ARGV[2 * i + 1])
+    for j = 1, cost do
+        redis.call('ZADD', KEYS[2 * i - 1], now, now .. ':' .. (counts[i] + j))
+    end
+    local oldest = redis.call('ZRANGE', KEYS[2 * i - 1], 0, 0, 'WITHSCORES')
+    local reset = tonumber(oldest[2]) + window - now
+    redis.call('PEXPIRE', KEYS[2 * i - 1], reset)
+    local remaining = math.max(limit - counts[i] - cost, 0)
+    if result[2] < 0 or remaining < result[2] or (remaining == result[2] and reset > result[3]) then
+        result = {1, remaining, reset, i - 1}
+    end
+end
+return result
+"""
+
+SLIDING_WINDOW_COUNTER_LUA = """
+local cost = tonumber(ARGV[1])
+local tiers = #KEYS / 2
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local states = {}
+local denied = {0, 0, -1, 0}
+for i = 1, tiers do
+    local limit = tonumber(ARGV[2 * i])
+    local window = tonumber(ARGV[2 * i + 1])
+    local index = math.floor(now / window)
+    local state = redis.call('HMGET', KEYS[2 * i - 1], 'index', 'current', 'previous')
+    local current = tonumber(state[2]) or 0
+    local previous = tonumber(state[3]) or 0
+    local last = tonumber(state[1]) or index
+    if last == index - 1 then
+        previous = current
+        current = 0
+    elseif last < index - 1 then
+        previous = 0
+        current = 0
+    end
+    local elapsed = now - index * window
+    local count = math.floor(previous * (window - elapsed) / window) + current
+    states[i] = {index, current, previous, elapsed, count}
+    if count + cost > limit and window - elapsed > denied[3] then
+        denied = {0, 0, window - elapsed, i - 1}
+    end
+end
+if denied[3] >= 0 then
+    return denied
+end
+local result = {1, -1, 0, 0}
+for i = 1, tiers do
+    local limit = tonumber(ARGV[2 * i])
+    local window = tonumber(ARGV[2 * i + 1])
+    local state = states[i]
+    redis.call('HSET', KEYS[2 * i - 1], 'index', state[1], 'current', state[2] + cost, 'previous', state[3])
+    redis.call('PEXPIRE', KEYS[2 * i - 1], 2 * window - state[4])
+    local remaining = math.max(limit - state[5] - cost, 0)
+    local reset = window - state[4]
+    if result[2] < 0 or remaining < result[2] or (remaining == result[2] and reset > result[3]) then
+        result = {1, remaining, reset, i - 1}
+    end
+end
+return result
+"""
+
+GCRA_LUA = """
+local cost = tonumber(ARGV[1])
+local tiers = #KEYS / 2
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000000 + tonumber(time[2])
+local states = {}
+local denied = {0, 0, -1, 0}
+for i = 1, tiers do
+    local limit = tonumber(ARGV[2 * i])
+    local emission = math.max(math.floor(tonumber(ARGV[2 * i + 1]) * 1000 / limit), 1)
+    local tat = math.max(tonumber(redis.call('GET', KEYS[2 * i - 1])) or now, now)
+    local new_tat = tat + emission * cost
+    local allow_at = new_tat - emission * limit
+    states[i] = {emission, new_tat, allow_at}
+    if allow_at > now and math.ceil((allow_at - now) / 1000) > denied[3] then
+        denied = {0, 0, math.ceil((allow_at - now) / 1000), i - 1}
+    end
+end
+if denied[3] >= 0 then
+    return denied
+end
+local result = {1, -1, 0, 0}
+for i = 1, tiers do
+    local state = states[i]
+    local reset = math.ceil((state[2] - now) / 1000)
+    redis.call('SET', KEYS[2 * i - 1], string.format('%d', state[2]), 'PX', reset)
+    local remaining = math.floor((now - state[3]) / state[1])
+    if result[2] < 0 or remaining < result[2] or (remaining == result[2] and reset > result[3]) then
+        result = {1, remaining, reset, i - 1}
+    end
+end
+return result
+"""
+
+
+def _restrict(result: List[int], remaining: int, reset: int, tier: int) -> List[int]:
+    """Returns the more restrictive of an allowed Result and an allowed Tier"""
+    if result[1] < 0 or remaining < result[1] or (remaining == result[1] and reset > result[2]):
+        return [1, remaining, reset, tier]
+    return result
+
+
+def _tiers(args: List[Any]) -> List[Tuple[int, int]]:
+    """Splits the Script Args into (Limit, Window) per Tier"""
+    return [(int(args[i]), int(args[i + 1])) for i in range(1, len(args), 2)]
+
+
+async def fixed_window(redis: InMemoryBackend, keys: List[str], args: List[Any]) -> List[int]:
+    """Fixed Window Check and Update with a Lock Key per Tier, same as FIXED_WINDOW_LUA"""
+    cost: int = int(args[0])
+    denied: List[int] = [0, 0, -1, 0]
+    for tier in range(len(keys) // 2):
+        if await redis.exists(keys[2 * tier + 1]):
+            pttl: int = await redis.pttl(keys[2 * tier + 1])
+            if pttl > denied[2]:
+                denied = [0, 0, pttl, tier]
+    if denied[2] >= 0:
+        return denied
+    result: List[int] = [1, -1, 0, 0]
+    for tier, (limit, window) in enumerate(_tiers(args)):
+        key, lock_key = keys[2 * tier], keys[2 * tier + 1]
+        count: int = await redis.incrby(key, cost)
+        pttl = await redis.pttl(key)
+        if pttl < 0:
+            pttl = window
+            await redis.pexpire(key, pttl)
+        if count >= limit:
+            await redis.delete(key)
+            await redis.set(lock_key, 1, pexpire=pttl)
+        result = _restrict(result, max(limit - count, 0), pttl, tier)
+    return result
+
+
+async def sliding_window_log(redis: InMemoryBackend, keys: List[str], args: List[Any]) -> List[int]:
+    """Sliding Window Log Check and Update per Tier, same as SLIDING_WINDOW_LOG_LUA"""
+    cost: int = int(args[0])
+    now: int = int(time() * 1000)
+    logs: List[List[int]] = []
+    denied: List[int] = [0, 0, -1, 0]
+    for tier, (limit, window) in enumerate(_tiers(args)):
+        value: Optional[bytes] = await redis.get(keys[2 * tier])
+        log: List[int] = [
+            timestamp for timestamp in map(int, value.split() if value else []) if timestamp > now - window
+        ]
+        logs.append(log)
+        if len(log) + cost > limit:
+            reset: int = log[0] + window - now if log else window
+            if reset > denied[2]:
+                denied = [0, 0, reset, tier]
+    if denied[2] >= 0:
+        return denied
+    result: List[int] = [1, -1, 0, 0]
+    for tier, (limit, window) in enumerate(_tiers(args)):
+        log = logs[tier] + [now] * cost
+        reset = log[0] + window - now
+        await redis.set(keys[2 * tier], " ".join(map(str, log)), pexpire=reset)
+        result = _restrict(result, max(limit - len(log), 0), reset, tier)
+    return result
+
+
+async def sliding_window_counter(redis: InMemoryBackend, keys: List[str], args: List[Any]) -> List[int]:
+    """Sliding Window Counter Check and Update per Tier, same as SLIDING_WINDOW_COUNTER_LUA"""
+    cost: int = int(args[0])
+    now: int = int(time() * 1000)
+    states: List[Tuple[int, int, int, int, int]] = []
+    denied: List[int] = [0, 0, -1, 0]
+    for tier, (limit, window) in enumerate(_tiers(args)):
+        index: int = now // window
+        value: Optional[bytes] = await redis.get(keys[2 * tier])
+        last, current, previous = map(int, value.split()) if value else (index, 0, 0)
+        if last == index - 1:
+            previous, current = current, 0
+        elif last < index - 1:
+            previous, current = 0, 0
+        elapsed: int = now - index * window
+        count: int = previous * (window - elapsed) // window + current
+        states.append((index, current, previous, elapsed, count))
+        if count + cost > limit and window - elapsed > denied[2]:
+            denied = [0, 0, window - elapsed, tier]
+    if denied[2] >= 0:
+        return denied
+    result: List[int] = [1, -1, 0, 0]
+    for tier, (limit, window) in enumerate(_tiers(args)):
+        index, current, previous, elapsed, count = states[tier]
+        await redis.set(keys[2 * tier], f"{index} {current + cost} {previous}", pexpire=2 * window - elapsed)
+        result = _restrict(result, max(limit - count - cost, 0), window - elapsed, tier)
+    return result
+
+
+async def gcra(redis: InMemoryBackend, keys: List[str], args: List[Any]) -> List[int]:
+    """Generic Cell Rate Algorithm Check and Update per Tier, same as GCRA_LUA"""
+    cost: int = int(args[0])
+    now: int = int(time() * 1000000)
+    states: List[Tuple[int, int, int]] = []
+    denied: List[int] = [0, 0, -1, 0]
+    for tier, (limit, window) in enumerate(_tiers(args)):
+        emission: int = max(window * 1000 // limit, 1)
+        value: Optional[bytes] = await redis.get(keys[2 * tier])
+        tat: int = max(int(value) if value else now, now)
+        new_tat: int = tat + emission * cost
+        allow_at: int = new_tat - emission * limit
+        states.append((emission, new_tat, allow_at))
+        if allow_at > now and ceil((allow_at - now) / 1000) > denied[2]:
+            denied = [0, 0, ceil((allow_at - now) / 1000), tier]
+    if denied[2] >= 0:
+        return denied
+    result: List[int] = [1, -1, 0, 0]
+    for tier, (emission, new_tat, allow_at) in enumerate(states):
+        reset: int = ceil((new_tat - now) / 1000)
+        await redis.set(keys[2 * tier], new_tat, pexpire=reset)
+        result = _restrict(result, (now - allow_at) // emission, reset, tier)
+    return result
+
+
+FIXED_WINDOW_SCRIPT = Script(FIXED_WINDOW_LUA, fixed_window)
+SLIDING_WINDOW_LOG_SCRIPT = Script(SLIDING_WINDOW_LOG_LUA, sliding_window_log)
+SLIDING_WINDOW_COUNTER_SCRIPT = Script(SLIDING_WINDOW_COUNTER_LUA, sliding_window_counter)
+GCRA_SCRIPT = Script(GCRA_LUA, gcra)
+
 
 async def default_callback(headers: Dict):
     """Default Error Callback when get Raid Limited"""
@@ -21,12 +312,15 @@ async def default_get_uuid(request: Request) -> str:
 
 
 async def get_uuid_user_id(request: Request):
-    """Getter for UUID working with User IDs from the JWTs"""
-    bearer_auth: Optional[HTTPAuthorizationCredentials] = await HTTPBearer()(request)
+    """Getter for UUID working with User IDs from the JWTs, reuses the decoded Token of the Request"""
+    cached: Optional[Tuple[str, Dict]] = getattr(request.state, "jwt_data", None)
+    if cached is not None:
+        return f"{cached[1]['user_id']}"
+    bearer_auth: Optional[HTTPAuthorizationCredentials] = await bearer_scheme(request)
     if not bearer_auth:
         raise Exception("Cant get HTTPBearer Auth Token")
     token: str = bearer_auth.credentials
-    data: Dict = await get_data(token)
+    data: Dict = await get_data(token, request)
     return f"{data['user_id']}"
 
 
@@ -52,6 +346,83 @@ class RateLimitManager:
         cls.callback = callback
 
 
+class LocalRateLimitEntry:
+    """Last synced State of a Rate Limit Key in the Local Rate Limit Cache"""
+
+    __slots__ = ("pending", "remaining", "deadline", "locked", "tier")
+
+    pending: int
+    remaining: int
+    deadline: float
+    locked: bool
+    tier: int
+
+    def __init__(self, remaining: int, deadline: float, locked: bool, tier: int):
+        self.pending = 0
+        self.remaining = remaining
+        self.deadline = deadline
+        self.locked = locked
+        self.tier = tier
+
+
+class LocalRateLimitCache:
+    """In Process Cache of Lock States and unsynced Counts in front of the Backend"""
+
+    batch_size: int
+    max_keys: int
+    entries: Dict[str, LocalRateLimitEntry]
+
+    def __init__(self, batch_size: int = 1, max_keys: int = 10000):
+        if batch_size < 1:
+            raise Exception("The Batch Size must be at least 1")
+        self.batch_size = batch_size
+        self.max_keys = max_keys
+        self.entries = {}
+
+    def _get_entry(self, key: str, now: float) -> Optional[LocalRateLimitEntry]:
+        entry: Optional[LocalRateLimitEntry] = self.entries.get(key)
+        if entry is not None and entry.deadline <= now:
+            del self.entries[key]
+            return None
+        return entry
+
+    def check(self, key: str) -> Optional[List[int]]:
+        """Returns the Result for a Request if it can be decided without the Backend"""
+        now: float = time() * 1000
+        entry: Optional[LocalRateLimitEntry] = self._get_entry(key, now)
+        if entry is None:
+            return None
+        if entry.locked:
+            return [0, 0, ceil(entry.deadline - now), entry.tier]
+        if entry.pending + 1 < min(self.batch_size, entry.remaining):
+            entry.pending += 1
+            return [1, entry.remaining - entry.pending, ceil(entry.deadline - now), entry.tier]
+        return None
+
+    def cost(self, key: str) -> int:
+        """Takes the unsynced Requests for the next Sync and returns its Cost including the Request itself"""
+        entry: Optional[LocalRateLimitEntry] = self._get_entry(key, time() * 1000)
+        if entry is None:
+            return 1
+        cost: int = entry.pending + 1
+        # concurrent Requests must neither send these Requests again nor use their Quota before the Sync returns
+        entry.pending = 0
+        entry.remaining -= cost
+        return cost
+
+    def update(self, key: str, result: List[int]):
+        """Stores the Result of a Sync with the Backend"""
+        allowed, remaining, reset, tier = result
+        previous: Optional[LocalRateLimitEntry] = self.entries.pop(key, None)
+        entry: LocalRateLimitEntry = LocalRateLimitEntry(remaining, time() * 1000 + reset, not allowed, tier)
+        if previous is not None:
+            # Requests counted locally while the Sync was running are sent with the next Sync
+            entry.pending = previous.pending
+        self.entries[key] = entry
+        if len(self.entries) > self.max_keys:
+            del self.entries[next(iter(self.entries))]
+
+
 class RateLimitTime:
     __milliseconds: int
 
@@ -66,24 +437,64 @@ class RateLimitTime:
 class RateLimiter:
     """Raid Limit Dependency"""
 
+    FIXED_WINDOW = "fixed_window"
+    SLIDING_WINDOW_LOG = "sliding_window_log"
+    SLIDING_WINDOW_COUNTER = "sliding_window_counter"
+    GCRA = "gcra"
+
+    SCRIPTS: Dict[str, Script] = {
+        FIXED_WINDOW: FIXED_WINDOW_SCRIPT,
+        SLIDING_WINDOW_LOG: SLIDING_WINDOW_LOG_SCRIPT,
+        SLIDING_WINDOW_COUNTER: SLIDING_WINDOW_COUNTER_SCRIPT,
+        GCRA: GCRA_SCRIPT,
+    }
+
     count: int
     time: RateLimitTime
+    tiers: List[Tuple[int, RateLimitTime]]
     get_uuid: Union[Callable, None]
     callback: Union[Callable, None]
+    strategy: str
+    local_cache: Optional[LocalRateLimitCache]
+    headers: bool
+    scope: Optional[str]
+    route_template: bool
+    hash_keys: bool
 
     def __init__(
         self,
-        count,
-        time: RateLimitTime,
+        count: Union[int, List[Tuple[int, RateLimitTime]]],
+        time: Optional[RateLimitTime] = None,
         get_uuid: Union[Callable, None] = None,
         callback: Union[Callable, None] = None,
+        strategy: str = FIXED_WINDOW,
+        local_batch_size: int = 0,
+        headers: bool = True,
+        scope: Optional[str] = None,
+        route_template: bool = False,
+        hash_keys: bool = False,
     ):
         if "rate_limit" in disabled_modules:
             raise Exception("Module Rate Limit is disabled")
-        self.time = time
-        self.count = count
+        if strategy not in self.SCRIPTS:
+            raise Exception(f"Rate Limit Strategy '{strategy}' is not Supported")
+        if isinstance(count, list):
+            self.tiers = count
+        elif time is not None:
+            self.tiers = [(count, time)]
+        else:
+            raise Exception("A Rate Limit needs a Time or a List of (Count, Time) Tiers")
+        if not self.tiers:
+            raise Exception("A Rate Limit needs at least one Tier")
+        self.count, self.time = self.tiers[0]
         self.get_uuid = get_uuid
         self.callback = callback
+        self.strategy = strategy
+        self.local_cache = LocalRateLimitCache(local_batch_size) if local_batch_size else None
+        self.headers = headers
+        self.scope = scope
+        self.route_template = route_template
+        self.hash_keys = hash_keys
 
     async def __call__(self, request: Request, response: Response):
         if not RateLimitManager.redis:
@@ -95,37 +506,45 @@ class RateLimiter:
 
         if isinstance(uuid, Coroutine):
             uuid = await uuid
-        redis_key: str = f"rate_limit:{request.url.path}:{uuid}"
-        redis_key_lock: str = f"{redis_key}:lock"
-        if await RateLimitManager.redis.exists(redis_key_lock):
-            headers = await self.get_headers(redis_key)
-            result: Any = callback(headers)
-            if isinstance(result, Coroutine):
-                await result
+        redis_key: str = self.get_key(request, f"{uuid}")
+        result: Optional[List[int]] = None if self.local_cache is None else self.local_cache.check(redis_key)
+        if result is None:
+            cost: int = 1 if self.local_cache is None else self.local_cache.cost(redis_key)
+            base_key: str = RateLimitManager.redis.hash_tag(redis_key)
+            keys: List[str] = []
+            args: List[int] = [cost]
+            for tier, (tier_count, tier_time) in enumerate(self.tiers):
+                tier_key: str = base_key if tier == 0 else f"{base_key}:{tier}"
+                keys += [tier_key, f"{tier_key}:lock"]
+                args += [tier_count, tier_time.milliseconds]
+            result = await RateLimitManager.redis.eval_script(self.SCRIPTS[self.strategy], keys, args)
+            if self.local_cache is not None:
+                self.local_cache.update(redis_key, result)
+        allowed, remaining, reset, tier = result
+        headers: Dict = self.build_headers(remaining, reset, tier) if self.headers else {}
+        if not allowed:
+            callback_result: Any = callback(headers)
+            if isinstance(callback_result, Coroutine):
+                await callback_result
             return
+        response.headers.update(headers)
+
+    def get_key(self, request: Request, uuid: str) -> str:
+        """Generates the Backend Key for a Request from the Scope or Path and the UUID"""
+        name: str = request.url.path
+        if self.scope is not None:
+            name = self.scope
+        elif self.route_template and request.scope.get("route") is not None:
+            name = request.scope["route"].path
+        if self.hash_keys:
+            digest: bytes = blake2b(f"{name}:{uuid}".encode("utf-8"), digest_size=12).digest()
+            return f"rl:{urlsafe_b64encode(digest).decode('ascii')}"
+        return f"rate_limit:{name}:{uuid}"
 
-        count = await RateLimitManager.redis.incr(redis_key)
-        if count == 1:
-            await RateLimitManager.redis.pexpire(redis_key, self.time.milliseconds)
-        if count >= self.count:
-            pttl: int = await RateLimitManager.redis.pttl(redis_key)
-            await RateLimitManager.redis.delete(redis_key)
-            await RateLimitManager.redis.set(redis_key_lock, 1, pexpire=pttl)
-        headers = await self.get_headers(redis_key)
-        for key in headers.keys():
-            response.headers[key] = headers[key]
-
-    async def get_headers(self, redis_key: str) -> Dict:
-        """Generates Rate Limit Headers"""
-        headers: Dict = {}
-        redis_value = await RateLimitManager.redis.get(redis_key)
-        redis_value = redis_value if redis_value is None else redis_value.decode("utf-8")
-        headers["X-Rate-Limit-Limit"] = f"{self.count}"
-        headers["X-Rate-Limit-Remaining"] = str(
-            redis_value or (0 if await RateLimitManager.redis.exists(f"{redis_key}:lock") else self.count)
-        )
-        ttl: int = await RateLimitManager.redis.ttl(redis_key)
-        ttl = ttl if ttl != -2 else await RateLimitManager.redis.ttl(f"{redis_key}:lock")
-        ttl = ttl if ttl != -2 else 0
-        headers["X-Rate-Limit-Reset"] = f"{ttl}"
-        return headers
+    def build_headers(self, remaining: int, reset: int, tier: int = 0) -> Dict:
+        """Generates Rate Limit Headers from the Result of a Strategy Script"""
+        return {
+            "X-Rate-Limit-Limit": f"{self.tiers[tier][0]}",
+            "X-Rate-Limit-Remaining": f"{remaining}",
+            "X-Rate-Limit-Reset": f"{ceil(reset / 1000)}",
+        }
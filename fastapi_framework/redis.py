@@ -1,10 +1,22 @@
-from typing import Set, Any, Optional
+import asyncio
+import random
+from collections import deque, OrderedDict
+from copy import copy
+from typing import Set, Any, Optional, List, Tuple, Dict, Callable, Deque, Awaitable
 
-from aioredis import create_redis_pool
-from aioredis import Redis as RedisConnection
+from redis.asyncio import BlockingConnectionPool, ConnectionPool
+from redis.asyncio import Redis as RedisConnection
+from redis.asyncio.client import Pipeline as RedisPipeline, PubSub
+from redis.asyncio.cluster import ClusterNode, RedisCluster
+from redis.asyncio.connection import AbstractConnection, Encoder
+from redis.asyncio.retry import Retry
+from redis.asyncio.sentinel import Sentinel, SentinelConnectionPool
+from redis.backoff import ExponentialWithJitterBackoff, NoBackoff
+from redis.exceptions import ConnectionError, NoScriptError, RedisError, ResponseError
+from redis.observability.attributes import DB_CLIENT_CONNECTION_STATE, ConnectionState
 from dotenv import load_dotenv
 from os import getenv
-from .in_memory_backend import InMemoryBackend, RAMBackend
+from .in_memory_backend import InMemoryBackend, RAMBackend, Script
 
 from .modules import disabled_modules
 
@@ -14,93 +26,777 @@ Redis = InMemoryBackend
 
 REDIS_HOST = getenv("REDIS_HOST", "localhost")
 REDIS_PORT = getenv("REDIS_PORT", "6379")
+REDIS_POOL_MINSIZE = int(getenv("REDIS_POOL_MINSIZE", "1"))
+REDIS_POOL_MAXSIZE = int(getenv("REDIS_POOL_MAXSIZE", "10"))
+REDIS_CONNECT_TIMEOUT = float(getenv("REDIS_CONNECT_TIMEOUT", "5"))
+REDIS_COMMAND_TIMEOUT = float(getenv("REDIS_COMMAND_TIMEOUT", "0"))
+REDIS_IDLE_TIMEOUT = float(getenv("REDIS_IDLE_TIMEOUT", "300"))
+REDIS_RETRIES = int(getenv("REDIS_RETRIES", "3"))
+REDIS_HEALTH_CHECK_INTERVAL = float(getenv("REDIS_HEALTH_CHECK_INTERVAL", "0"))
+REDIS_PROTOCOL = int(getenv("REDIS_PROTOCOL", "3"))
+REDIS_CLUSTER_NODES = getenv("REDIS_CLUSTER_NODES", "")
+REDIS_SENTINELS = getenv("REDIS_SENTINELS", "")
+REDIS_SENTINEL_SERVICE = getenv("REDIS_SENTINEL_SERVICE", "mymaster")
+REDIS_REPLICAS = getenv("REDIS_REPLICAS", "")
+REDIS_REPLICA_MAX_LAG = float(getenv("REDIS_REPLICA_MAX_LAG", "1"))
+REDIS_REPLICA_CHECK_INTERVAL = float(getenv("REDIS_REPLICA_CHECK_INTERVAL", "0.25"))
+REDIS_NEAR_CACHE_SIZE = int(getenv("REDIS_NEAR_CACHE_SIZE", "0"))
+
+PIPELINE_RESULT_TYPES: Dict[str, Callable[[Any], Any]] = {
+    "pttl": int,
+    "ttl": int,
+    "pexpire": bool,
+    "expire": bool,
+    "incr": int,
+    "decr": int,
+    "incrby": int,
+    "decrby": int,
+    "incrbyfloat": float,
+    "smembers": set,
+    "sadd": bool,
+    "srem": bool,
+    "sismember": bool,
+    "smismember": lambda reply: [bool(result) for result in reply],
+    "scard": int,
+    "exists": bool,
+    "zadd": bool,
+    "zrem": bool,
+    "zrangebyscore": list,
+    "zremrangebyscore": int,
+}
+
+
+def parse_nodes(nodes: str) -> List[Tuple[str, int]]:
+    """Parses `host:port` Pairs separated by `,`"""
+    return [
+        (host, int(port)) for host, port in (node.strip().rsplit(":", 1) for node in nodes.split(",") if node.strip())
+    ]
+
+
+def parse_info(reply: Any) -> Dict[str, str]:
+    """Parses the `field:value` Lines of an INFO Reply, redis-py already parses them into a Dict"""
+    if isinstance(reply, dict):
+        return {str(field): str(value) for field, value in reply.items()}
+    text: str = reply.decode() if isinstance(reply, bytes) else str(reply)
+    return dict(line.split(":", 1) for line in text.splitlines() if ":" in line and not line.startswith("#"))
+
+
+def set_options(expire: int = 0, pexpire: int = 0, exists=None) -> Dict[str, Any]:
+    """Converts the `set` Params of the Backend Interface to Redis SET Options"""
+    if exists not in (None, InMemoryBackend.SET_IF_NOT_EXIST, InMemoryBackend.SET_IF_EXIST):
+        raise Exception("Wrong Params")
+    return {
+        "ex": expire or None,
+        "px": pexpire or None,
+        "nx": exists == InMemoryBackend.SET_IF_NOT_EXIST,
+        "xx": exists == InMemoryBackend.SET_IF_EXIST,
+    }
+
+
+def pool_options(
+    maxsize: Optional[int] = None, connect_timeout: Optional[float] = None, command_timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """Returns the Connection Pool Options, the Defaults come from the Environment"""
+    return {
+        "max_connections": REDIS_POOL_MAXSIZE if maxsize is None else maxsize,
+        "socket_connect_timeout": (REDIS_CONNECT_TIMEOUT if connect_timeout is None else connect_timeout) or None,
+        "socket_timeout": (REDIS_COMMAND_TIMEOUT if command_timeout is None else command_timeout) or None,
+        "protocol": REDIS_PROTOCOL,
+        # Commands are retried on a new Connection if the Connection is lost, not after a Timeout
+        "retry": Retry(ExponentialWithJitterBackoff(), REDIS_RETRIES, (ConnectionError,)),
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+    }
+
+
+def tracking_pool_options(connect_timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Returns the Options of the Pool for the Near Cache Invalidations, it waits for them without a Timeout"""
+    return {
+        **pool_options(1, connect_timeout, 0),
+        # with RESP2 Redis sends the Invalidations as Pub/Sub Messages instead of RESP3 Push Replies
+        "protocol": 2,
+        # a new Connection has another Client ID, so the Backend has to subscribe again itself
+        "retry": Retry(NoBackoff(), 0),
+        "health_check_interval": 0,
+    }
+
+
+class NearCache:
+    """LRU Cache of GET Replies, Redis tells the Backend with CLIENT TRACKING when a cached Key changes"""
+
+    size: int
+    tracked: bool  # only cache Replies while Redis sends the Invalidations
+    entries: "OrderedDict[bytes, Tuple[Any, float]]"  # Value and Loop Time it expires in Redis (0 = never)
+    fetching: Dict[bytes, int]
+    stale: Set[bytes]
+    hits: int
+    misses: int
+    invalidations: int
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tracked = False
+        self.entries = OrderedDict()
+        self.fetching = {}
+        self.stale = set()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups: int = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    async def get(self, key: str, execute: Callable[..., Awaitable[Any]]) -> Any:
+        """Returns the cached Value of a Key or GETs it with `execute` and caches it if it didn't change meanwhile"""
+        cache_key: bytes = key.encode("utf-8")
+        now: float = asyncio.get_running_loop().time()
+        entry: Optional[Tuple[Any, float]] = self.entries.get(cache_key)
+        if entry is not None:
+            value, deadline = entry
+            if not deadline or now < deadline:
+                self.entries.move_to_end(cache_key)
+                self.hits += 1
+                return value
+            # Redis deletes expired Keys lazily, so there may be no Invalidation for them
+            del self.entries[cache_key]
+        self.misses += 1
+        self.fetching[cache_key] = self.fetching.get(cache_key, 0) + 1
+        try:
+            # both Commands are sent in the same Pipeline
+            value, pttl = await asyncio.gather(execute("GET", key), execute("PTTL", key))
+        finally:
+            stale: bool = cache_key in self.stale
+            if self.fetching[cache_key] == 1:
+                del self.fetching[cache_key]
+                self.stale.discard(cache_key)
+            else:
+                self.fetching[cache_key] -= 1
+        if not stale:
+            self.entries[cache_key] = (value, now + int(pttl) / 1000 if int(pttl) > 0 else 0)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, keys: Optional[List[bytes]]):
+        """Removes changed Keys from the Cache, `None` removes all Keys (after FLUSHDB or a lost Connection)"""
+        if keys is None:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            self.stale.update(self.fetching)
+            return
+        for key in keys:
+            if self.entries.pop(key, None) is not None:
+                self.invalidations += 1
+            if key in self.fetching:
+                self.stale.add(key)
+
+
+def written_keys(args: Tuple[Any, ...]) -> List[bytes]:
+    """Returns the Keys a Command may change, a Script's Keys or the first Argument of other Commands"""
+    if args[0] in ("EVAL", "EVALSHA"):
+        keys: List[Any] = list(args[3:][: int(args[2])])
+    else:
+        keys = list(args[1:2])
+    return [key.encode("utf-8") if isinstance(key, str) else key for key in keys]
+
+
+class AutoPipeline:
+    """Sends the single Commands of one Loop Iteration together in one Pipeline on a Connection of the Pool"""
+
+    redis_connection: RedisConnection
+    encoder: Encoder
+    commands: List[Tuple[Tuple[Any, ...], "asyncio.Future"]]
+    tasks: Set["asyncio.Task"]
+
+    def __init__(self, redis_connection: RedisConnection):
+        self.redis_connection = redis_connection
+        self.encoder = redis_connection.connection_pool.get_encoder()
+        self.commands = []
+        self.tasks = set()
+
+    async def execute(self, *args: Any) -> Any:
+        """Queues a Command for the Pipeline of this Loop Iteration and waits for its Reply"""
+        for arg in args:
+            # encoding Errors are raised here, so they don't fail the other Commands of the Pipeline
+            self.encoder.encode(arg)
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        reply: "asyncio.Future" = loop.create_future()
+        if not self.commands:
+            loop.call_soon(self.flush)
+        self.commands.append((args, reply))
+        return await reply
+
+    def flush(self):
+        """Starts a Task that sends the collected Commands"""
+        commands, self.commands = self.commands, []
+        if not commands:
+            return
+        task: "asyncio.Task" = asyncio.get_running_loop().create_task(self.send(commands))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def send(self, commands: List[Tuple[Tuple[Any, ...], "asyncio.Future"]]):
+        """Sends the Commands with the Retries of the Client and resolves their Replies"""
+        try:
+            if len(commands) == 1:
+                replies: List[Any] = [await self.redis_connection.execute_command(*commands[0][0])]
+            else:
+                pipeline: RedisPipeline = self.redis_connection.pipeline(transaction=False)
+                for args, _ in commands:
+                    pipeline.execute_command(*args)
+                replies = await pipeline.execute(raise_on_error=False)
+        except asyncio.CancelledError:
+            replies = [ConnectionError("Connection closed")] * len(commands)
+        except Exception as error:
+            replies = [error] * len(commands)
+        for (_, reply), result in zip(commands, replies):
+            if reply.done():
+                continue
+            if isinstance(result, Exception):
+                reply.set_exception(result)
+            else:
+                reply.set_result(result)
+
+    async def close(self):
+        """Fails the Commands that weren't sent yet and stops the running Pipelines"""
+        commands, self.commands = self.commands, []
+        for _, reply in commands:
+            if not reply.done():
+                reply.set_exception(ConnectionError("Connection closed"))
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
 
 
 class RedisBackend(InMemoryBackend):
+    INVALIDATION_CHANNEL: str = "__redis__:invalidate"
+    RESUBSCRIBE_DELAY: float = 0.5
+
     redis_connection: RedisConnection
+    auto_pipeline: AutoPipeline
+    minsize: int = 0
+    reaper: Optional["asyncio.Task"] = None
+    replicas: List["RedisBackend"] = []
+    replica_checker: Optional["asyncio.Task"] = None
+    primary_offsets: Deque[Tuple[float, int]]
+    max_lag: Optional[float] = None
+    synced_at: float = float("-inf")
+    near_cache: Optional[NearCache] = None
+    tracking_pool: Optional[ConnectionPool] = None
+    tracking_pubsub: Optional[PubSub] = None
+    tracking_id: Optional[int] = None
+    tracker: Optional["asyncio.Task"] = None
 
     @staticmethod
-    async def init(url: str) -> "RedisBackend":
-        redis = RedisBackend()
-        redis.redis_connection = await create_redis_pool(url)
-        return redis
+    async def init(
+        url: str,
+        minsize: Optional[int] = None,
+        maxsize: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        command_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        near_cache_size: Optional[int] = None,
+    ) -> "RedisBackend":
+        """Creates a Backend with a Connection Pool, the Defaults come from the Environment"""
+        pool: ConnectionPool = BlockingConnectionPool.from_url(
+            url,
+            timeout=None,
+            **pool_options(maxsize, connect_timeout, command_timeout),
+        )
+        tracking_pool: ConnectionPool = ConnectionPool.from_url(url, **tracking_pool_options(connect_timeout))
+        return await RedisBackend().start(pool, minsize, idle_timeout, near_cache_size, tracking_pool)
+
+    async def start(
+        self,
+        pool: ConnectionPool,
+        minsize: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        near_cache_size: Optional[int] = None,
+        tracking_pool: Optional[ConnectionPool] = None,
+    ) -> "RedisBackend":
+        """Opens `minsize` Connections of the Pool and starts the Reaper"""
+        near_cache_size = REDIS_NEAR_CACHE_SIZE if near_cache_size is None else near_cache_size
+        if near_cache_size:
+            self.near_cache = NearCache(near_cache_size)
+            if tracking_pool is None:
+                raise Exception("The Near Cache needs a Connection Pool for the Invalidations")
+            self.tracking_pool = tracking_pool
+            pool.connection_kwargs["redis_connect_func"] = self.connect_tracking
+        self.redis_connection = RedisConnection.from_pool(pool)
+        self.auto_pipeline = AutoPipeline(self.redis_connection)
+        if self.near_cache is not None:
+            await self.subscribe_invalidations()
+            self.tracker = asyncio.get_running_loop().create_task(self.track_invalidations())
+        self.minsize = REDIS_POOL_MINSIZE if minsize is None else minsize
+        connections = [pool.get_available_connection() for _ in range(min(self.minsize, pool.max_connections))]
+        for connection in connections:
+            await connection.connect()
+            await pool.release(connection)
+        idle_timeout = REDIS_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        if idle_timeout:
+            self.reaper = asyncio.get_running_loop().create_task(self.reap_idle_connections(idle_timeout))
+        return self
+
+    async def free_connections(self) -> List[Any]:
+        """Returns the connected free Connections of the Pool, the longest unused first"""
+        pool: ConnectionPool = self.redis_connection.connection_pool
+        free: int = sum(
+            count
+            for count, attributes in pool.get_connection_count()
+            if attributes.get(DB_CLIENT_CONNECTION_STATE) == ConnectionState.IDLE.value
+        )
+        # the Pool hands out the most recently used Connection first, they are put back in the same Order
+        connections: List[AbstractConnection] = [pool.get_available_connection() for _ in range(free)][::-1]
+        for connection in connections:
+            await pool.release(connection)
+        return [connection for connection in connections if connection.is_connected]
+
+    async def reap_idle_connections(self, idle_timeout: float):
+        """Closes the free Connections above `minsize` every `idle_timeout` Seconds and drops broken ones"""
+        while True:
+            await asyncio.sleep(idle_timeout)
+            connections: List[Any] = await self.free_connections()
+            if not await self.health_check():
+                await self.redis_connection.connection_pool.disconnect(inuse_connections=False)
+                continue
+            for connection in connections[: max(len(connections) - self.minsize, 0)]:
+                await connection.disconnect()
+
+    async def connect_tracking(self, connection: AbstractConnection):
+        """Initialises a new Connection of the Pool and lets Redis send its Invalidations to the Near Cache"""
+        await connection.on_connect()
+        if self.tracking_id is not None:
+            await connection.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", self.tracking_id)
+            await connection.read_response()
+
+    async def subscribe_invalidations(self):
+        """Subscribes to the Invalidations on the own Connection and reconnects the Pool to redirect them there"""
+        if self.tracking_pool is None:
+            raise Exception("The Near Cache is disabled")
+        pubsub: PubSub = PubSub(self.tracking_pool)
+        try:
+            await pubsub.connect()
+            if pubsub.connection is None:
+                raise ConnectionError("Connection closed")
+            await pubsub.connection.send_command("CLIENT", "ID")
+            tracking_id: int = int(await pubsub.connection.read_response())
+            await pubsub.subscribe(self.INVALIDATION_CHANNEL)
+        except BaseException:
+            await pubsub.aclose()
+            raise
+        self.tracking_pubsub = pubsub
+        self.tracking_id = tracking_id
+        # Connections opened before don't redirect their Invalidations to this Connection
+        await self.redis_connection.connection_pool.disconnect()
+        if self.near_cache is not None:
+            # GETs sent before may have been read without Tracking
+            self.near_cache.invalidate(None)
+            self.near_cache.tracked = True
+
+    async def track_invalidations(self):
+        """Removes the Keys Redis reports as changed from the Near Cache, subscribes again if the Connection is lost"""
+        while True:
+            try:
+                if self.tracking_pubsub is None:
+                    await self.subscribe_invalidations()
+                    continue
+                message: Optional[Dict[str, Any]] = await self.tracking_pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=None
+                )
+                if message is not None and message["type"] == "message" and self.near_cache is not None:
+                    # the Data is `None` after FLUSHDB
+                    self.near_cache.invalidate(message["data"])
+                continue
+            except (OSError, RedisError):
+                pass
+            pubsub, self.tracking_pubsub, self.tracking_id = self.tracking_pubsub, None, None
+            if self.near_cache is not None:
+                self.near_cache.tracked = False
+                self.near_cache.invalidate(None)
+            if pubsub is not None:
+                await pubsub.aclose()
+            await asyncio.sleep(self.RESUBSCRIBE_DELAY)
+
+    async def health_check(self) -> bool:
+        """Checks the Connection with a PING"""
+        try:
+            return bool(await self.execute("PING"))
+        except (OSError, RedisError):
+            return False
+
+    async def connect_replicas(self, nodes: List[Tuple[str, int]], check_interval: Optional[float] = None):
+        """Connects to the Replicas of this Primary and checks every `check_interval` Seconds how far they are behind"""
+        db: int = self.redis_connection.connection_pool.connection_kwargs.get("db", 0)
+        self.replicas = [
+            await RedisBackend.init(f"redis://{host}:{port}/{db}", near_cache_size=0) for host, port in nodes
+        ]
+        self.primary_offsets = deque(maxlen=256)
+        check_interval = REDIS_REPLICA_CHECK_INTERVAL if check_interval is None else check_interval
+        self.replica_checker = asyncio.get_running_loop().create_task(self.check_replicas(check_interval))
+
+    async def check_replicas(self, check_interval: float):
+        """Updates the Replication State of the Replicas every `check_interval` Seconds"""
+        while True:
+            await self.update_replicas()
+            await asyncio.sleep(check_interval)
+
+    async def update_replicas(self):
+        """Sets `synced_at` of every Replica to the last Time it had all Writes of the Primary"""
+        try:
+            info: Dict[str, str] = parse_info(await self.execute("INFO", "replication"))
+        except (OSError, RedisError):
+            return
+        self.primary_offsets.append((asyncio.get_running_loop().time(), int(info["master_repl_offset"])))
+        replies: List[Any] = await asyncio.gather(
+            *(replica.execute("INFO", "replication") for replica in self.replicas), return_exceptions=True
+        )
+        for replica, reply in zip(self.replicas, replies):
+            if isinstance(reply, BaseException):
+                continue
+            replica_info: Dict[str, str] = parse_info(reply)
+            if replica_info.get("master_link_status") != "up" or replica_info.get("master_replid") != info.get(
+                "master_replid"
+            ):
+                continue
+            offset: int = int(replica_info["slave_repl_offset"])
+            replica.synced_at = max(
+                [
+                    replica.synced_at,
+                    *(time for time, primary_offset in self.primary_offsets if primary_offset <= offset),
+                ]
+            )
+
+    def replica(self, max_lag: Optional[float] = None) -> "RedisBackend":
+        """Returns a View that reads from Replicas at most `max_lag` Seconds behind, Misses are read from the Primary"""
+        view: RedisBackend = copy(self)
+        view.max_lag = REDIS_REPLICA_MAX_LAG if max_lag is None else max_lag
+        return view
+
+    def choose_replica(self) -> Optional["RedisBackend"]:
+        """Returns a random Replica that is recent enough for this View"""
+        if self.max_lag is None or not self.replicas:
+            return None
+        now: float = asyncio.get_running_loop().time()
+        replicas: List[RedisBackend] = [replica for replica in self.replicas if now - replica.synced_at <= self.max_lag]
+        return random.choice(replicas) if replicas else None
+
+    async def close(self):
+        """Stops the Reaper and closes all Connections of the Pool"""
+        if self.reaper is not None:
+            self.reaper.cancel()
+            self.reaper = None
+        if self.replica_checker is not None:
+            self.replica_checker.cancel()
+            self.replica_checker = None
+        if self.tracker is not None:
+            self.tracker.cancel()
+            self.tracker = None
+        replicas, self.replicas = self.replicas, []
+        for replica in replicas:
+            await replica.close()
+        await self.auto_pipeline.close()
+        await self.redis_connection.aclose()
+        if self.tracking_pubsub is not None:
+            await self.tracking_pubsub.aclose()
+            self.tracking_pubsub = None
+        if self.tracking_pool is not None:
+            await self.tracking_pool.aclose()
+
+    async def execute(self, *args: Any) -> Any:
+        """Executes a single Command, the Commands of one Loop Iteration are sent together"""
+        if self.near_cache is not None and args[0] != "GET":
+            self.near_cache.invalidate(written_keys(args))
+        return await self.auto_pipeline.execute(*args)
+
+    async def execute_read(self, *args: Any) -> Any:
+        """Executes a read-only Command on a Replica if the View allows it, empty Replies are checked on the Primary"""
+        replica: Optional[RedisBackend] = self.choose_replica()
+        if replica is not None:
+            try:
+                reply: Any = await replica.execute(*args)
+                if reply and reply != -2:
+                    return reply
+            except (OSError, RedisError):
+                pass
+        return await self.execute(*args)
 
     async def get(self, key: str):
-        """Get Value from Key"""
-        return await self.redis_connection.get(key)
+        """Get Value from Key, from the Near Cache if it is enabled and receives Invalidations"""
+        if self.near_cache is not None and self.near_cache.tracked:
+            return await self.near_cache.get(key, self.auto_pipeline.execute)
+        return await self.execute_read("GET", key)
 
     async def set(self, key: str, value, expire: int = 0, pexpire: int = 0, exists=None):
         """Set Key to Value"""
-        return await self.redis_connection.set(key, value, expire=expire, pexpire=pexpire, exist=exists)
+        options: List[Any] = []
+        for name, option in set_options(expire, pexpire, exists).items():
+            if option is True:
+                options.append(name.upper())
+            elif option:
+                options.extend([name.upper(), option])
+        return True if await self.execute("SET", key, value, *options) else None
 
     async def pttl(self, key: str) -> int:
         """Get PTTL from a Key"""
-        return int(await self.redis_connection.pttl(key))
+        return int(await self.execute("PTTL", key))
 
     async def ttl(self, key: str) -> int:
         """Get TTL from a Key"""
-        return int(await self.redis_connection.ttl(key))
+        return int(await self.execute_read("TTL", key))
 
     async def pexpire(self, key: str, pexpire: int) -> bool:
         """Sets and PTTL for a Key"""
-        return bool(await self.redis_connection.pexpire(key, pexpire))
+        return bool(await self.execute("PEXPIRE", key, pexpire))
 
     async def expire(self, key: str, expire: int) -> bool:
         """Sets and TTL for a Key"""
-        return bool(await self.redis_connection.expire(key, expire))
+        return bool(await self.execute("EXPIRE", key, expire))
 
     async def incr(self, key: str) -> int:
         """Increases an Int Key"""
-        return int(await self.redis_connection.incr(key))
+        return int(await self.execute("INCR", key))
 
     async def decr(self, key: str) -> int:
         """Decreases an Int Key"""
-        return int(await self.redis_connection.decr(key))
+        return int(await self.execute("DECR", key))
+
+    async def incrby(self, key: str, amount: int) -> int:
+        """Increases an Int Key by `amount`"""
+        return int(await self.execute("INCRBY", key, amount))
+
+    async def decrby(self, key: str, amount: int) -> int:
+        """Decreases an Int Key by `amount`"""
+        return int(await self.execute("DECRBY", key, amount))
+
+    async def incrbyfloat(self, key: str, amount: float) -> float:
+        """Increases a Float Key by `amount`"""
+        return float(await self.execute("INCRBYFLOAT", key, amount))
 
     async def delete(self, key: str):
         """Delete value of a Key"""
-        return await self.redis_connection.delete(key)
+        return await self.execute("DEL", key)
 
     async def smembers(self, key: str) -> Set:
         """Gets Set Members"""
-        return set(await self.redis_connection.smembers(key))
+        return set(await self.execute_read("SMEMBERS", key))
 
     async def sadd(self, key: str, value: Any) -> bool:
         """Adds a Member to a Dict"""
-        return bool(await self.redis_connection.sadd(key, value))
+        return bool(await self.execute("SADD", key, value))
 
     async def srem(self, key: str, member: Any) -> bool:
         """Removes a Member from a Set"""
-        return bool(await self.redis_connection.srem(key, member))
+        return bool(await self.execute("SREM", key, member))
+
+    async def sismember(self, key: str, member: Any) -> bool:
+        """Checks if a Member is in a Set"""
+        return bool(await self.execute_read("SISMEMBER", key, member))
+
+    async def smismember(self, key: str, members: List[Any]) -> List[bool]:
+        """Checks for every Member if it is in a Set"""
+        return [bool(result) for result in await self.execute("SMISMEMBER", key, *members)]
+
+    async def scard(self, key: str) -> int:
+        """Gets the Number of Members in a Set"""
+        return int(await self.execute("SCARD", key))
 
     async def exists(self, key: str) -> bool:
         """Checks if a Key exists"""
-        return bool(await self.redis_connection.exists(key))
+        return bool(await self.execute_read("EXISTS", key))
+
+    async def zadd(self, key: str, score: float, member: Any) -> bool:
+        """Adds a Member with a Score to a Sorted Set or updates its Score"""
+        return bool(await self.execute("ZADD", key, score, member))
+
+    async def zrem(self, key: str, member: Any) -> bool:
+        """Removes a Member from a Sorted Set"""
+        return bool(await self.execute("ZREM", key, member))
+
+    async def zrangebyscore(self, key: str, min_score: float, max_score: float) -> List:
+        """Gets the Members of a Sorted Set with a Score between `min_score` and `max_score` ordered by Score"""
+        return list(await self.execute("ZRANGEBYSCORE", key, min_score, max_score))
+
+    async def zremrangebyscore(self, key: str, min_score: float, max_score: float) -> int:
+        """Removes the Members of a Sorted Set with a Score between `min_score` and `max_score`"""
+        return int(await self.execute("ZREMRANGEBYSCORE", key, min_score, max_score))
+
+    async def select(self, db: int) -> bool:
+        """Selects the Database with the Number `db`"""
+        pool: ConnectionPool = self.redis_connection.connection_pool
+        pool.connection_kwargs["db"] = db
+        await pool.disconnect()
+        if self.near_cache is not None:
+            self.near_cache.invalidate(None)
+        for replica in self.replicas:
+            await replica.select(db)
+        return True
+
+    def create_pipeline(self, commands: List[Tuple[str, Tuple]], transaction: bool = False) -> Any:
+        """Creates the redis-py Pipeline for the Commands"""
+        return self.redis_connection.pipeline(transaction=transaction)
+
+    async def execute_pipeline(self, commands: List[Tuple[str, Tuple]], transaction: bool = False) -> List[Any]:
+        """Executes the Commands of a Pipeline in one Round Trip"""
+        pipeline = self.create_pipeline(commands, transaction)
+        for name, args in commands:
+            if name == "set":
+                key, value, expire, pexpire, exists = args
+                pipeline.set(key, value, **set_options(expire, pexpire, exists))
+            elif name == "zadd":
+                key, score, member = args
+                pipeline.zadd(key, {member: score})
+            else:
+                getattr(pipeline, name)(*args)
+        try:
+            replies: List[Any] = await pipeline.execute()
+        finally:
+            if self.near_cache is not None:
+                # the Pipeline runs on another Connection, so its Invalidations may arrive after its Replies
+                self.near_cache.invalidate(
+                    [key for name, args in commands if name != "get" for key in written_keys((name, *args))]
+                )
+        return [
+            PIPELINE_RESULT_TYPES.get(name, lambda reply: reply)(reply) for (name, _), reply in zip(commands, replies)
+        ]
+
+    async def eval_script(self, script: Script, keys: List[str], args: List[Any]) -> Any:
+        """Runs a Script by its SHA1 and loads it into the Script Cache if missing"""
+        try:
+            return await self.execute("EVALSHA", script.sha, len(keys), *keys, *args)
+        except ResponseError as error:
+            if not isinstance(error, NoScriptError) and not str(error).startswith("NOSCRIPT"):
+                raise
+        return await self.execute("EVAL", script.lua, len(keys), *keys, *args)
+
+
+class BlockingSentinelConnectionPool(SentinelConnectionPool, BlockingConnectionPool):
+    """Sentinel Connection Pool that waits for a free Connection like the Pool of `RedisBackend`"""
+
+
+class RedisSentinelBackend(RedisBackend):
+    """Redis Backend that gets the Master from Redis Sentinel and follows Failovers"""
+
+    @staticmethod
+    async def init_sentinel(
+        sentinels: List[Tuple[str, int]],
+        service_name: str,
+        minsize: Optional[int] = None,
+        maxsize: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        command_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+    ) -> "RedisSentinelBackend":
+        """Creates a Backend for the Master of `service_name`, the Defaults come from the Environment"""
+        options: Dict[str, Any] = pool_options(maxsize, connect_timeout, command_timeout)
+        sentinel: Sentinel = Sentinel(
+            sentinels,
+            sentinel_kwargs={
+                "socket_connect_timeout": options["socket_connect_timeout"],
+                "socket_timeout": options["socket_timeout"],
+            },
+        )
+        pool: ConnectionPool = BlockingSentinelConnectionPool(service_name, sentinel, timeout=None, **options)
+        tracking_pool: ConnectionPool = SentinelConnectionPool(
+            service_name, sentinel, **tracking_pool_options(connect_timeout)
+        )
+        backend: RedisSentinelBackend = RedisSentinelBackend()
+        await backend.start(pool, minsize, idle_timeout, tracking_pool=tracking_pool)
+        return backend
+
+
+class RedisClusterBackend(RedisBackend):
+    """Redis Backend for a Redis Cluster, Commands go to the Node of their Key's Slot"""
+
+    cluster: RedisCluster
+
+    @staticmethod
+    async def init_cluster(
+        nodes: List[Tuple[str, int]],
+        maxsize: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        command_timeout: Optional[float] = None,
+    ) -> "RedisClusterBackend":
+        """Creates a Backend for the Cluster of `nodes`, `maxsize` is per Node"""
+        backend: RedisClusterBackend = RedisClusterBackend()
+        backend.cluster = RedisCluster(
+            startup_nodes=[ClusterNode(host, port) for host, port in nodes],
+            **pool_options(maxsize, connect_timeout, command_timeout),
+        )
+        await backend.cluster.initialize()
+        return backend
+
+    async def execute(self, *args: Any) -> Any:
+        """Executes a single Command on the Node of its Key"""
+        return await self.cluster.execute_command(*args)
+
+    def hash_tag(self, key: str) -> str:
+        """Wraps the Key in a Hash Tag, so Keys derived from it are in the same Slot"""
+        return "{" + key.replace("{", "(").replace("}", ")") + "}"
+
+    async def free_connections(self) -> List[Any]:
+        """Connections are pooled per Node by the Cluster Client"""
+        return []
+
+    async def close(self):
+        """Closes the Connections to all Nodes"""
+        await self.cluster.aclose()
+
+    async def select(self, db: int) -> bool:
+        """Redis Cluster only has the Database 0"""
+        raise Exception("Redis Cluster doesn't support SELECT")
+
+    def create_pipeline(self, commands: List[Tuple[str, Tuple]], transaction: bool = False) -> Any:
+        """Creates a Cluster Pipeline, it is atomic only if all Keys are in the same Slot"""
+        slots: Set[int] = {self.cluster.keyslot(args[0]) for _, args in commands}
+        return self.cluster.pipeline(transaction=transaction and len(slots) == 1)
 
 
 class RedisDependency:
     """FastAPI Dependency for Redis Connections"""
 
     redis: Optional[InMemoryBackend] = None
+    loop: Optional[asyncio.AbstractEventLoop] = None
 
     async def __call__(self):
-        if self.redis is None:
+        if self.redis is None or not self.same_loop():
             await self.init()
         return self.redis
 
+    def same_loop(self) -> bool:
+        """Checks if the Connections were created in the running Event Loop, they can't be used in another one"""
+        return self.loop is None or self.loop is asyncio.get_running_loop()
+
     async def init(self):
         """Initialises the Redis Dependency"""
+        if self.redis is not None and self.same_loop():
+            await self.close()
+        self.loop = asyncio.get_running_loop()
         if "redis" in disabled_modules:
             self.redis = RAMBackend()
+        elif REDIS_CLUSTER_NODES:
+            self.redis = await RedisClusterBackend.init_cluster(parse_nodes(REDIS_CLUSTER_NODES))
+        elif REDIS_SENTINELS:
+            self.redis = await RedisSentinelBackend.init_sentinel(parse_nodes(REDIS_SENTINELS), REDIS_SENTINEL_SERVICE)
         else:
             self.redis = await RedisBackend.init(f"redis://{REDIS_HOST}:{REDIS_PORT}")
+        if REDIS_REPLICAS and isinstance(self.redis, RedisBackend) and not isinstance(self.redis, RedisClusterBackend):
+            await self.redis.connect_replicas(parse_nodes(REDIS_REPLICAS))
+
+    async def close(self):
+        """Closes the Redis Connections, use it as FastAPI Shutdown Handler"""
+        if self.redis is not None:
+            redis, self.redis = self.redis, None
+            await redis.close()
 
 
 redis_dependency: RedisDependency = RedisDependency()
 
 
 async def get_redis() -> RedisBackend:
-    """Returns a NEW Redis connection"""
+    """Returns the shared pooled Redis Client of `redis_dependency`"""
     if "redis" in disabled_modules:
         raise Exception("Module Redis is disabled")
-    return await RedisBackend.init(f"redis://{REDIS_HOST}:{REDIS_PORT}")
+    if not isinstance(redis_dependency.redis, RedisBackend) or not redis_dependency.same_loop():
+        await redis_dependency.init()
+    return redis_dependency.redis  # type: ignore
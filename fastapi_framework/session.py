@@ -8,7 +8,7 @@ from fastapi.requests import Request
 from fastapi.responses import Response
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 
-from .redis import redis_dependency
+from .redis import redis_dependency, Redis
 
 
 async def fetch_session_id(request: Request) -> None:
@@ -47,6 +47,7 @@ class Session:
     session_id_callback: Union[Callable[[Request], None], Callable[[Request], Coroutine]]
     generate_session_id_callback: Union[Callable[[], str], Callable[[], Coroutine]]
     session_expire: int
+    replica_max_lag: float
 
     def __init__(
         self,
@@ -60,12 +61,14 @@ class Session:
             Callable[["Session", Request, RequestResponseEndpoint], Coroutine],
         ] = session_middleware,
         session_expire: int = 60 * 60 * 24,
+        replica_max_lag: float = 0,
     ) -> None:
         self.model = model
         self.default_data = default_data
         self.session_id_callback = session_id_callback
         self.generate_session_id_callback = generate_session_id_callback
         self.session_expire = session_expire
+        self.replica_max_lag = replica_max_lag
 
         async def _middleware(request: Request, call_next: RequestResponseEndpoint) -> Response:
             result: Union[Response, Coroutine] = middleware(self, request, call_next)
@@ -84,7 +87,7 @@ class Session:
         session_id: Optional[str] = getattr(request.state, "session_id", None)
         if session_id is None:
             return False
-        return await (await redis_dependency()).exists(f"session:id:{session_id}")
+        return await (await redis_dependency()).replica(self.replica_max_lag).exists(f"session:id:{session_id}")
 
     async def create_session(self) -> str:
         result: Union[str, Coroutine] = self.generate_session_id_callback()
@@ -108,7 +111,8 @@ class Session:
         )
 
     async def get_data(self, request: Request) -> BaseModel:
-        raw_data: str = await (await redis_dependency()).get(f"session:id:{request.state.session_id}")
+        redis: Redis = (await redis_dependency()).replica(self.replica_max_lag)
+        raw_data: str = await redis.get(f"session:id:{request.state.session_id}")
         if raw_data is None:
             raise SessionNotExists()
         data: BaseModel = self.model.parse_raw(raw_data)
@@ -46,7 +46,7 @@ class Settings:
         redis: Redis = await redis_dependency()
         redis_key = f"settings:{key}"
         value: bytes
-        if (value := await redis.get(redis_key)) is not None:
+        if (value := await redis.replica().get(redis_key)) is not None:
             return value.decode("utf-8")
         db: DB = await database_dependency()
         setting: SettingsModel = await db.first(select(SettingsModel).filter_by(key=key))
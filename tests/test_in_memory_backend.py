@@ -1,9 +1,10 @@
 import asyncio
+import time
 from typing import Set
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import patch, AsyncMock
 
-from fastapi_framework.in_memory_backend import RAMBackend
+from fastapi_framework.in_memory_backend import RAMBackend, Script
 
 ram_backend = RAMBackend()
 
@@ -31,7 +32,7 @@ class TestInMemoryBackend(IsolatedAsyncioTestCase):
         await ram_backend.set("test_set_value_with_pttl", "test_value", pexpire=2000)
 
         self.assertTrue("test_set_value_with_pttl" in ram_backend.data)
-        pexpire = ram_backend.data["test_set_value_with_pttl"].pexpire
+        pexpire = ram_backend.data["test_set_value_with_pttl"].deadline - int(time.time() * 1000)
         self.assertIsInstance(pexpire, int)
         self.assertTrue(pexpire <= 2000)
 
@@ -39,7 +40,7 @@ class TestInMemoryBackend(IsolatedAsyncioTestCase):
         await ram_backend.set("test_set_value_with_ttl", "test_value", expire=10)
 
         self.assertTrue("test_set_value_with_ttl" in ram_backend.data)
-        expire = int(ram_backend.data["test_set_value_with_ttl"].pexpire / 1000)
+        expire = int((ram_backend.data["test_set_value_with_ttl"].deadline - time.time() * 1000) / 1000)
         self.assertIsInstance(expire, int)
         self.assertTrue(expire <= 10)
 
@@ -48,12 +49,12 @@ class TestInMemoryBackend(IsolatedAsyncioTestCase):
 
         self.assertTrue("test_get_pttl" in ram_backend.data)
 
-        pexpire = ram_backend.data["test_get_pttl"].pexpire
+        pexpire = ram_backend.data["test_get_pttl"].deadline - int(time.time() * 1000)
 
         pexpire_getter = await ram_backend.pttl("test_get_pttl")
 
         self.assertIsInstance(pexpire, int)
-        self.assertIsInstance(pexpire, int)
+        self.assertIsInstance(pexpire_getter, int)
         self.assertTrue(pexpire_getter <= pexpire)
 
     async def test_get_pttl_key_dont_exists(self):
@@ -70,10 +71,11 @@ class TestInMemoryBackend(IsolatedAsyncioTestCase):
 
     async def test_pexpire(self):
         await ram_backend.set("test_pexpire", "test_value")
+        timestamp = int(time.time() * 1000)
         await ram_backend.pexpire("test_pexpire", 1000)
 
         self.assertTrue("test_pexpire" in ram_backend.data)
-        self.assertEqual(ram_backend.data["test_pexpire"].pexpire, 1000)
+        self.assertTrue(timestamp + 1000 <= ram_backend.data["test_pexpire"].deadline <= time.time() * 1000 + 1000)
 
     async def test_pexpire_dont_exsist(self):
         self.assertEqual(await ram_backend.pexpire("this_key_doesn't_exists", 1), False)
@@ -241,3 +243,475 @@ class TestInMemoryBackend(IsolatedAsyncioTestCase):
 
         with self.assertRaises(Exception):
             await ram_backend.decr("test_decrease_with_list")
+
+    async def test_expire_keys(self):
+        for i in range(100):
+            await ram_backend.set(f"test_expire_keys_{i}", "test_value", pexpire=1)
+        await asyncio.sleep(0.01)
+
+        ram_backend._expire_keys()
+
+        self.assertFalse(any(key.startswith("test_expire_keys_") for key in ram_backend.data))
+
+    async def test_expire_keys_with_churned_keyspace(self):
+        for i in range(20):
+            for j in range(100):
+                await ram_backend.set(f"test_expire_keys_with_churned_keyspace_{i}_{j}", "test_value", pexpire=1)
+            await asyncio.sleep(0.002)
+
+        keys = [key for key in ram_backend.data if key.startswith("test_expire_keys_with_churned_keyspace_")]
+        self.assertTrue(len(keys) <= 100)
+
+    async def test_expire_keys_with_changed_expire(self):
+        await ram_backend.set("test_expire_keys_with_changed_expire", "test_value", pexpire=1)
+        await ram_backend.pexpire("test_expire_keys_with_changed_expire", 10000)
+        await asyncio.sleep(0.01)
+
+        ram_backend._expire_keys()
+
+        self.assertEqual(await ram_backend.get("test_expire_keys_with_changed_expire"), b"test_value")
+
+    async def test_expire_cycle_budget(self):
+        backend = RAMBackend(shards=1, databases=2)
+        for i in range(100):
+            await backend.set(f"test_expire_cycle_budget_{i}", "test_value", pexpire=50)
+        await asyncio.sleep(0.06)
+
+        self.assertEqual(await backend._expire_cycle(0), backend.EXPIRE_CYCLE_KEYS)
+        self.assertEqual(len(backend.data), 100 - backend.EXPIRE_CYCLE_KEYS)
+        self.assertEqual(await backend._expire_cycle(10), 100 - backend.EXPIRE_CYCLE_KEYS)
+        self.assertEqual(len(backend.data), 0)
+
+    async def test_expire_cycle_yields(self):
+        backend = RAMBackend(shards=1, databases=1)
+        for i in range(100):
+            await backend.set(f"test_expire_cycle_yields_{i}", "test_value", pexpire=50)
+        await asyncio.sleep(0.06)
+        steps = []
+
+        async def count_steps():
+            while True:
+                steps.append(len(backend.data))
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(count_steps())
+        await asyncio.sleep(0)
+        await backend._expire_cycle(10)
+        task.cancel()
+
+        self.assertEqual(len(backend.data), 0)
+        self.assertTrue(any(0 < remaining < 100 for remaining in steps))
+
+    async def test_expire_sweeper(self):
+        backend = RAMBackend()
+        task = backend.start_expire_sweeper(0.001)
+
+        self.assertEqual(backend.start_expire_sweeper(0.001), task)
+
+        await backend.set("test_expire_sweeper", "test_value", pexpire=1)
+        await asyncio.sleep(0.02)
+
+        self.assertFalse("test_expire_sweeper" in backend.data)
+
+        await backend.stop_expire_sweeper()
+
+        self.assertTrue(task.cancelled())
+        self.assertEqual(backend.expire_task, None)
+
+    async def test_close_stops_expire_sweeper(self):
+        backend = RAMBackend()
+        task = backend.start_expire_sweeper(0.001)
+
+        await backend.close()
+
+        self.assertTrue(task.cancelled())
+        self.assertEqual(backend.expire_task, None)
+
+    async def test_sadd_existing_member(self):
+        self.assertEqual(await ram_backend.sadd("test_sadd_existing_member", "test_value"), True)
+        self.assertEqual(await ram_backend.sadd("test_sadd_existing_member", "test_value"), False)
+
+        self.assertIsInstance(ram_backend.data["test_sadd_existing_member"].value, set)
+
+    async def test_sorted_set(self):
+        self.assertEqual(await ram_backend.zadd("test_sorted_set", 3, "test_value_3"), True)
+        self.assertEqual(await ram_backend.zadd("test_sorted_set", 1, "test_value_1"), True)
+        self.assertEqual(await ram_backend.zadd("test_sorted_set", 2, "test_value_2"), True)
+        self.assertEqual(await ram_backend.zadd("test_sorted_set", 4, "test_value_2"), False)
+
+        self.assertEqual(
+            await ram_backend.zrangebyscore("test_sorted_set", 0, float("inf")),
+            ["test_value_1", "test_value_3", "test_value_2"],
+        )
+        self.assertEqual(await ram_backend.zrangebyscore("test_sorted_set", 2, 3), ["test_value_3"])
+        self.assertEqual(await ram_backend.zrem("test_sorted_set", "test_value_3"), True)
+        self.assertEqual(await ram_backend.zrem("test_sorted_set", "test_value_3"), False)
+        self.assertEqual(await ram_backend.zremrangebyscore("test_sorted_set", 0, 1), 1)
+        self.assertEqual(await ram_backend.zrangebyscore("test_sorted_set", 0, float("inf")), ["test_value_2"])
+        self.assertEqual(await ram_backend.zremrangebyscore("test_sorted_set", 0, 10), 1)
+        self.assertEqual(await ram_backend.exists("test_sorted_set"), False)
+
+    async def test_sorted_set_keeps_expire(self):
+        await ram_backend.zadd("test_sorted_set_keeps_expire", 1, "test_value_1")
+        await ram_backend.zadd("test_sorted_set_keeps_expire", 2, "test_value_2")
+        await ram_backend.expire("test_sorted_set_keeps_expire", 10)
+        await ram_backend.zremrangebyscore("test_sorted_set_keeps_expire", 0, 1)
+
+        self.assertTrue(0 < await ram_backend.ttl("test_sorted_set_keeps_expire") <= 10)
+
+    async def test_sadd_keeps_expire(self):
+        await ram_backend.sadd("test_sadd_keeps_expire", "test_value_1")
+        await ram_backend.expire("test_sadd_keeps_expire", 10)
+        await ram_backend.sadd("test_sadd_keeps_expire", "test_value_2")
+
+        self.assertTrue(0 <= await ram_backend.ttl("test_sadd_keeps_expire") <= 10)
+
+    async def test_sadd_to_list(self):
+        await ram_backend.set("test_sadd_to_list", ["test_value_1"])
+        await ram_backend.sadd("test_sadd_to_list", "test_value_2")
+
+        self.assertEqual(await ram_backend.smembers("test_sadd_to_list"), {"test_value_1", "test_value_2"})
+
+    async def test_srem_last_member(self):
+        await ram_backend.sadd("test_srem_last_member", "test_value")
+        await ram_backend.srem("test_srem_last_member", "test_value")
+
+        self.assertEqual(await ram_backend.exists("test_srem_last_member"), False)
+
+    async def test_sismember(self):
+        await ram_backend.sadd("test_sismember", "test_value")
+
+        self.assertEqual(await ram_backend.sismember("test_sismember", "test_value"), True)
+        self.assertEqual(await ram_backend.sismember("test_sismember", "test"), False)
+        self.assertEqual(await ram_backend.sismember("test_sismember_dont_exists", "test_value"), False)
+
+    async def test_smismember(self):
+        await ram_backend.sadd("test_smismember", "test_value_1")
+        await ram_backend.sadd("test_smismember", "test_value_2")
+
+        self.assertEqual(
+            await ram_backend.smismember("test_smismember", ["test_value_1", "test", "test_value_2"]),
+            [True, False, True],
+        )
+        self.assertEqual(await ram_backend.smismember("test_smismember_dont_exists", ["test"]), [False])
+
+    async def test_scard(self):
+        for i in range(5):
+            await ram_backend.sadd("test_scard", f"test_value_{i}")
+
+        self.assertEqual(await ram_backend.scard("test_scard"), 5)
+        self.assertEqual(await ram_backend.scard("test_scard_dont_exists"), 0)
+
+    async def test_instances_dont_share_data(self):
+        backend = RAMBackend()
+        await backend.set("test_instances_dont_share_data", "test_value")
+
+        self.assertEqual(await RAMBackend().get("test_instances_dont_share_data"), None)
+        self.assertEqual(await ram_backend.get("test_instances_dont_share_data"), None)
+
+    async def test_shards(self):
+        backend = RAMBackend(shards=4)
+        for i in range(100):
+            await backend.set(f"test_shards_{i}", i)
+
+        self.assertEqual(len(backend.data.shards), 4)
+        self.assertEqual(len(backend.data), 100)
+        self.assertEqual(sum(len(shard.data) for shard in backend.data.shards), 100)
+        self.assertEqual(set(backend.data), {f"test_shards_{i}" for i in range(100)})
+        self.assertTrue(all(f"test_shards_{i}" in backend.data.shard(f"test_shards_{i}").data for i in range(100)))
+
+    async def test_shards_wrong_count(self):
+        with self.assertRaises(Exception):
+            RAMBackend(shards=0)
+
+    async def test_select(self):
+        backend = RAMBackend(databases=2)
+        await backend.set("test_select", "test_value_0")
+
+        self.assertEqual(await backend.select(1), True)
+        self.assertEqual(await backend.get("test_select"), None)
+
+        await backend.set("test_select", "test_value_1")
+        await backend.select(0)
+
+        self.assertEqual(await backend.get("test_select"), b"test_value_0")
+
+    async def test_select_out_of_range(self):
+        backend = RAMBackend(databases=2)
+
+        with self.assertRaises(Exception):
+            await backend.select(2)
+
+    async def test_wrong_eviction_policy(self):
+        with self.assertRaises(Exception):
+            RAMBackend(eviction_policy="WRONG")
+
+    async def test_stats(self):
+        backend = RAMBackend()
+        await backend.set("test_stats", "test_value")
+        await backend.set("test_stats_expired", "test_value", pexpire=1)
+        await asyncio.sleep(0.01)
+
+        await backend.get("test_stats")
+        await backend.get("test_stats_expired")
+        await backend.get("test_stats_dont_exists")
+
+        self.assertEqual(backend.stats.keys, 1)
+        self.assertEqual(backend.stats.keyspace_hits, 1)
+        self.assertEqual(backend.stats.keyspace_misses, 2)
+        self.assertEqual(backend.stats.expired_keys, 1)
+        self.assertAlmostEqual(backend.stats.hit_ratio, 1 / 3)
+
+    async def test_stats_used_memory(self):
+        backend = RAMBackend()
+        await backend.set("test_stats_used_memory", "test_value")
+        for i in range(10):
+            await backend.sadd("test_stats_used_memory_set", f"test_value_{i}")
+        await backend.incr("test_stats_used_memory_counter")
+
+        self.assertTrue(backend.stats.used_memory > 0)
+
+        await backend.delete("test_stats_used_memory")
+        for i in range(10):
+            await backend.srem("test_stats_used_memory_set", f"test_value_{i}")
+        await backend.delete("test_stats_used_memory_counter")
+
+        self.assertEqual(backend.stats.used_memory, 0)
+        self.assertEqual(backend.stats.keys, 0)
+
+    async def test_no_eviction(self):
+        backend = RAMBackend(max_keys=2)
+        await backend.set("test_no_eviction_1", "test_value")
+        await backend.set("test_no_eviction_2", "test_value")
+        await backend.set("test_no_eviction_2", "test_value_2")
+
+        with self.assertRaises(Exception):
+            await backend.set("test_no_eviction_3", "test_value")
+
+    async def test_allkeys_lru(self):
+        backend = RAMBackend(shards=1, max_keys=3, eviction_policy=RAMBackend.ALLKEYS_LRU)
+        for i in range(3):
+            await backend.set(f"test_allkeys_lru_{i}", "test_value")
+        await backend.get("test_allkeys_lru_0")
+
+        await backend.set("test_allkeys_lru_3", "test_value")
+
+        self.assertEqual(set(backend.data), {"test_allkeys_lru_0", "test_allkeys_lru_2", "test_allkeys_lru_3"})
+        self.assertEqual(backend.stats.evicted_keys, 1)
+
+    async def test_volatile_lru(self):
+        backend = RAMBackend(shards=1, max_keys=3, eviction_policy=RAMBackend.VOLATILE_LRU)
+        await backend.set("test_volatile_lru_0", "test_value")
+        await backend.set("test_volatile_lru_1", "test_value", expire=100)
+        await backend.set("test_volatile_lru_2", "test_value", expire=100)
+
+        await backend.set("test_volatile_lru_3", "test_value")
+
+        self.assertEqual(set(backend.data), {"test_volatile_lru_0", "test_volatile_lru_2", "test_volatile_lru_3"})
+
+        await backend.set("test_volatile_lru_4", "test_value")
+
+        with self.assertRaises(Exception):
+            await backend.set("test_volatile_lru_5", "test_value")
+
+    async def test_allkeys_lfu(self):
+        backend = RAMBackend(shards=1, max_keys=3, eviction_policy=RAMBackend.ALLKEYS_LFU)
+        for i in range(3):
+            await backend.set(f"test_allkeys_lfu_{i}", "test_value")
+        for _ in range(5):
+            await backend.get("test_allkeys_lfu_0")
+            await backend.get("test_allkeys_lfu_2")
+
+        await backend.set("test_allkeys_lfu_3", "test_value")
+
+        self.assertEqual(set(backend.data), {"test_allkeys_lfu_0", "test_allkeys_lfu_2", "test_allkeys_lfu_3"})
+
+    async def test_allkeys_lfu_decay(self):
+        backend = RAMBackend(shards=1, max_keys=2, eviction_policy=RAMBackend.ALLKEYS_LFU)
+        await backend.set("test_allkeys_lfu_decay_old", "test_value")
+        await backend.set("test_allkeys_lfu_decay_new", "test_value")
+        shard = backend.data.shard("test_allkeys_lfu_decay_old")
+        minute = int(time.time() // 60)
+        shard.frequencies["test_allkeys_lfu_decay_old"] = (255, minute - 300 * backend.LFU_DECAY_TIME)
+        await backend.get("test_allkeys_lfu_decay_new")
+
+        self.assertEqual(backend._lfu_counter(shard, "test_allkeys_lfu_decay_old", minute), 0)
+
+        await backend.set("test_allkeys_lfu_decay_2", "test_value")
+
+        self.assertEqual(set(backend.data), {"test_allkeys_lfu_decay_new", "test_allkeys_lfu_decay_2"})
+
+    async def test_allkeys_lfu_log_counter(self):
+        backend = RAMBackend(shards=1, max_keys=10, eviction_policy=RAMBackend.ALLKEYS_LFU)
+        await backend.set("test_allkeys_lfu_log_counter", "test_value")
+        for _ in range(1000):
+            await backend.get("test_allkeys_lfu_log_counter")
+
+        counter, _ = backend.data.shard("test_allkeys_lfu_log_counter").frequencies["test_allkeys_lfu_log_counter"]
+        self.assertTrue(backend.LFU_INIT_VAL < counter < 100)
+
+    async def test_allkeys_lfu_samples_whole_shard(self):
+        backend = RAMBackend(shards=1, max_keys=100, eviction_policy=RAMBackend.ALLKEYS_LFU)
+        for i in range(100):
+            await backend.set(f"test_allkeys_lfu_samples_whole_shard_{i}", "test_value")
+            if i < 10:
+                for _ in range(3):
+                    await backend.get(f"test_allkeys_lfu_samples_whole_shard_{i}")
+        for i in range(100, 120):
+            await backend.set(f"test_allkeys_lfu_samples_whole_shard_{i}", "test_value")
+
+        hot_keys = [i for i in range(10) if f"test_allkeys_lfu_samples_whole_shard_{i}" in backend.data]
+        self.assertTrue(len(hot_keys) >= 5)
+
+    async def test_allkeys_lfu_sample_keys(self):
+        backend = RAMBackend(shards=1, max_keys=100, eviction_policy=RAMBackend.ALLKEYS_LFU)
+        for i in range(10):
+            await backend.set(f"test_allkeys_lfu_sample_keys_{i}", "test_value")
+        for i in range(0, 10, 3):
+            await backend.delete(f"test_allkeys_lfu_sample_keys_{i}")
+        shard = backend.data.shard("test_allkeys_lfu_sample_keys_1")
+
+        self.assertEqual(set(shard.keys or []), set(shard.data))
+        self.assertEqual({key: shard.keys.index(key) for key in shard.data}, shard.slots)
+        self.assertEqual(set(shard.sample(100)), set(shard.data))
+        self.assertEqual(len(shard.sample(3)), 3)
+        self.assertTrue(set(shard.sample(3)) <= set(shard.data))
+
+    async def test_volatile_ttl(self):
+        backend = RAMBackend(shards=1, max_keys=3, eviction_policy=RAMBackend.VOLATILE_TTL)
+        await backend.set("test_volatile_ttl_0", "test_value", expire=100)
+        await backend.set("test_volatile_ttl_1", "test_value", expire=10)
+        await backend.set("test_volatile_ttl_2", "test_value")
+
+        await backend.set("test_volatile_ttl_3", "test_value")
+
+        self.assertEqual(set(backend.data), {"test_volatile_ttl_0", "test_volatile_ttl_2", "test_volatile_ttl_3"})
+
+    async def test_max_memory(self):
+        backend = RAMBackend(max_memory=10000, eviction_policy=RAMBackend.ALLKEYS_LRU)
+        for i in range(1000):
+            await backend.set(f"test_max_memory_{i}", "test_value")
+
+        self.assertTrue(backend.stats.used_memory <= 10000 + 200)
+        self.assertTrue(backend.stats.evicted_keys > 0)
+        self.assertEqual(backend.stats.keys, len(backend.data))
+        self.assertEqual(await backend.get("test_max_memory_999"), b"test_value")
+
+    async def test_max_memory_oom_before_write(self):
+        backend = RAMBackend(max_memory=1000)
+        await backend.sadd("test_max_memory_oom_before_write_set", "test_value")
+        await backend.zadd("test_max_memory_oom_before_write_zset", 1, "test_value")
+        backend.max_memory = backend.stats.used_memory
+        used_memory = backend.stats.used_memory
+
+        with self.assertRaises(Exception):
+            await backend.sadd("test_max_memory_oom_before_write_set", "test_value_2")
+        with self.assertRaises(Exception):
+            await backend.zadd("test_max_memory_oom_before_write_zset", 2, "test_value_2")
+
+        self.assertEqual(await backend.smembers("test_max_memory_oom_before_write_set"), {"test_value"})
+        self.assertEqual(await backend.zrangebyscore("test_max_memory_oom_before_write_zset", 0, 10), ["test_value"])
+        self.assertEqual(backend.stats.used_memory, used_memory)
+
+    async def test_max_memory_evicts_before_sadd(self):
+        backend = RAMBackend(shards=1, eviction_policy=RAMBackend.ALLKEYS_LRU)
+        await backend.sadd("test_max_memory_evicts_before_sadd", "test_value")
+        await backend.set("test_max_memory_evicts_before_sadd_other", "test_value")
+        backend.max_memory = backend.stats.used_memory
+
+        self.assertTrue(await backend.sadd("test_max_memory_evicts_before_sadd", "test_value_2"))
+        self.assertEqual(backend.stats.evicted_keys, 1)
+        self.assertEqual(await backend.smembers("test_max_memory_evicts_before_sadd"), {"test_value_2"})
+        self.assertIn("test_max_memory_evicts_before_sadd_other", backend.data)
+
+    async def test_item_has_no_dict(self):
+        await ram_backend.set("test_item_has_no_dict", "test_value")
+
+        self.assertFalse(hasattr(ram_backend.data["test_item_has_no_dict"], "__dict__"))
+
+    async def test_set_int_value(self):
+        await ram_backend.set("test_set_int_value", 5)
+
+        self.assertEqual(ram_backend.data["test_set_int_value"].value, 5)
+        self.assertEqual(await ram_backend.get("test_set_int_value"), b"5")
+        self.assertEqual(await ram_backend.smembers("test_set_int_value"), {b"5"})
+
+    async def test_set_bool_value(self):
+        await ram_backend.set("test_set_bool_value", True)
+
+        self.assertEqual(await ram_backend.get("test_set_bool_value"), b"True")
+
+    async def test_increase_stores_int(self):
+        await ram_backend.set("test_increase_stores_int", "5")
+        await ram_backend.incr("test_increase_stores_int")
+
+        self.assertEqual(ram_backend.data["test_increase_stores_int"].value, 6)
+        self.assertEqual(await ram_backend.get("test_increase_stores_int"), b"6")
+
+    async def test_increase_by(self):
+        self.assertEqual(await ram_backend.incrby("test_increase_by", 5), 5)
+        self.assertEqual(await ram_backend.incrby("test_increase_by", 10), 15)
+
+        self.assertEqual(await ram_backend.get("test_increase_by"), b"15")
+
+    async def test_decrease_by(self):
+        await ram_backend.set("test_decrease_by", "10")
+
+        self.assertEqual(await ram_backend.decrby("test_decrease_by", 15), -5)
+        self.assertEqual(await ram_backend.get("test_decrease_by"), b"-5")
+
+    async def test_increase_by_float(self):
+        await ram_backend.set("test_increase_by_float", "10.5")
+
+        self.assertEqual(await ram_backend.incrbyfloat("test_increase_by_float", 0.25), 10.75)
+        self.assertEqual(await ram_backend.get("test_increase_by_float"), b"10.75")
+        self.assertEqual(await ram_backend.incrbyfloat("test_increase_by_float", 0.25), 11)
+        self.assertEqual(await ram_backend.get("test_increase_by_float"), b"11")
+        self.assertEqual(await ram_backend.incr("test_increase_by_float"), 12)
+
+    async def test_increase_by_float_with_int(self):
+        await ram_backend.set("test_increase_by_float_with_int", 5)
+
+        self.assertEqual(await ram_backend.incrbyfloat("test_increase_by_float_with_int", 1.5), 6.5)
+
+        with self.assertRaises(Exception):
+            await ram_backend.incr("test_increase_by_float_with_int")
+
+    async def test_increase_by_float_with_string(self):
+        await ram_backend.set("test_increase_by_float_with_string", "hello")
+
+        with self.assertRaises(Exception):
+            await ram_backend.incrbyfloat("test_increase_by_float_with_string", 1.5)
+
+    async def test_pipeline(self):
+        pipeline = ram_backend.pipeline()
+        pipeline.set("test_pipeline", 5).incr("test_pipeline").get("test_pipeline")
+        pipeline.sadd("test_pipeline_set", "test_value").smismember("test_pipeline_set", ["test_value", "test"])
+
+        self.assertEqual(len(pipeline.commands), 5)
+        self.assertEqual(await pipeline.execute(), [None, 6, b"6", True, [True, False]])
+        self.assertEqual(pipeline.commands, [])
+        self.assertEqual(await pipeline.execute(), [])
+
+    async def test_transaction(self):
+        transaction = ram_backend.transaction()
+
+        self.assertEqual(transaction.transaction, True)
+
+        result = (
+            await transaction.incr("test_transaction")
+            .pexpire("test_transaction", 1000)
+            .ttl("test_transaction")
+            .execute()
+        )
+
+        self.assertEqual(result, [1, True, 1])
+
+    async def test_eval_script(self):
+        async def function(backend, keys, args):
+            return [await backend.incrby(keys[0], args[0]), await backend.get(keys[0])]
+
+        script = Script("return 0", function)
+
+        self.assertEqual(script.sha, "06d3d9b2060dd51343d5f19f0e531f15c507e3d1")
+        self.assertEqual(await ram_backend.eval_script(script, ["test_eval_script"], [3]), [3, b"3"])
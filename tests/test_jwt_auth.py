@@ -1,14 +1,20 @@
+import asyncio
+import json
+import os
+import threading
 from datetime import timedelta, datetime
+from tempfile import TemporaryDirectory
+from time import time
 from typing import Dict, Union, List
-from unittest import IsolatedAsyncioTestCase
+from unittest import IsolatedAsyncioTestCase, skipUnless
 from unittest.mock import MagicMock, patch, AsyncMock
 
 import jwt
-from aioredis import Redis
 from fastapi import FastAPI, Depends, HTTPException
 from httpx import AsyncClient, Response
+from starlette.datastructures import State
 
-from fastapi_framework import redis_dependency
+from fastapi_framework import redis_dependency, RAMBackend, Redis
 from fastapi_framework.jwt_auth import (
     get_token,
     create_jwt_token,
@@ -19,8 +25,24 @@ from fastapi_framework.jwt_auth import (
     invalidate_refresh_token,
     check_refresh_token,
     generate_tokens,
+    generate_tokens_many,
+    create_access_token_sync,
+    TokenCache,
+    KeyStore,
+    get_refresh_token_key,
+    get_user_tokens_key,
+    revoke_user_tokens,
+    hash_password,
+    verify_password,
+    REFRESH_TOKEN_EXPIRE_MINUTES,
 )
 
+try:
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+    from jwt.algorithms import ECAlgorithm, OKPAlgorithm, RSAAlgorithm
+except ImportError:
+    rsa = None  # type: ignore
+
 app = FastAPI()
 
 users: List[Dict[str, Union[str, int]]] = [
@@ -78,6 +100,9 @@ class TestJWTAuth(IsolatedAsyncioTestCase):
     async def asyncSetUp(self):
         await redis_dependency.init()
 
+    async def asyncTearDown(self):
+        await redis_dependency.close()
+
     async def test_get_token(self):
         bearer_scheme = MagicMock()
         bearer_scheme.credentials = "TEST_JWT_TOKEN"
@@ -106,6 +131,87 @@ class TestJWTAuth(IsolatedAsyncioTestCase):
         self.assertIsInstance(decoded_data, Dict)
         self.assertEqual(decoded_data, data)
 
+    @patch("fastapi_framework.jwt_auth.SECRET_KEY", "TEST_SECRET_KEY")
+    async def test_get_data_request_cache(self):
+        request = MagicMock()
+        request.state = State()
+        jwt_token = jwt.encode({"test": "test_value"}, "TEST_SECRET_KEY", algorithm=ALGORITHM)
+        other_jwt_token = jwt.encode({"test": "other_value"}, "TEST_SECRET_KEY", algorithm=ALGORITHM)
+
+        with patch("fastapi_framework.jwt_auth.jwt.decode", wraps=jwt.decode) as decode_patch:
+            self.assertEqual(await get_data(jwt_token, request), {"test": "test_value"})
+            self.assertEqual(await get_data(jwt_token, request), {"test": "test_value"})
+            self.assertEqual(decode_patch.call_count, 1)
+            self.assertEqual(await get_data(other_jwt_token, request), {"test": "other_value"})
+            self.assertEqual(decode_patch.call_count, 2)
+
+    async def test_hash_password(self):
+        password_hash = await hash_password("test_password")
+
+        self.assertNotEqual(password_hash, "test_password")
+        self.assertTrue(await verify_password("test_password", password_hash))
+        self.assertFalse(await verify_password("wrong_password", password_hash))
+
+    @patch("fastapi_framework.jwt_auth.pwd_context")
+    async def test_verify_password_in_worker(self, pwd_context_patch: MagicMock):
+        pwd_context_patch.verify.side_effect = lambda password, password_hash: threading.current_thread().name
+
+        thread_name = await verify_password("test_password", "test_hash")
+
+        self.assertTrue(thread_name.startswith("password_hash"))
+
+    async def test_token_cache(self):
+        token_cache = TokenCache(2)
+
+        self.assertEqual(token_cache.get("token_1"), None)
+
+        token_cache.set("token_1", {"user_id": 1})
+        token_cache.set("token_2", {"user_id": 2, "exp": time() + 60})
+        token_cache.get("token_1")["user_id"] = 5
+
+        self.assertEqual(token_cache.get("token_1"), {"user_id": 1})
+
+        token_cache.set("token_3", {"user_id": 3, "exp": time() - 1})
+
+        self.assertEqual(token_cache.get("token_2"), None)
+        self.assertEqual(token_cache.get("token_3"), None)
+        self.assertEqual(list(token_cache.entries), [token_cache.digest("token_1")])
+        self.assertEqual((token_cache.hits, token_cache.misses), (2, 3))
+        self.assertEqual(token_cache.hit_ratio, 0.4)
+
+        token_cache.invalidate("token_1")
+
+        self.assertEqual(token_cache.get("token_1"), None)
+
+        token_cache.set("token_1", {"user_id": 1})
+        token_cache.clear()
+
+        self.assertEqual(token_cache.entries, {})
+
+    async def test_token_cache_disabled(self):
+        token_cache = TokenCache()
+
+        token_cache.set("token_1", {"user_id": 1})
+
+        self.assertEqual(token_cache.get("token_1"), None)
+        self.assertEqual(token_cache.misses, 0)
+
+    @patch("fastapi_framework.jwt_auth.SECRET_KEY", "TEST_SECRET_KEY")
+    @patch("fastapi_framework.jwt_auth.token_cache", TokenCache(10))
+    async def test_get_data_token_cache(self):
+        jwt_token = jwt.encode({"test": "test_value"}, "TEST_SECRET_KEY", algorithm=ALGORITHM)
+
+        with patch("fastapi_framework.jwt_auth.jwt.decode", wraps=jwt.decode) as decode_patch:
+            self.assertEqual(await get_data(jwt_token), {"test": "test_value"})
+            self.assertEqual(await get_data(jwt_token), {"test": "test_value"})
+            self.assertEqual(decode_patch.call_count, 1)
+
+        await invalidate_refresh_token(jwt_token, RAMBackend())
+
+        with patch("fastapi_framework.jwt_auth.jwt.decode", wraps=jwt.decode) as decode_patch:
+            await get_data(jwt_token)
+            self.assertEqual(decode_patch.call_count, 1)
+
     @patch("fastapi_framework.jwt_auth.SECRET_KEY", "TEST_SECRET_KEY")
     async def test_get_data_invalid_token(self):
         data = {"exp": datetime.utcnow() - timedelta(minutes=10)}
@@ -115,6 +221,104 @@ class TestJWTAuth(IsolatedAsyncioTestCase):
         with self.assertRaises(HTTPException):
             await get_data(jwt_token)
 
+    @staticmethod
+    def write_jwks(path: str, keys: Dict[str, str]):
+        jwks: List[Dict] = []
+        for kid, algorithm in keys.items():
+            if algorithm == "RS256":
+                jwk = RSAAlgorithm.to_jwk(rsa.generate_private_key(65537, 2048), as_dict=True)
+            elif algorithm == "ES256":
+                jwk = ECAlgorithm.to_jwk(ec.generate_private_key(ec.SECP256R1()), as_dict=True)
+                while any(len(jwk[name]) != 43 for name in ["x", "y", "d"]):
+                    # PyJWT drops leading zero Bytes and can't load such a Key again
+                    jwk = ECAlgorithm.to_jwk(ec.generate_private_key(ec.SECP256R1()), as_dict=True)
+            else:
+                jwk = OKPAlgorithm.to_jwk(ed25519.Ed25519PrivateKey.generate(), as_dict=True)
+            jwks.append({**jwk, "kid": kid, "alg": algorithm})
+        with open(path, "w") as file:
+            json.dump({"keys": jwks}, file)
+
+    @skipUnless(rsa, "cryptography is not installed")
+    async def test_key_store(self):
+        with TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, "jwks.json")
+            self.write_jwks(path, {"rsa": "RS256", "ec": "ES256", "ed": "EdDSA"})
+            for kid in ["rsa", "ec", "ed"]:
+                with patch("fastapi_framework.jwt_auth.key_store", KeyStore(path, kid)):
+                    jwt_token = await create_jwt_token({"test": kid}, timedelta(minutes=30))
+                    self.assertEqual(jwt.get_unverified_header(jwt_token)["kid"], kid)
+                    self.assertEqual((await get_data(jwt_token))["test"], kid)
+
+    @skipUnless(rsa, "cryptography is not installed")
+    @patch("fastapi_framework.jwt_auth.SECRET_KEY", "")
+    async def test_key_store_without_kid(self):
+        with TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, "jwks.json")
+            self.write_jwks(path, {"rsa": "RS256"})
+            with patch("fastapi_framework.jwt_auth.key_store", KeyStore(path)):
+                for jwt_token in [
+                    jwt.encode({"user_id": 1337, "admin": True}, "", algorithm="HS256"),
+                    jwt.encode({"user_id": 1337}, "", algorithm="HS256", headers={"kid": "unknown"}),
+                ]:
+                    with self.assertRaises(HTTPException) as context:
+                        await get_data(jwt_token)
+                    self.assertEqual(context.exception.status_code, 401)
+
+    @skipUnless(rsa, "cryptography is not installed")
+    @patch("fastapi_framework.jwt_auth.SECRET_KEY", "TEST_SECRET_KEY")
+    async def test_key_store_secret_key_fallback(self):
+        with TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, "jwks.json")
+            self.write_jwks(path, {"rsa": "RS256"})
+            with patch("fastapi_framework.jwt_auth.key_store", KeyStore(path)):
+                self.assertEqual(
+                    (await get_data(jwt.encode({"test": "legacy"}, "TEST_SECRET_KEY", algorithm=ALGORITHM)))["test"],
+                    "legacy",
+                )
+                with self.assertRaises(HTTPException):
+                    await get_data(jwt.encode({"test": "legacy"}, "TEST_SECRET_KEY", algorithm="HS512"))
+
+    @skipUnless(rsa, "cryptography is not installed")
+    async def test_key_store_rotation(self):
+        with TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, "jwks.json")
+            self.write_jwks(path, {"old": "ES256"})
+            key_store: KeyStore = KeyStore(path, reload_interval=0)
+            with patch("fastapi_framework.jwt_auth.key_store", key_store):
+                old_token: str = await create_jwt_token({"test": "old"}, timedelta(minutes=30))
+                self.write_jwks(path, {"new": "ES256"})
+                os.utime(path, (time() + 10, time() + 10))
+                new_token: str = await create_jwt_token({"test": "new"}, timedelta(minutes=30))
+
+                self.assertEqual(jwt.get_unverified_header(new_token)["kid"], "new")
+                self.assertEqual((await get_data(new_token))["test"], "new")
+                with self.assertRaises(HTTPException) as context:
+                    await get_data(old_token)
+                self.assertEqual(context.exception.status_code, 401)
+
+    @skipUnless(rsa, "cryptography is not installed")
+    async def test_key_store_removed_key(self):
+        for cache_size in [0, 10]:
+            with TemporaryDirectory() as directory:
+                path: str = os.path.join(directory, "jwks.json")
+                self.write_jwks(path, {"a": "ES256", "b": "ES256"})
+                key_store: KeyStore = KeyStore(path, "a", reload_interval=0)
+                with (
+                    patch("fastapi_framework.jwt_auth.key_store", key_store),
+                    patch("fastapi_framework.jwt_auth.token_cache", TokenCache(cache_size)),
+                ):
+                    jwt_token: str = await create_jwt_token({"test": "a"}, timedelta(minutes=30))
+                    self.assertEqual((await get_data(jwt_token))["test"], "a")
+                    with open(path) as file:
+                        jwks: Dict = json.load(file)
+                    with open(path, "w") as file:
+                        json.dump({"keys": [jwk for jwk in jwks["keys"] if jwk["kid"] != "a"]}, file)
+                    os.utime(path, (time() + 10, time() + 10))
+
+                    with self.assertRaises(HTTPException) as context:
+                        await get_data(jwt_token)
+                    self.assertEqual(context.exception.status_code, 401)
+
     @patch("fastapi_framework.jwt_auth.SECRET_KEY", "TEST_SECRET_KEY")
     async def test_create_access_token(self):
         data = {"test": "test_value"}
@@ -128,54 +332,140 @@ class TestJWTAuth(IsolatedAsyncioTestCase):
     @patch("fastapi_framework.jwt_auth.SECRET_KEY", "TEST_SECRET_KEY")
     async def test_create_refresh_token(self):
         user_id: int = 5
-        redis = AsyncMock()
+        redis = RAMBackend()
 
         jwt_token = await create_refresh_token(user_id, redis)
 
-        redis.sadd.assert_called_once_with("refresh_tokens", jwt_token)
+        key = get_refresh_token_key(jwt_token)
+        self.assertTrue(key.startswith("refresh_token:"))
+        self.assertEqual(await redis.get(key), b"5")
+        self.assertTrue(0 < await redis.ttl(key) <= REFRESH_TOKEN_EXPIRE_MINUTES * 60)
+        self.assertEqual(await redis.zrangebyscore(get_user_tokens_key(user_id), 0, float("inf")), [key.split(":")[1]])
+        self.assertTrue(0 < await redis.ttl(get_user_tokens_key(user_id)) <= REFRESH_TOKEN_EXPIRE_MINUTES * 60)
         decoded_data = jwt.decode(jwt_token, "TEST_SECRET_KEY", algorithms=[ALGORITHM])
         self.assertTrue("user_id" in decoded_data)
         self.assertEqual(decoded_data["user_id"], user_id)
+        self.assertEqual(len(decoded_data["jti"]), 32)
+        self.assertNotEqual(await create_refresh_token(user_id, redis), jwt_token)
 
     async def test_invalidate_refresh_token(self):
-        redis = AsyncMock()
+        redis = RAMBackend()
+        refresh_token = await create_refresh_token(5, redis)
+        other_refresh_token = await create_refresh_token(5, redis)
+        await redis.sadd("refresh_tokens", "TEST_REFRESH_TOKEN")
 
+        await invalidate_refresh_token(refresh_token, redis)
         await invalidate_refresh_token("TEST_REFRESH_TOKEN", redis)
 
-        redis.srem.assert_called_once_with("refresh_tokens", "TEST_REFRESH_TOKEN")
+        self.assertFalse(await redis.exists(get_refresh_token_key(refresh_token)))
+        self.assertEqual(len(await redis.zrangebyscore(get_user_tokens_key(5), 0, float("inf"))), 1)
+        self.assertEqual(await redis.scard("refresh_tokens"), 0)
+        self.assertTrue(await check_refresh_token(other_refresh_token, redis))
+
+    async def test_revoke_user_tokens(self):
+        redis = RAMBackend()
+        refresh_tokens = [await create_refresh_token(5, redis) for _ in range(3)]
+        other_refresh_token = await create_refresh_token(6, redis)
+
+        self.assertEqual(await revoke_user_tokens(5, redis), 3)
+
+        for refresh_token in refresh_tokens:
+            self.assertFalse(await check_refresh_token(refresh_token, redis))
+        self.assertFalse(await redis.exists(get_user_tokens_key(5)))
+        self.assertTrue(await check_refresh_token(other_refresh_token, redis))
+        self.assertEqual(await revoke_user_tokens(5, redis), 0)
+
+    async def test_revoke_user_tokens_redis(self):
+        redis = await redis_dependency()
+        await redis.delete(get_user_tokens_key(1337))
+        refresh_tokens = [await create_refresh_token(1337, redis) for _ in range(3)]
+
+        self.assertEqual(await revoke_user_tokens(1337, redis), 3)
+
+        for refresh_token in refresh_tokens:
+            self.assertFalse(await check_refresh_token(refresh_token, redis))
+        self.assertFalse(await redis.exists(get_user_tokens_key(1337)))
+
+    async def test_revoke_user_tokens_concurrent(self):
+        redis = await redis_dependency()
+        for _ in range(20):
+            await create_refresh_token(1337, redis)
+            _, refresh_token = await asyncio.gather(revoke_user_tokens(1337, redis), create_refresh_token(1337, redis))
+
+            # the new Token is either revoked or still in the Index, so it can be revoked later
+            if await check_refresh_token(refresh_token, redis):
+                self.assertEqual(await revoke_user_tokens(1337, redis), 1)
+            self.assertFalse(await check_refresh_token(refresh_token, redis))
+
+    async def test_user_tokens_expire(self):
+        redis = RAMBackend()
+        with patch("fastapi_framework.jwt_auth.time", return_value=time() - REFRESH_TOKEN_EXPIRE_MINUTES * 60 - 10):
+            expired_refresh_tokens = [await create_refresh_token(5, redis) for _ in range(3)]
+        for refresh_token in expired_refresh_tokens:
+            await redis.delete(get_refresh_token_key(refresh_token))
+        self.assertEqual(len(await redis.zrangebyscore(get_user_tokens_key(5), 0, float("inf"))), 3)
+
+        refresh_token = await create_refresh_token(5, redis)
+
+        self.assertEqual(
+            await redis.zrangebyscore(get_user_tokens_key(5), 0, float("inf")),
+            [get_refresh_token_key(refresh_token).split(":")[1]],
+        )
+        self.assertEqual(await revoke_user_tokens(5, redis), 1)
+        self.assertFalse(await check_refresh_token(refresh_token, redis))
 
     async def test_check_refresh_token_positive(self):
         redis = AsyncMock()
-        redis.smembers = AsyncMock()
-        redis.smembers.return_value = [
-            b"TEST_FALSE_REFRESH_TOKEN",
-            b"TEST_SECOND_FALSE_REFRESH_TOKEN",
-            b"TEST_REFRESH_TOKEN",
-        ]
+        redis.replica = MagicMock(return_value=redis)
+        redis.exists.return_value = True
+
+        result = await check_refresh_token("TEST_REFRESH_TOKEN", redis)
+
+        redis.replica.assert_called_once_with(None)
+        redis.exists.assert_called_once_with(get_refresh_token_key("TEST_REFRESH_TOKEN"))
+        redis.sismember.assert_not_called()
+        self.assertTrue(result)
+
+    async def test_check_refresh_token_legacy(self):
+        redis = AsyncMock()
+        redis.replica = MagicMock(return_value=redis)
+        redis.exists.return_value = False
+        redis.sismember.return_value = True
 
         result = await check_refresh_token("TEST_REFRESH_TOKEN", redis)
 
-        redis.smembers.assert_called_once_with("refresh_tokens")
+        redis.sismember.assert_called_once_with("refresh_tokens", "TEST_REFRESH_TOKEN")
         self.assertTrue(result)
 
     async def test_check_refresh_token_negative(self):
         redis = AsyncMock()
-        redis.smembers = AsyncMock()
-        redis.smembers.return_value = [
-            b"TEST_FALSE_REFRESH_TOKEN",
-            b"TEST_SECOND_FALSE_REFRESH_TOKEN",
-        ]
+        redis.replica = MagicMock(return_value=redis)
+        redis.exists.return_value = False
+        redis.sismember.return_value = False
 
         result = await check_refresh_token("TEST_REFRESH_TOKEN", redis)
 
-        redis.smembers.assert_called_once_with("refresh_tokens")
+        redis.exists.assert_called_once_with(get_refresh_token_key("TEST_REFRESH_TOKEN"))
         self.assertFalse(result)
 
+    async def test_refresh_token_expire(self):
+        redis = RAMBackend()
+
+        refresh_token = await create_refresh_token(5, redis)
+
+        self.assertTrue(await check_refresh_token(refresh_token, redis))
+        ttl = await redis.ttl(get_refresh_token_key(refresh_token))
+        self.assertTrue(0 < ttl <= REFRESH_TOKEN_EXPIRE_MINUTES * 60)
+
+        await invalidate_refresh_token(refresh_token, redis)
+
+        self.assertFalse(await check_refresh_token(refresh_token, redis))
+
     @patch("fastapi_framework.jwt_auth.SECRET_KEY", "TEST_SECRET_KEY")
     async def test_generate_tokens(self):
         data = {"test": "test_value"}
         user_id = 6
-        redis = AsyncMock()
+        redis = RAMBackend()
 
         tokens = await generate_tokens(data, user_id, redis)
 
@@ -185,7 +475,7 @@ class TestJWTAuth(IsolatedAsyncioTestCase):
         self.assertTrue("refresh_token" in tokens)
         access_token = tokens["access_token"]
         refresh_token = tokens["refresh_token"]
-        redis.sadd.assert_called_once_with("refresh_tokens", refresh_token)
+        self.assertTrue(await check_refresh_token(refresh_token, redis))
         decoded_access_token = jwt.decode(access_token, "TEST_SECRET_KEY", algorithms=[ALGORITHM])
         self.assertTrue("test" in decoded_access_token)
         self.assertEqual(decoded_access_token["test"], data["test"])
@@ -193,6 +483,30 @@ class TestJWTAuth(IsolatedAsyncioTestCase):
         self.assertTrue("user_id" in decoded_refresh_token)
         self.assertEqual(decoded_refresh_token["user_id"], user_id)
 
+    @patch("fastapi_framework.jwt_auth.SECRET_KEY", "TEST_SECRET_KEY")
+    async def test_create_access_token_sync(self):
+        data = {"test": "test_value"}
+
+        access_token = create_access_token_sync(data)
+
+        self.assertEqual(data, {"test": "test_value"})
+        self.assertEqual(jwt.decode(access_token, "TEST_SECRET_KEY", algorithms=[ALGORITHM])["test"], "test_value")
+
+    @patch("fastapi_framework.jwt_auth.SECRET_KEY", "TEST_SECRET_KEY")
+    async def test_generate_tokens_many(self):
+        redis = RAMBackend()
+
+        tokens = await generate_tokens_many([({"test": user_id}, user_id) for user_id in range(3)], redis)
+
+        self.assertEqual(len(tokens), 3)
+        for user_id, token in enumerate(tokens):
+            self.assertEqual(token["token_type"], "bearer")
+            self.assertEqual(
+                jwt.decode(token["access_token"], "TEST_SECRET_KEY", algorithms=[ALGORITHM])["test"], user_id
+            )
+            self.assertTrue(await check_refresh_token(token["refresh_token"], redis))
+            self.assertEqual(len(await redis.zrangebyscore(get_user_tokens_key(user_id), 0, float("inf"))), 1)
+
     @patch("fastapi_framework.jwt_auth.SECRET_KEY", "TEST_SECRET_KEY")
     async def test_login(self):
         async with AsyncClient(app=app, base_url="https://test") as ac:
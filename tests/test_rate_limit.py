@@ -1,9 +1,12 @@
+import asyncio
 from typing import List
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import AsyncMock, patch, MagicMock
 
+import jwt
 from fastapi import HTTPException, FastAPI, Depends, Request
 from httpx import AsyncClient, Response
+from starlette.datastructures import State
 
 from fastapi_framework.rate_limit import (
     RateLimitManager,
@@ -12,8 +15,10 @@ from fastapi_framework.rate_limit import (
     default_get_uuid,
     default_callback,
     get_uuid_user_id,
+    FIXED_WINDOW_SCRIPT,
+    LocalRateLimitCache,
 )
-from fastapi_framework import rate_limit, redis_dependency
+from fastapi_framework import rate_limit, redis_dependency, RAMBackend, create_access_token, get_data
 
 app = FastAPI()
 
@@ -33,6 +38,9 @@ class TestRateLimit(IsolatedAsyncioTestCase):
         await redis_dependency.init()
         await RateLimitManager.init(await redis_dependency(), get_uuid=self.get_testing_uuid)
 
+    async def asyncTearDown(self):
+        await redis_dependency.close()
+
     @patch.object(rate_limit, "disabled_modules", [])
     async def test_rate_limit_manager_init(self):
         redis = AsyncMock()
@@ -80,6 +88,27 @@ class TestRateLimit(IsolatedAsyncioTestCase):
         self.assertEqual(rate_limiter.get_uuid, None)
         self.assertEqual(rate_limiter.callback, None)
 
+    @patch.object(rate_limit, "disabled_modules", [])
+    async def test_rate_limiter_init_strategy(self):
+        rate_limiter = RateLimiter(5, RateLimitTime(seconds=56), strategy=RateLimiter.GCRA)
+
+        self.assertEqual(rate_limiter.strategy, RateLimiter.GCRA)
+        with self.assertRaises(Exception):
+            RateLimiter(5, RateLimitTime(seconds=56), strategy="leaky_bucket")
+
+    @patch.object(rate_limit, "disabled_modules", [])
+    async def test_rate_limiter_init_tiers(self):
+        tiers = [(10, RateLimitTime(seconds=1)), (1000, RateLimitTime(hours=1))]
+
+        rate_limiter = RateLimiter(tiers)
+
+        self.assertEqual(rate_limiter.tiers, tiers)
+        self.assertEqual((rate_limiter.count, rate_limiter.time), tiers[0])
+        with self.assertRaises(Exception):
+            RateLimiter(10)
+        with self.assertRaises(Exception):
+            RateLimiter([])
+
     @patch.object(rate_limit, "disabled_modules", ["rate_limit"])
     async def test_rate_limiter_init_disabled(self):
         count = 5
@@ -105,20 +134,34 @@ class TestRateLimit(IsolatedAsyncioTestCase):
     @patch("fastapi_framework.rate_limit.get_data")
     async def test_get_uuid_user_id(self, get_data_patch: AsyncMock):
         request = MagicMock()
+        request.state = State()
         request.headers.get.return_value = "Bearer test_bearer_token"
         get_data_patch.return_value = {"user_id": "5"}
 
         uuid = await get_uuid_user_id(request)
 
-        get_data_patch.assert_called_once_with("test_bearer_token")
+        get_data_patch.assert_called_once_with("test_bearer_token", request)
         self.assertEqual(uuid, "5")
 
     @patch("fastapi_framework.rate_limit.get_data")
-    @patch("fastapi_framework.rate_limit.HTTPBearer")
-    async def test_get_uuid_user_id_no_token(self, http_bearer_patch: AsyncMock, get_data_patch: AsyncMock):
-        http_bearer_patch.return_value = AsyncMock()
-        http_bearer_patch.return_value.return_value = None
+    @patch("fastapi_framework.rate_limit.bearer_scheme")
+    async def test_get_uuid_user_id_cached(self, bearer_scheme_patch: AsyncMock, get_data_patch: AsyncMock):
+        request = MagicMock()
+        request.state = State()
+        request.state.jwt_data = ("test_bearer_token", {"user_id": 7})
+
+        uuid = await get_uuid_user_id(request)
+
+        self.assertEqual(uuid, "7")
+        bearer_scheme_patch.assert_not_called()
+        get_data_patch.assert_not_called()
+
+    @patch("fastapi_framework.rate_limit.get_data")
+    @patch("fastapi_framework.rate_limit.bearer_scheme", new_callable=AsyncMock)
+    async def test_get_uuid_user_id_no_token(self, bearer_scheme_patch: AsyncMock, get_data_patch: AsyncMock):
+        bearer_scheme_patch.return_value = None
         request = MagicMock()
+        request.state = State()
 
         with self.assertRaises(Exception):
             await get_uuid_user_id(request)
@@ -174,3 +217,223 @@ class TestRateLimit(IsolatedAsyncioTestCase):
                 self.assertEqual(response.status_code, 429)
                 self.assertTrue("detail" in response.json())
                 self.assertEqual(response.json()["detail"], "Too Many Requests")
+
+    async def test_fixed_window_script(self):
+        ram_backend = RAMBackend()
+        keys = ["test_fixed_window_script", "test_fixed_window_script:lock"]
+
+        self.assertEqual(await ram_backend.eval_script(FIXED_WINDOW_SCRIPT, keys, [1, 2, 5000]), [1, 1, 5000, 0])
+        self.assertEqual((await ram_backend.eval_script(FIXED_WINDOW_SCRIPT, keys, [1, 2, 5000]))[:2], [1, 0])
+        allowed, count, pttl, _ = await ram_backend.eval_script(FIXED_WINDOW_SCRIPT, keys, [1, 2, 5000])
+        self.assertEqual([allowed, count], [0, 0])
+        self.assertTrue(0 < pttl <= 5000)
+        self.assertFalse(await ram_backend.exists(keys[0]))
+
+    async def test_concurrent_limited_route(self):
+        self.testing_uuid = "test_concurrent_limited_route"
+        await RateLimitManager.redis.delete(f"rate_limit:/limited:{self.testing_uuid}:lock")
+
+        async with AsyncClient(app=app, base_url="https://test") as ac:
+            responses: List[Response] = await asyncio.gather(*[ac.get("/limited") for _ in range(10)])
+
+        self.assertEqual(sorted(response.status_code for response in responses), [200] * 2 + [429] * 8)
+
+    async def test_strategy_scripts(self):
+        for backend in [RAMBackend(), await redis_dependency()]:
+            for strategy, script in RateLimiter.SCRIPTS.items():
+                with self.subTest(backend=type(backend).__name__, strategy=strategy):
+                    keys = [f"test_strategy_scripts:{strategy}", f"test_strategy_scripts:{strategy}:lock"]
+                    await backend.delete(keys[0])
+                    await backend.delete(keys[1])
+
+                    results = [await backend.eval_script(script, keys, [1, 3, 5000]) for _ in range(5)]
+
+                    self.assertEqual([result[:2] for result in results], [[1, 2], [1, 1], [1, 0], [0, 0], [0, 0]])
+                    self.assertTrue(all(0 < result[2] <= 5000 for result in results))
+
+    async def test_strategy_limited_route(self):
+        self.testing_uuid = "test_strategy_limited_route"
+        strategy_app = FastAPI()
+        for strategy in RateLimiter.SCRIPTS:
+            strategy_app.get(
+                f"/{strategy}", dependencies=[Depends(RateLimiter(2, RateLimitTime(seconds=5), strategy=strategy))]
+            )(limited_route)
+
+        async with AsyncClient(app=strategy_app, base_url="https://test") as ac:
+            for strategy in RateLimiter.SCRIPTS:
+                await RateLimitManager.redis.delete(f"rate_limit:/{strategy}:{self.testing_uuid}")
+                await RateLimitManager.redis.delete(f"rate_limit:/{strategy}:{self.testing_uuid}:lock")
+                responses: List[Response] = [await ac.get(f"/{strategy}") for _ in range(3)]
+
+                self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+                self.assertEqual(responses[0].headers["X-Rate-Limit-Limit"], "2")
+                self.assertEqual(responses[2].headers["X-Rate-Limit-Remaining"], "0")
+
+    async def test_local_rate_limit_cache(self):
+        local_cache = LocalRateLimitCache(batch_size=3, max_keys=2)
+
+        self.assertEqual(local_cache.check("test"), None)
+        self.assertEqual(local_cache.cost("test"), 1)
+
+        local_cache.update("test", [1, 10, 5000, 0])
+
+        self.assertEqual(local_cache.check("test")[:2], [1, 9])
+        self.assertEqual(local_cache.check("test")[:2], [1, 8])
+        self.assertEqual(local_cache.check("test"), None)
+        self.assertEqual(local_cache.cost("test"), 3)
+        self.assertEqual(local_cache.cost("test"), 1)
+        self.assertEqual(local_cache.check("test")[:2], [1, 5])
+
+        local_cache.update("test", [0, 0, 5000, 0])
+
+        self.assertEqual(local_cache.check("test")[:2], [0, 0])
+
+        local_cache.update("test_expired", [0, 0, -1, 0])
+        local_cache.update("test_other", [1, 1, 5000, 0])
+
+        self.assertEqual(list(local_cache.entries), ["test_expired", "test_other"])
+        self.assertEqual(local_cache.check("test_expired"), None)
+        self.assertEqual(local_cache.check("test_other"), None)
+
+        with self.assertRaises(Exception):
+            LocalRateLimitCache(batch_size=0)
+
+    async def test_local_batch_size(self):
+        self.testing_uuid = "test_local_batch_size"
+        RateLimitManager.redis = RAMBackend()
+        eval_script = AsyncMock(wraps=RateLimitManager.redis.eval_script)
+        RateLimitManager.redis.eval_script = eval_script
+        local_app = FastAPI()
+        local_app.get("/local", dependencies=[Depends(RateLimiter(10, RateLimitTime(seconds=5), local_batch_size=4))])(
+            limited_route
+        )
+
+        async with AsyncClient(app=local_app, base_url="https://test") as ac:
+            responses: List[Response] = [await ac.get("/local") for _ in range(15)]
+
+        self.assertEqual([response.status_code for response in responses], [200] * 10 + [429] * 5)
+        self.assertEqual([call.args[2][0] for call in eval_script.call_args_list], [1, 4, 4, 1, 1])
+        self.assertEqual(responses[5].headers["X-Rate-Limit-Remaining"], "4")
+        self.assertEqual(responses[10].headers["X-Rate-Limit-Remaining"], "0")
+        RateLimitManager.redis = await redis_dependency()
+
+    async def test_local_batch_size_concurrent(self):
+        self.testing_uuid = "test_local_batch_size_concurrent"
+        redis = await redis_dependency()
+        rate_limiter: RateLimiter = RateLimiter(10000, RateLimitTime(seconds=5), local_batch_size=10)
+        request = MagicMock()
+        request.url.path = "/concurrent"
+        key: str = rate_limiter.get_key(request, self.testing_uuid)
+        await redis.delete(key)
+
+        await rate_limiter(request, MagicMock())
+        await asyncio.gather(*[rate_limiter(request, MagicMock()) for _ in range(199)])
+
+        self.assertEqual(int(await redis.get(key)) + rate_limiter.local_cache.entries[key].pending, 200)
+
+    async def test_limited_route_headers(self):
+        self.testing_uuid = "test_limited_route_headers"
+        RateLimitManager.redis = RAMBackend()
+        eval_script = AsyncMock(wraps=RateLimitManager.redis.eval_script)
+        RateLimitManager.redis.eval_script = eval_script
+        headers_app = FastAPI()
+        headers_app.get("/headers", dependencies=[Depends(RateLimiter(2, RateLimitTime(seconds=5)))])(limited_route)
+        headers_app.get("/internal", dependencies=[Depends(RateLimiter(2, RateLimitTime(seconds=5), headers=False))])(
+            limited_route
+        )
+
+        async with AsyncClient(app=headers_app, base_url="https://test") as ac:
+            responses: List[Response] = [await ac.get("/headers") for _ in range(3)]
+            internal_responses: List[Response] = [await ac.get("/internal") for _ in range(3)]
+
+        self.assertEqual(eval_script.call_count, 6)
+        self.assertEqual([response.headers["X-Rate-Limit-Remaining"] for response in responses], ["1", "0", "0"])
+        self.assertEqual({response.headers["X-Rate-Limit-Reset"] for response in responses}, {"5"})
+        self.assertEqual(responses[2].headers["X-Rate-Limit-Limit"], "2")
+        self.assertEqual([response.status_code for response in internal_responses], [200, 200, 429])
+        self.assertFalse(any("X-Rate-Limit-Limit" in response.headers for response in internal_responses))
+        RateLimitManager.redis = await redis_dependency()
+
+    async def test_get_key(self):
+        self.testing_uuid = "test_get_key"
+        RateLimitManager.redis = RAMBackend()
+        key_app = FastAPI()
+        for name, rate_limiter in [
+            ("path", RateLimiter(2, RateLimitTime(seconds=5))),
+            ("route", RateLimiter(2, RateLimitTime(seconds=5), route_template=True)),
+            ("scope", RateLimiter(2, RateLimitTime(seconds=5), scope="items")),
+            ("hash", RateLimiter(2, RateLimitTime(seconds=5), route_template=True, hash_keys=True)),
+        ]:
+            key_app.get(f"/{name}/{{item_id}}", dependencies=[Depends(rate_limiter)])(limited_route)
+
+        async with AsyncClient(app=key_app, base_url="https://test") as ac:
+            for name in ["path", "route", "scope", "hash"]:
+                for item_id in range(3):
+                    await ac.get(f"/{name}/{item_id}")
+
+        keys = list(RateLimitManager.redis.data)
+        self.assertTrue({f"rate_limit:/path/{item_id}:test_get_key" for item_id in range(3)}.issubset(keys))
+        self.assertTrue("rate_limit:/route/{item_id}:test_get_key:lock" in keys)
+        self.assertTrue("rate_limit:items:test_get_key:lock" in keys)
+        hashed_keys = [key for key in keys if key.startswith("rl:")]
+        self.assertEqual(len(hashed_keys), 1)
+        self.assertEqual(len(hashed_keys[0]), len("rl:") + 16 + len(":lock"))
+        RateLimitManager.redis = await redis_dependency()
+
+    async def test_strategy_scripts_tiers(self):
+        for backend in [RAMBackend(), await redis_dependency()]:
+            for strategy, script in RateLimiter.SCRIPTS.items():
+                with self.subTest(backend=type(backend).__name__, strategy=strategy):
+                    keys = [f"test_strategy_scripts_tiers:{strategy}:{tier}" for tier in range(2)]
+                    keys = [keys[0], f"{keys[0]}:lock", keys[1], f"{keys[1]}:lock"]
+                    for key in keys:
+                        await backend.delete(key)
+
+                    results = [await backend.eval_script(script, keys, [1, 3, 5000, 2, 60000]) for _ in range(3)]
+
+                    self.assertEqual(
+                        [[result[0], result[1], result[3]] for result in results], [[1, 1, 1], [1, 0, 1], [0, 0, 1]]
+                    )
+                    # The Sliding Window Counter resets at the End of the current Window, which can be very close
+                    min_reset = 0 if strategy == RateLimiter.SLIDING_WINDOW_COUNTER else 5000
+                    self.assertTrue(min_reset < results[2][2] <= 60000)
+
+    async def test_tiers_limited_route(self):
+        self.testing_uuid = "test_tiers_limited_route"
+        RateLimitManager.redis = RAMBackend()
+        tiers_app = FastAPI()
+        tiers = [(3, RateLimitTime(seconds=5)), (2, RateLimitTime(minutes=1))]
+        tiers_app.get("/tiers", dependencies=[Depends(RateLimiter(tiers))])(limited_route)
+
+        async with AsyncClient(app=tiers_app, base_url="https://test") as ac:
+            responses: List[Response] = [await ac.get("/tiers") for _ in range(3)]
+
+        self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+        self.assertEqual([response.headers["X-Rate-Limit-Limit"] for response in responses], ["2", "2", "2"])
+        self.assertEqual(responses[2].headers["X-Rate-Limit-Reset"], "60")
+        self.assertEqual(
+            set(RateLimitManager.redis.data),
+            {"rate_limit:/tiers:test_tiers_limited_route", "rate_limit:/tiers:test_tiers_limited_route:1:lock"},
+        )
+        RateLimitManager.redis = await redis_dependency()
+
+    async def test_user_id_limited_route(self):
+        RateLimitManager.redis = RAMBackend()
+        user_app = FastAPI()
+        user_app.get(
+            "/user",
+            dependencies=[
+                Depends(RateLimiter(2, RateLimitTime(seconds=5), get_uuid=get_uuid_user_id)),
+                Depends(get_data),
+            ],
+        )(limited_route)
+        token = await create_access_token({"user_id": 9})
+
+        with patch("fastapi_framework.jwt_auth.jwt.decode", wraps=jwt.decode) as decode_patch:
+            async with AsyncClient(app=user_app, base_url="https://test") as ac:
+                response: Response = await ac.get("/user", headers={"Authorization": f"Bearer {token}"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(decode_patch.call_count, 1)
+        self.assertTrue("rate_limit:/user:9" in RateLimitManager.redis.data)
+        RateLimitManager.redis = await redis_dependency()
@@ -1,11 +1,32 @@
-from unittest import IsolatedAsyncioTestCase
-from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+from collections import deque
+from os import getenv
+from unittest import IsolatedAsyncioTestCase, skipUnless
+from unittest.mock import patch, call, MagicMock, AsyncMock
 
-from fastapi_framework.redis import RedisDependency, get_redis, RedisBackend
+from redis.asyncio import BlockingConnectionPool
+from redis.crc import key_slot
+from redis.exceptions import ConnectionError, DataError, ResponseError, TimeoutError as RedisTimeoutError
+
+from fastapi_framework.in_memory_backend import Script
+from fastapi_framework.redis import (
+    RedisDependency,
+    get_redis,
+    RedisBackend,
+    AutoPipeline,
+    RedisClusterBackend,
+    RedisSentinelBackend,
+    parse_nodes,
+    parse_info,
+    NearCache,
+)
 from fastapi_framework import redis, RAMBackend
 
 
 class TestRedis(IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await redis.redis_dependency.close()
+
     @patch.object(redis, "disabled_modules", [])
     async def test_redis_dependency_init(self):
         redis_dependency: RedisDependency = RedisDependency()
@@ -41,58 +62,668 @@ class TestRedis(IsolatedAsyncioTestCase):
         self.assertEqual(await redis_dependency.__call__(), None)
         redis_dependency.init.assert_called_once()
 
+    @patch.object(redis, "disabled_modules", [])
+    async def test_redis_dependency_call_other_loop(self):
+        redis_dependency: RedisDependency = RedisDependency()
+        redis_dependency.redis = MagicMock()
+        redis_dependency.loop = asyncio.new_event_loop()
+        redis_dependency.init = AsyncMock()
+
+        await redis_dependency.__call__()
+
+        redis_dependency.init.assert_called_once()
+        redis_dependency.loop.close()
+
     @patch.object(redis, "disabled_modules", [])
     async def test_get_redis(self):
         result = await get_redis()
 
         self.assertIsInstance(result, RedisBackend)
 
+    @patch.object(redis, "disabled_modules", [])
+    async def test_get_redis_shared(self):
+        first = await get_redis()
+
+        self.assertIs(await get_redis(), first)
+        self.assertIs(redis.redis_dependency.redis, first)
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_redis_dependency_close(self):
+        redis_dependency: RedisDependency = RedisDependency()
+        await redis_dependency.init()
+        redis_backend = redis_dependency.redis
+
+        await redis_dependency.close()
+
+        self.assertIsNone(redis_dependency.redis)
+        self.assertEqual(await redis_backend.free_connections(), [])
+        self.assertIsNone(redis_backend.reaper)
+
+    @patch.object(redis, "REDIS_POOL_MINSIZE", 2)
+    @patch.object(redis, "REDIS_POOL_MAXSIZE", 4)
+    async def test_pool_size(self):
+        redis_backend = await RedisBackend.init(f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}")
+
+        self.assertEqual(redis_backend.minsize, 2)
+        self.assertEqual(redis_backend.redis_connection.connection_pool.max_connections, 4)
+        self.assertEqual(len(await redis_backend.free_connections()), 2)
+        await redis_backend.close()
+
+    async def test_reap_idle_connections(self):
+        redis_backend = await RedisBackend.init(
+            f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", minsize=1, maxsize=5, idle_timeout=0.05
+        )
+
+        await asyncio.gather(*[redis_backend.redis_connection.blpop(["reap"], 0.01) for _ in range(5)])
+        self.assertEqual(len(await redis_backend.free_connections()), 5)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(len(await redis_backend.free_connections()), 1)
+        self.assertTrue(await redis_backend.health_check())
+        await redis_backend.close()
+
+    async def test_command_timeout(self):
+        redis_backend = await RedisBackend.init(
+            f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", command_timeout=0.05, idle_timeout=0
+        )
+
+        with self.assertRaises(RedisTimeoutError):
+            await redis_backend.redis_connection.blpop(["timeout"], 1)
+        self.assertIsNone(redis_backend.reaper)
+        await redis_backend.close()
+
     @patch.object(redis, "disabled_modules", ["redis"])
     async def test_get_redis_disabled_redis(self):
         with self.assertRaises(Exception):
             await get_redis()
 
+    async def test_auto_pipeline(self):
+        redis_backend = await RedisBackend.init(f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", idle_timeout=0)
+        await redis_backend.delete("test_auto_pipeline")
+
+        with patch.object(
+            redis_backend.redis_connection, "pipeline", wraps=redis_backend.redis_connection.pipeline
+        ) as pipeline_patch:
+            results = await asyncio.gather(
+                *[redis_backend.incr("test_auto_pipeline") for _ in range(50)],
+                redis_backend.execute("UNKNOWN_COMMAND"),
+                redis_backend.get("test_auto_pipeline"),
+                return_exceptions=True,
+            )
+
+        pipeline_patch.assert_called_once_with(transaction=False)
+        self.assertEqual(results[:50], list(range(1, 51)))
+        self.assertIsInstance(results[50], ResponseError)
+        self.assertEqual(results[51], b"50")
+        await redis_backend.close()
+
+    async def test_auto_pipeline_pool_size(self):
+        redis_backend = await RedisBackend.init(
+            f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", maxsize=2, idle_timeout=0
+        )
+
+        blpop = asyncio.ensure_future(redis_backend.execute("BLPOP", "test_auto_pipeline_pool_size", 0.3))
+        await asyncio.sleep(0.05)
+        self.assertTrue(await asyncio.wait_for(redis_backend.execute("PING"), 0.2))
+        self.assertFalse(blpop.done())
+        other_blpop = asyncio.ensure_future(redis_backend.execute("BLPOP", "test_auto_pipeline_pool_size", 0.3))
+        await asyncio.sleep(0.05)
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(redis_backend.execute("PING"), 0.1)
+
+        self.assertEqual(await asyncio.gather(blpop, other_blpop), [None, None])
+        await redis_backend.close()
+
+    async def test_auto_pipeline_reconnect(self):
+        redis_backend = await RedisBackend.init(f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", idle_timeout=0)
+        other_backend = await RedisBackend.init(f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", idle_timeout=0)
+        await redis_backend.set("test_auto_pipeline_reconnect", "1")
+        client_id = await redis_backend.execute("CLIENT", "ID")
+
+        await other_backend.execute("CLIENT", "KILL", "ID", client_id)
+
+        self.assertEqual(await redis_backend.get("test_auto_pipeline_reconnect"), b"1")
+        self.assertNotEqual(await redis_backend.execute("CLIENT", "ID"), client_id)
+        await redis_backend.close()
+        await other_backend.close()
+
+    async def test_auto_pipeline_encoding_error(self):
+        redis_backend = await RedisBackend.init(f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", idle_timeout=0)
+        await redis_backend.set("test_auto_pipeline_a", "A")
+        await redis_backend.set("test_auto_pipeline_b", "B")
+
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                redis_backend.get("test_auto_pipeline_a"),
+                redis_backend.set("test_auto_pipeline_bad", True),
+                redis_backend.set("test_auto_pipeline_bad", None),
+                redis_backend.get("test_auto_pipeline_a"),
+                redis_backend.get("test_auto_pipeline_b"),
+                return_exceptions=True,
+            ),
+            1,
+        )
+
+        self.assertEqual(results[0], b"A")
+        self.assertIsInstance(results[1], DataError)
+        self.assertIsInstance(results[2], DataError)
+        self.assertEqual(results[3:], [b"A", b"B"])
+        await redis_backend.close()
+
+    async def test_auto_pipeline_connection_error(self):
+        redis_connection = MagicMock()
+        redis_connection.pipeline.return_value.execute = AsyncMock(side_effect=ConnectionError("Connection lost"))
+        auto_pipeline = AutoPipeline(redis_connection)
+
+        results = await asyncio.gather(
+            auto_pipeline.execute("GET", "a"), auto_pipeline.execute("GET", "b"), return_exceptions=True
+        )
+
+        self.assertIsInstance(results[0], ConnectionError)
+        self.assertIsInstance(results[1], ConnectionError)
+        self.assertEqual(auto_pipeline.tasks, set())
+
+    async def test_auto_pipeline_close(self):
+        async def execute_command(*args):
+            await asyncio.sleep(10)
+
+        redis_connection = MagicMock()
+        redis_connection.execute_command = execute_command
+        auto_pipeline = AutoPipeline(redis_connection)
+
+        reply = asyncio.ensure_future(auto_pipeline.execute("GET", "a"))
+        await asyncio.sleep(0.01)
+        await auto_pipeline.close()
+
+        with self.assertRaises(ConnectionError):
+            await reply
+
+    async def test_auto_pipeline_timeout(self):
+        redis_backend = await RedisBackend.init(
+            f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", command_timeout=0.05, idle_timeout=0
+        )
+
+        with self.assertRaises(RedisTimeoutError):
+            await redis_backend.execute("BLPOP", "timeout", 1)
+        await redis_backend.close()
+
+    async def test_parse_nodes(self):
+        self.assertEqual(parse_nodes("node1:7000, node2:7001,"), [("node1", 7000), ("node2", 7001)])
+        self.assertEqual(parse_nodes(""), [])
+
+    @patch.object(redis, "disabled_modules", [])
+    @patch.object(redis, "REDIS_CLUSTER_NODES", "node1:7000,node2:7001")
+    @patch.object(RedisClusterBackend, "init_cluster", new_callable=AsyncMock)
+    async def test_redis_dependency_init_cluster(self, init_cluster_patch: AsyncMock):
+        redis_dependency: RedisDependency = RedisDependency()
+
+        await redis_dependency.init()
+
+        init_cluster_patch.assert_called_once_with([("node1", 7000), ("node2", 7001)])
+        self.assertEqual(redis_dependency.redis, init_cluster_patch.return_value)
+
+    @patch.object(redis, "disabled_modules", [])
+    @patch.object(redis, "REDIS_SENTINELS", "sentinel:26379")
+    @patch.object(RedisSentinelBackend, "init_sentinel", new_callable=AsyncMock)
+    async def test_redis_dependency_init_sentinel(self, init_sentinel_patch: AsyncMock):
+        redis_dependency: RedisDependency = RedisDependency()
+
+        await redis_dependency.init()
+
+        init_sentinel_patch.assert_called_once_with([("sentinel", 26379)], redis.REDIS_SENTINEL_SERVICE)
+
+    async def test_parse_info(self):
+        info = parse_info(b"# Replication\r\nrole:slave\r\nmaster_link_status:up\r\nslave_repl_offset:42\r\n")
+
+        self.assertEqual(info, {"role": "slave", "master_link_status": "up", "slave_repl_offset": "42"})
+        self.assertEqual(
+            parse_info({"role": "slave", "slave_repl_offset": 42}), {"role": "slave", "slave_repl_offset": "42"}
+        )
+
+    async def test_update_replicas(self):
+        redis_backend: RedisBackend = RedisBackend()
+        redis_backend.primary_offsets = deque()
+        redis_backend.execute = AsyncMock(return_value=b"master_replid:abc\r\nmaster_repl_offset:100\r\n")
+        replicas = [RedisBackend(), RedisBackend(), RedisBackend()]
+        replicas[0].execute = AsyncMock(
+            return_value=b"master_link_status:up\r\nmaster_replid:abc\r\nslave_repl_offset:100\r\n"
+        )
+        replicas[1].execute = AsyncMock(
+            return_value=b"master_link_status:down\r\nmaster_replid:abc\r\nslave_repl_offset:100\r\n"
+        )
+        replicas[2].execute = AsyncMock(side_effect=ConnectionError())
+        redis_backend.replicas = replicas
+
+        await redis_backend.update_replicas()
+        first_check: float = redis_backend.primary_offsets[0][0]
+        redis_backend.execute.return_value = b"master_replid:abc\r\nmaster_repl_offset:200\r\n"
+        await redis_backend.update_replicas()
+
+        redis_backend.execute.assert_called_with("INFO", "replication")
+        self.assertEqual(replicas[0].synced_at, first_check)
+        self.assertEqual(replicas[1].synced_at, float("-inf"))
+        self.assertEqual(replicas[2].synced_at, float("-inf"))
+
+    async def test_replica(self):
+        redis_backend: RedisBackend = RedisBackend()
+        redis_backend.execute = AsyncMock(return_value=b"primary")
+        replica: RedisBackend = RedisBackend()
+        replica.execute = AsyncMock(return_value=b"replica")
+        replica.synced_at = asyncio.get_running_loop().time()
+        redis_backend.replicas = [replica]
+
+        self.assertEqual(await redis_backend.get("test"), b"primary")
+        self.assertEqual(await redis_backend.replica(1).get("test"), b"replica")
+        replica.execute.assert_called_once_with("GET", "test")
+        await redis_backend.replica(1).set("test", "value")
+        redis_backend.execute.assert_called_with("SET", "test", "value")
+        replica.execute.return_value = None
+        self.assertEqual(await redis_backend.replica(1).get("test"), b"primary")
+        replica.execute.side_effect = ConnectionError()
+        self.assertEqual(await redis_backend.replica(1).get("test"), b"primary")
+        replica.execute.side_effect = None
+        replica.execute.return_value = b"replica"
+        replica.synced_at -= 2
+        self.assertEqual(await redis_backend.replica(1).get("test"), b"primary")
+        self.assertEqual(await redis_backend.replica(5).get("test"), b"replica")
+        ram_backend: RAMBackend = RAMBackend()
+        self.assertIs(ram_backend.replica(), ram_backend)
+
+    @skipUnless(getenv("TEST_REDIS_PRIMARY") and getenv("TEST_REDIS_REPLICAS"), "no Redis Replicas")
+    async def test_replica_routing(self):
+        redis_backend = await RedisBackend.init(f"redis://{getenv('TEST_REDIS_PRIMARY')}")
+        await redis_backend.connect_replicas(parse_nodes(getenv("TEST_REDIS_REPLICAS", "")), 0.05)
+        await asyncio.sleep(0.2)
+        await redis_backend.set("test_replica_routing", "value")
+
+        self.assertEqual(await redis_backend.replica(1).get("test_replica_routing"), b"value")
+        self.assertTrue(await redis_backend.replica(1).exists("test_replica_routing"))
+        self.assertLess(asyncio.get_running_loop().time() - redis_backend.replicas[0].synced_at, 1)
+        await redis_backend.close()
+
+    async def test_near_cache(self):
+        near_cache: NearCache = NearCache(2)
+        execute = AsyncMock(side_effect=lambda command, key: b"value" if command == "GET" else -1)
+
+        self.assertEqual(await near_cache.get("a", execute), b"value")
+        self.assertEqual(await near_cache.get("a", execute), b"value")
+        self.assertEqual(execute.call_args_list, [call("GET", "a"), call("PTTL", "a")])
+        await near_cache.get("b", execute)
+        await near_cache.get("c", execute)
+        self.assertEqual(list(near_cache.entries), [b"b", b"c"])
+        near_cache.invalidate([b"c", b"d"])
+        self.assertEqual(list(near_cache.entries), [b"b"])
+        near_cache.invalidate(None)
+        self.assertEqual((near_cache.hits, near_cache.misses, near_cache.invalidations), (1, 3, 2))
+        self.assertEqual(near_cache.hit_ratio, 0.25)
+
+    async def test_near_cache_invalidate_while_fetching(self):
+        near_cache: NearCache = NearCache(10)
+
+        async def execute(command, key):
+            near_cache.invalidate([b"a"])
+            return b"old_value" if command == "GET" else -1
+
+        self.assertEqual(await near_cache.get("a", execute), b"old_value")
+        self.assertEqual(near_cache.entries, {})
+        self.assertEqual((near_cache.fetching, near_cache.stale), ({}, set()))
+
+    async def test_near_cache_expire(self):
+        near_cache: NearCache = NearCache(10)
+        execute = AsyncMock(side_effect=lambda command, key: b"value" if command == "GET" else 50)
+
+        self.assertEqual(await near_cache.get("a", execute), b"value")
+        self.assertEqual(await near_cache.get("a", execute), b"value")
+        await asyncio.sleep(0.06)
+        execute.side_effect = lambda command, key: None if command == "GET" else -2
+        self.assertIsNone(await near_cache.get("a", execute))
+
+        self.assertEqual(execute.call_count, 4)
+        self.assertEqual((near_cache.hits, near_cache.misses), (1, 2))
+        self.assertEqual(near_cache.entries[b"a"], (None, 0))
+
+    async def test_near_cache_expire_redis(self):
+        cached_backend = await RedisBackend.init(f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", near_cache_size=10)
+        await cached_backend.set("test_near_cache_expire_redis", "1", pexpire=100)
+
+        self.assertEqual(await cached_backend.get("test_near_cache_expire_redis"), b"1")
+        self.assertEqual(await cached_backend.get("test_near_cache_expire_redis"), b"1")
+        await asyncio.sleep(0.15)
+        self.assertIsNone(await cached_backend.get("test_near_cache_expire_redis"))
+        self.assertEqual(cached_backend.near_cache.hits, 1)
+        await cached_backend.close()
+
+    @patch.object(redis, "REDIS_PROTOCOL", 2)
+    async def test_near_cache_resp2(self):
+        cached_backend = await RedisBackend.init(f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", near_cache_size=10)
+        redis_backend = await RedisBackend.init(f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", near_cache_size=0)
+        await redis_backend.set("test_near_cache_resp2", "1")
+
+        self.assertEqual(await cached_backend.get("test_near_cache_resp2"), b"1")
+        await redis_backend.set("test_near_cache_resp2", "2")
+        await asyncio.sleep(0.05)
+        self.assertEqual(await cached_backend.get("test_near_cache_resp2"), b"2")
+        self.assertEqual(cached_backend.near_cache.hits, 0)
+        await cached_backend.close()
+        await redis_backend.close()
+
+    async def test_near_cache_tracking(self):
+        cached_backend = await RedisBackend.init(f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", near_cache_size=10)
+        redis_backend = await RedisBackend.init(f"redis://{redis.REDIS_HOST}:{redis.REDIS_PORT}", near_cache_size=0)
+        await redis_backend.set("test_near_cache_tracking", "1")
+
+        self.assertEqual(await cached_backend.get("test_near_cache_tracking"), b"1")
+        self.assertEqual(await cached_backend.get("test_near_cache_tracking"), b"1")
+        self.assertEqual(cached_backend.near_cache.hits, 1)
+        await redis_backend.set("test_near_cache_tracking", "2")
+        await redis_backend.execute("PING")
+        await asyncio.sleep(0.05)
+        self.assertEqual(await cached_backend.get("test_near_cache_tracking"), b"2")
+        await cached_backend.set("test_near_cache_tracking", "3")
+        self.assertEqual(await cached_backend.get("test_near_cache_tracking"), b"3")
+        await cached_backend.pipeline().incr("test_near_cache_tracking").execute()
+        self.assertEqual(await cached_backend.get("test_near_cache_tracking"), b"4")
+        await cached_backend.get("test_near_cache_tracking")
+        tracking_id = cached_backend.tracking_id
+        await redis_backend.execute("CLIENT", "KILL", "ID", tracking_id)
+        await asyncio.sleep(0.05)
+        self.assertEqual(cached_backend.near_cache.entries, {})
+        self.assertFalse(cached_backend.near_cache.tracked)
+        await redis_backend.set("test_near_cache_tracking", "5")
+        self.assertEqual(await cached_backend.get("test_near_cache_tracking"), b"5")
+        await asyncio.sleep(cached_backend.RESUBSCRIBE_DELAY + 0.1)
+        self.assertTrue(cached_backend.near_cache.tracked)
+        self.assertNotEqual(cached_backend.tracking_id, tracking_id)
+        self.assertEqual(await cached_backend.get("test_near_cache_tracking"), b"5")
+        await redis_backend.set("test_near_cache_tracking", "6")
+        await asyncio.sleep(0.05)
+        self.assertEqual(await cached_backend.get("test_near_cache_tracking"), b"6")
+        await cached_backend.close()
+        await redis_backend.close()
+
+    async def test_cluster_hash_tag(self):
+        cluster_backend: RedisClusterBackend = RedisClusterBackend()
+        key: str = cluster_backend.hash_tag("rate_limit:/items/{item_id}:user")
+
+        self.assertEqual(key, "{rate_limit:/items/(item_id):user}")
+        self.assertEqual(key_slot(key.encode()), key_slot(f"{key}:1:lock".encode()))
+        self.assertNotEqual(
+            key_slot(key.encode()), key_slot(cluster_backend.hash_tag("rate_limit:/items/{item_id}:other").encode())
+        )
+        self.assertEqual(RAMBackend().hash_tag("rate_limit:/items/{item_id}:user"), "rate_limit:/items/{item_id}:user")
+
+    async def test_cluster_transaction_slots(self):
+        cluster_backend: RedisClusterBackend = RedisClusterBackend()
+        cluster_backend.cluster = MagicMock()
+        cluster_backend.cluster.keyslot.side_effect = lambda key: key_slot(key.encode())
+        cluster_backend.cluster.pipeline.return_value.execute = AsyncMock(return_value=[1, 1])
+
+        await cluster_backend.transaction().incr("{user}:a").incr("{user}:b").execute()
+        cluster_backend.cluster.pipeline.assert_called_with(transaction=True)
+        await cluster_backend.transaction().incr("a").incr("b").execute()
+        cluster_backend.cluster.pipeline.assert_called_with(transaction=False)
+
+    @skipUnless(getenv("TEST_REDIS_CLUSTER_NODES"), "no Redis Cluster")
+    async def test_cluster_backend(self):
+        cluster_backend = await RedisClusterBackend.init_cluster(parse_nodes(getenv("TEST_REDIS_CLUSTER_NODES", "")))
+        key: str = cluster_backend.hash_tag("test_cluster_backend")
+        await cluster_backend.delete(key)
+        await cluster_backend.delete(f"{key}:lock")
+        script = Script("return redis.call('INCRBY', KEYS[1], ARGV[1]) + redis.call('INCR', KEYS[2])", AsyncMock())
+
+        self.assertEqual(await cluster_backend.eval_script(script, [key, f"{key}:lock"], [2]), 3)
+        results = await cluster_backend.pipeline().get(key).incr("test_cluster_backend_other").execute()
+        self.assertEqual(results[0], b"2")
+        await cluster_backend.close()
+
+    @skipUnless(getenv("TEST_REDIS_SENTINELS"), "no Redis Sentinel")
+    async def test_sentinel_backend(self):
+        sentinel_backend = await RedisSentinelBackend.init_sentinel(
+            parse_nodes(getenv("TEST_REDIS_SENTINELS", "")), getenv("TEST_REDIS_SENTINEL_SERVICE", "mymaster")
+        )
+
+        await sentinel_backend.set("test_sentinel_backend", "1")
+        self.assertEqual(await sentinel_backend.get("test_sentinel_backend"), b"1")
+        await sentinel_backend.close()
+
+    @patch.object(RedisSentinelBackend, "start", new_callable=AsyncMock)
+    async def test_sentinel_backend_blocking_pool(self, start_patch: AsyncMock):
+        await RedisSentinelBackend.init_sentinel([("sentinel", 26379)], "mymaster", maxsize=3)
+
+        pool = start_patch.call_args.args[0]
+        self.assertIsInstance(pool, BlockingConnectionPool)
+        self.assertIsNone(pool.timeout)
+        self.assertEqual(pool.max_connections, 3)
+        self.assertEqual(pool.service_name, "mymaster")
+
+    @skipUnless(getenv("TEST_REDIS_SENTINELS"), "no Redis Sentinel")
+    async def test_sentinel_backend_pool_size(self):
+        sentinel_backend = await RedisSentinelBackend.init_sentinel(
+            parse_nodes(getenv("TEST_REDIS_SENTINELS", "")),
+            getenv("TEST_REDIS_SENTINEL_SERVICE", "mymaster"),
+            maxsize=2,
+        )
+
+        results = await asyncio.gather(
+            *[sentinel_backend.transaction().incr("test_sentinel_pool").get("missing").execute() for _ in range(10)]
+        )
+
+        self.assertEqual(len(results), 10)
+        self.assertIsInstance(sentinel_backend.redis_connection.connection_pool, BlockingConnectionPool)
+        self.assertLessEqual(len(await sentinel_backend.free_connections()), 2)
+        await sentinel_backend.close()
+
     @patch.object(redis, "disabled_modules", [])
     async def test_expire(self):
         redis_backend = RedisBackend()
-        redis_backend.redis_connection = AsyncMock()
+        redis_backend.execute = AsyncMock()
 
         await redis_backend.expire("test", 5000)
 
-        redis_backend.redis_connection.expire.assert_called_with("test", 5000)
+        redis_backend.execute.assert_called_with("EXPIRE", "test", 5000)
 
     @patch.object(redis, "disabled_modules", [])
     async def test_decrease(self):
         redis_backend = RedisBackend()
-        redis_backend.redis_connection = AsyncMock()
+        redis_backend.execute = AsyncMock()
 
         await redis_backend.decr("test")
 
-        redis_backend.redis_connection.decr.assert_called_with("test")
+        redis_backend.execute.assert_called_with("DECR", "test")
 
     @patch.object(redis, "disabled_modules", [])
     async def test_smembers(self):
         redis_backend = RedisBackend()
-        redis_backend.redis_connection = AsyncMock()
+        redis_backend.execute = AsyncMock()
 
         await redis_backend.smembers("test")
 
-        redis_backend.redis_connection.smembers.assert_called_with("test")
+        redis_backend.execute.assert_called_with("SMEMBERS", "test")
 
     @patch.object(redis, "disabled_modules", [])
     async def test_sadd(self):
         redis_backend = RedisBackend()
-        redis_backend.redis_connection = AsyncMock()
+        redis_backend.execute = AsyncMock()
 
         await redis_backend.sadd("test", "test_value")
 
-        redis_backend.redis_connection.sadd.assert_called_with("test", "test_value")
+        redis_backend.execute.assert_called_with("SADD", "test", "test_value")
 
     @patch.object(redis, "disabled_modules", [])
     async def test_srem(self):
         redis_backend = RedisBackend()
-        redis_backend.redis_connection = AsyncMock()
+        redis_backend.execute = AsyncMock()
 
         await redis_backend.srem("test", "test_value")
 
-        redis_backend.redis_connection.srem.assert_called_with("test", "test_value")
+        redis_backend.execute.assert_called_with("SREM", "test", "test_value")
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_sismember(self):
+        redis_backend = RedisBackend()
+        redis_backend.execute = AsyncMock()
+        redis_backend.execute.return_value = 1
+
+        self.assertEqual(await redis_backend.sismember("test", "test_value"), True)
+
+        redis_backend.execute.assert_called_with("SISMEMBER", "test", "test_value")
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_smismember(self):
+        redis_backend = RedisBackend()
+        redis_backend.execute = AsyncMock()
+        redis_backend.execute.return_value = [1, 0]
+
+        self.assertEqual(await redis_backend.smismember("test", ["test_value", "test"]), [True, False])
+
+        redis_backend.execute.assert_called_with("SMISMEMBER", "test", "test_value", "test")
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_scard(self):
+        redis_backend = RedisBackend()
+        redis_backend.execute = AsyncMock()
+        redis_backend.execute.return_value = 3
+
+        self.assertEqual(await redis_backend.scard("test"), 3)
+
+        redis_backend.execute.assert_called_with("SCARD", "test")
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_select(self):
+        redis_backend = RedisBackend()
+        redis_backend.redis_connection = MagicMock()
+        redis_backend.redis_connection.connection_pool.connection_kwargs = {"db": 0}
+        redis_backend.redis_connection.connection_pool.disconnect = AsyncMock()
+
+        self.assertEqual(await redis_backend.select(2), True)
+
+        self.assertEqual(redis_backend.redis_connection.connection_pool.connection_kwargs["db"], 2)
+        redis_backend.redis_connection.connection_pool.disconnect.assert_called_once()
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_set_options(self):
+        redis_backend = RedisBackend()
+        redis_backend.execute = AsyncMock()
+
+        await redis_backend.set("test", "test_value", expire=5, exists=RedisBackend.SET_IF_NOT_EXIST)
+
+        redis_backend.execute.assert_called_with("SET", "test", "test_value", "EX", 5, "NX")
+        with self.assertRaises(Exception):
+            await redis_backend.set("test", "test_value", exists="WRONG")
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_increase_by(self):
+        redis_backend = RedisBackend()
+        redis_backend.execute = AsyncMock()
+        redis_backend.execute.return_value = 5
+
+        self.assertEqual(await redis_backend.incrby("test", 5), 5)
+
+        redis_backend.execute.assert_called_with("INCRBY", "test", 5)
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_decrease_by(self):
+        redis_backend = RedisBackend()
+        redis_backend.execute = AsyncMock()
+        redis_backend.execute.return_value = -5
+
+        self.assertEqual(await redis_backend.decrby("test", 5), -5)
+
+        redis_backend.execute.assert_called_with("DECRBY", "test", 5)
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_increase_by_float(self):
+        redis_backend = RedisBackend()
+        redis_backend.execute = AsyncMock()
+        redis_backend.execute.return_value = 1.5
+
+        self.assertEqual(await redis_backend.incrbyfloat("test", 1.5), 1.5)
+
+        redis_backend.execute.assert_called_with("INCRBYFLOAT", "test", 1.5)
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_sorted_set(self):
+        redis_backend: RedisBackend = await get_redis()
+        await redis_backend.delete("test_sorted_set")
+
+        self.assertEqual(await redis_backend.zadd("test_sorted_set", 2, "test_value_2"), True)
+        self.assertEqual(await redis_backend.zadd("test_sorted_set", 1, "test_value_1"), True)
+        self.assertEqual(await redis_backend.zadd("test_sorted_set", 3, "test_value_1"), False)
+        self.assertEqual(
+            await redis_backend.zrangebyscore("test_sorted_set", 0, float("inf")), [b"test_value_2", b"test_value_1"]
+        )
+        self.assertEqual(await redis_backend.zrem("test_sorted_set", "test_value_1"), True)
+        self.assertEqual(await redis_backend.zremrangebyscore("test_sorted_set", 0, 2), 1)
+        self.assertEqual(await redis_backend.exists("test_sorted_set"), False)
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_pipeline_sorted_set(self):
+        redis_backend: RedisBackend = await get_redis()
+        await redis_backend.delete("test_pipeline_sorted_set")
+
+        result = (
+            await redis_backend.pipeline()
+            .zadd("test_pipeline_sorted_set", 1, "test_value_1")
+            .zadd("test_pipeline_sorted_set", 2, "test_value_2")
+            .zremrangebyscore("test_pipeline_sorted_set", 0, 1)
+            .zrangebyscore("test_pipeline_sorted_set", 0, float("inf"))
+            .zrem("test_pipeline_sorted_set", "test_value_2")
+            .execute()
+        )
+
+        self.assertEqual(result, [True, True, 1, [b"test_value_2"], True])
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_pipeline(self):
+        redis_backend: RedisBackend = await get_redis()
+        await redis_backend.delete("test_pipeline")
+        await redis_backend.delete("test_pipeline_set")
+
+        result = (
+            await redis_backend.pipeline()
+            .set("test_pipeline", 5, expire=10)
+            .incr("test_pipeline")
+            .get("test_pipeline")
+            .ttl("test_pipeline")
+            .sadd("test_pipeline_set", "test_value")
+            .smismember("test_pipeline_set", ["test_value", "test"])
+            .smembers("test_pipeline_set")
+            .execute()
+        )
+
+        self.assertEqual(result[:3], [True, 6, b"6"])
+        self.assertTrue(0 < result[3] <= 10)
+        self.assertEqual(result[4:], [True, [True, False], {b"test_value"}])
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_transaction(self):
+        redis_backend = RedisBackend()
+        redis_backend.redis_connection = MagicMock()
+        redis_backend.redis_connection.pipeline.return_value.execute = AsyncMock(return_value=[1, 1])
+
+        result = await redis_backend.transaction().incr("test").exists("test").execute()
+
+        self.assertEqual(result, [1, True])
+        redis_backend.redis_connection.pipeline.return_value.incr.assert_called_with("test")
+        redis_backend.redis_connection.pipeline.assert_called_with(transaction=True)
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_eval_script(self):
+        redis_backend: RedisBackend = await get_redis()
+        script = Script("return redis.call('INCRBY', KEYS[1], ARGV[1])", AsyncMock())
+        await redis_backend.delete("test_eval_script")
+        await redis_backend.redis_connection.script_flush()
+
+        self.assertEqual(await redis_backend.eval_script(script, ["test_eval_script"], [3]), 3)
+        self.assertEqual(await redis_backend.redis_connection.script_exists(script.sha), [1])
+        self.assertEqual(await redis_backend.eval_script(script, ["test_eval_script"], [3]), 6)
+        script.function.assert_not_called()
+
+    @patch.object(redis, "disabled_modules", [])
+    async def test_eval_script_error(self):
+        redis_backend = RedisBackend()
+        redis_backend.execute = AsyncMock(side_effect=ResponseError("ERR Error running script"))
+
+        with self.assertRaises(ResponseError):
+            await redis_backend.eval_script(Script("return 0", AsyncMock()), [], [])
+        redis_backend.execute.assert_called_once()
@@ -293,3 +293,21 @@ class TestSession(IsolatedAsyncioTestCase):
 
         with self.assertRaises(SessionNotExists):
             await Session.get_data(session, request)
+
+    @patch("fastapi_framework.session.redis_dependency", new_callable=AsyncMock)
+    async def test_get_data_from_replica(self, redis_dependency_mock: AsyncMock):
+        replica = AsyncMock()
+        replica.get.return_value = b"TEST_DATA"
+        redis_dependency_mock.return_value.replica = MagicMock(return_value=replica)
+
+        request = MagicMock()
+        request.state.session_id = "TEST_SESSION_ID"
+        session = AsyncMock()
+        session.replica_max_lag = 2
+        session.model.parse_raw = MagicMock()
+
+        await Session.get_data(session, request)
+
+        redis_dependency_mock.return_value.replica.assert_called_once_with(2)
+        replica.get.assert_called_once_with("session:id:TEST_SESSION_ID")
+        session.model.parse_raw.assert_called_once_with(b"TEST_DATA")